@@ -0,0 +1,360 @@
+"""Performance benchmarks of beta_gui.py.
+
+    python3 bench/benchmarks.py minus
+
+Each benchmark prints its timings and exits non-zero when its result is wrong or too slow.
+Correctness itself is covered by the tests in tests/.
+"""
+import argparse
+import atexit
+import collections
+import json
+import os
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+
+# Benchmarks parse references and fill caches, never those in the user's ~/.cache/beta-gui
+if __name__ == '__main__':
+    os.environ["BETA_CACHE_ROOT"] = tempfile.mkdtemp(prefix="beta-bench-")
+    atexit.register(shutil.rmtree, os.environ["BETA_CACHE_ROOT"], True)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import beta_gui
+
+# ===================================================================== #
+# Benchmarks
+# ===================================================================== #
+def benchmark_logging(runs=200, lines=2000):
+    # Cost of logging a run must not grow with the number of runs already made in this process
+    import tempfile
+    timings = []
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(runs):
+            run_log = beta_gui.RunLog("BETA-benchmark", os.path.join(directory, f"BETA-benchmark-{run}.log"))
+            # Time paid by the caller, file writes happen on the listener thread
+            start = time.perf_counter()
+            for line in range(lines):
+                run_log.info(f"line {line} of run {run}")
+            timings.append(time.perf_counter() - start)
+            run_log.close()
+        line_counts = set()
+        for run in range(runs):
+            with open(os.path.join(directory, f"BETA-benchmark-{run}.log")) as f:
+                line_counts.add(sum(1 for _ in f))
+    window = max(1, runs // 10)
+    first = sum(timings[:window]) / window
+    last = sum(timings[-window:]) / window
+    print(f"Logged {runs} runs x {lines} lines: first {window} runs {first * 1e6 / lines:.1f} us/line, last {window} runs {last * 1e6 / lines:.1f} us/line ({last / first:.2f}x)")
+    print(f"Every log file holds exactly its own {lines} lines: {line_counts == {lines}}")
+    return 0 if line_counts == {lines} and last < 2 * first else 1
+
+def benchmark_startup(runs=5):
+    # Time from creating the main window to the first tab on screen, all tabs built up front vs. on first selection
+    if not os.environ.get("DISPLAY"):
+        print("The startup benchmark needs a display (set DISPLAY, e.g. run it under xvfb-run).")
+        return 1
+    import tkinter as tk
+    results = {}
+    for mode, extra_args in (("eager", ["--eager-tabs"]), ("lazy", [])):
+        args = beta_gui.main_parser().parse_args(["--no-cache", "--no-history"] + extra_args)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            root = tk.Tk()
+            beta_gui.build_main_window(root, args)
+            root.update()
+            timings.append(time.perf_counter() - start)
+            root.destroy()
+        results[mode] = sorted(timings)[len(timings) // 2]
+        print(f"Time to first paint, {mode} tabs: median {results[mode] * 1000:.0f} ms over {runs} windows")
+    print(f"Lazy tabs start {results['eager'] / results['lazy']:.2f}x faster")
+    return 0
+
+def benchmark_cmd(keystrokes=20000):
+    # Cost of keeping the command line current while typing, every keystroke used to rebuild it
+    params = dict(beta_gui.DEFAULT_PARAMS, type="plus", genome="hg38", name_prefix="my run", info_id="1", info_change="3", info_stat="7",
+                  peaks_file_path="/data/ChIP seq/peaks.bed", expression_file_path="/data/RNA seq/de genes.txt")
+    argv = beta_gui.build_argv(params)
+    round_trip = tuple(shlex.split(beta_gui.build_cmd(params))) == argv and "/data/ChIP seq/peaks.bed" in argv
+
+    beta_gui.build_argv_from_items.cache_clear()
+    start = time.perf_counter()
+    for keystroke in range(keystrokes):
+        beta_gui.build_argv(dict(params, distance=str(keystroke)))
+    cold = (time.perf_counter() - start) / keystrokes
+
+    start = time.perf_counter()
+    for _ in range(keystrokes):
+        beta_gui.build_argv(params)
+    memoized = (time.perf_counter() - start) / keystrokes
+
+    # Typing "250000" into the distance box, one trace per keystroke
+    typed = "250000"
+    print(f"Building the argv: {cold * 1e6:.1f} us for new parameters, {memoized * 1e6:.2f} us for unchanged parameters ({cold / memoized:.0f}x)")
+    print(f"Typing {typed!r}: {len(typed)} rebuilds ({len(typed) * cold * 1e6:.0f} us) before, 1 rebuild {beta_gui.CMD_UPDATE_DELAY_MS} ms after the last keystroke ({cold * 1e6:.0f} us) now")
+    print(f"Paths with spaces survive as single arguments: {round_trip}")
+    return 0 if round_trip else 1
+
+def benchmark_results(rows=1000000, visible=40):
+    # Opening, sorting, filtering and scrolling a BETA target table of a million rows, without the widgets
+    import tempfile
+    import random
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark_uptarget.txt")
+        with open(path, 'w') as f:
+            f.write("#Chroms\ttxStart\ttxEnd\trefseqID\trank product\tStrands\tGeneSymbol\n")
+            for row in range(rows):
+                start = random.randrange(1, 200000000)
+                f.write(f"chr{random.randint(1, 22)}\t{start}\t{start + 5000}\tNM_{row:06d}\t{random.random():.6e}\t{random.choice('+-')}\tGENE{row}\n")
+
+        start = time.perf_counter()
+        table = beta_gui.ResultTable(path).load()
+        opened = time.perf_counter() - start
+        start = time.perf_counter()
+        order = table.sorted_order(4)
+        first_sort = time.perf_counter() - start
+        start = time.perf_counter()
+        table.sorted_order(4, descending=True)
+        resort = time.perf_counter() - start
+        start = time.perf_counter()
+        text_order = table.sorted_order(6)
+        text_sort = time.perf_counter() - start
+        start = time.perf_counter()
+        view = table.view(order, "GENE12345")
+        filtered = time.perf_counter() - start
+        start = time.perf_counter()
+        for first in random.sample(range(rows - visible), 100):
+            page = [table.row(row) for row in order[first:first + visible]]
+        scroll = (time.perf_counter() - start) / 100
+
+        ranks = [float(table.row(row)[4]) for row in order[::rows // 1000]]
+        correct = (table.rows == rows and table.header[0] == "Chroms" and ranks == sorted(ranks)
+                   and table.row(text_order[0])[6] <= table.row(text_order[-1])[6]
+                   and all("GENE12345" in table.row(row)[6] for row in view) and len(view) == 11 and len(page) == visible)
+        table.close()
+    print(f"{rows:,} rows: indexed in {opened * 1000:.0f} ms")
+    print(f"Sort on a number column: {first_sort * 1000:.0f} ms the first time, {resort * 1000:.0f} ms once its column index exists; text column {text_sort * 1000:.0f} ms")
+    print(f"Filter: {filtered * 1000:.0f} ms, {len(view)} matching rows")
+    print(f"Rendering a page of {visible} rows at a random scroll position: {scroll * 1000:.2f} ms")
+    print(f"Sorted and filtered rows are correct: {correct}")
+    return 0 if correct else 1
+
+def benchmark_logview(lines=10000000, visible=40):
+    # Opening and searching a large run log, without the widgets
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "BETA-benchmark.log")
+        with open(path, 'w') as f:
+            block = "".join(f"INFO : BETA-plus : Processing peak {line} of chromosome chr{line % 22 + 1}\n" for line in range(100000))
+            for _ in range(lines // 100000):
+                f.write(block)
+            f.write("ERROR : BETA-plus : the needle\n")
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        index = beta_gui.LogIndex(path)
+        index.update(beta_gui.LogIndex.chunk_bytes)
+        page = [index.line(number) for number in range(visible)]
+        first_window = time.perf_counter() - start
+        while not index.update(beta_gui.LogIndex.chunk_bytes):
+            pass
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        matches = index.search(r"ERROR : .*needle")
+        searched = time.perf_counter() - start
+        correct = index.lines == lines + 1 and len(matches) == 1 and index.line(int(matches[0])) == "ERROR : BETA-plus : the needle" and len(page) == visible
+
+        # Appending to the file is picked up without rereading it
+        with open(path, 'a') as f:
+            f.write("INFO : BETA-plus : one more line\n")
+        start = time.perf_counter()
+        index.update()
+        followed = time.perf_counter() - start
+        correct = correct and index.line(index.lines - 1) == "INFO : BETA-plus : one more line"
+        del index
+    print(f"Log of {size / 1e9:.2f} GB, {lines:,} lines: first {visible} lines shown after {first_window * 1000:.0f} ms, fully indexed in {indexed * 1000:.0f} ms")
+    print(f"Regex search of the whole log: {searched * 1000:.0f} ms")
+    print(f"Picking up an appended line: {followed * 1000:.1f} ms")
+    print(f"Lines and matches are correct: {correct}")
+    return 0 if correct else 1
+
+def benchmark_history(runs=100000):
+    # History queries the History tab makes, on a database of many runs
+    import tempfile
+    import random
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        history = beta_gui.RunHistory(os.path.join(directory, "history.sqlite"))
+        peak_files = [os.path.join(directory, f"peaks{number}.bed") for number in range(1000)]
+        with open(peak_files[0], 'w') as f:
+            f.write("chr1\t100\t200\n")
+        start = time.perf_counter()
+        def insert(connection):
+            for run in range(runs):
+                type = random.choice(["plus", "basic", "minus"])
+                run_id = connection.execute("INSERT INTO runs (type, genome, state, start, wall_seconds, peak_rss_bytes, params) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                            (type, random.choice(beta_gui.GENOME_OPTIONS), random.choice(["done", "done", "failed"]), time.time() - run,
+                                             random.uniform(60, 7200), random.randint(1 << 28, 1 << 33), json.dumps({"type": type}))).lastrowid
+                path = random.choice(peak_files)
+                connection.execute("INSERT INTO inputs VALUES (?, ?, ?, ?, ?)", (run_id, "peaks_file_path", path, 0, f"fingerprint of {path}"))
+        history.execute(insert)
+        filled = time.perf_counter() - start
+
+        timings = {}
+        for name, query in (("runs on a peak file", lambda: history.runs(path=peak_files[0])),
+                            ("recent plus runs on hg38", lambda: history.runs(type="plus", genome="hg38")),
+                            ("median wall time by type and genome", history.summary),
+                            ("parameters of a run", lambda: history.params(runs // 2))):
+            start = time.perf_counter()
+            result = query()
+            timings[name] = time.perf_counter() - start
+            print(f"{name}: {timings[name] * 1000:.1f} ms ({len(result) if result is not None else 0} rows)")
+    print(f"({runs:,} runs inserted in {filled:.1f} s)")
+    return 0 if max(timings.values()) < 1 else 1
+
+def python_minus_scores(genes, peak_chroms, peak_centres, distance):
+    # Regulatory potentials with plain Python loops over each TSS's window of peak centres, the reference for score_genes
+    import bisect
+    import math
+    centres = collections.defaultdict(list)
+    for chrom, centre in zip(peak_chroms, peak_centres.tolist()):
+        centres[chrom].append(centre)
+    for values in centres.values():
+        values.sort()
+    scores = []
+    for chrom, tss in zip(genes["chrom"], genes["tss"].tolist()):
+        values = centres.get(chrom, [])
+        score = 0.0
+        for centre in values[bisect.bisect_left(values, tss - distance):bisect.bisect_right(values, tss + distance)]:
+            score += math.exp(-(0.5 + 4 * abs(centre - tss) / distance))
+        scores.append(score)
+    return scores
+
+def benchmark_minus(peaks=100000, transcripts=40000, distance=100000):
+    # Native BETA minus on 100k peaks, against the same scoring in Python loops
+    import numpy as np
+    import random
+    import tempfile
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        reference_path = os.path.join(directory, "refGene.txt")
+        with open(reference_path, 'w') as f:
+            for number in range(transcripts):
+                start = random.randrange(1, 150000000)
+                end = start + random.randint(1000, 100000)
+                f.write(f"{number % 2000}\tNM_{number:06d}\tchr{random.randint(1, 22)}\t{random.choice('+-')}\t{start}\t{end}\t{start}\t{end}\t1\t{start},\t{end},\t0\tGENE{number // 2}\tcmpl\tcmpl\t0,\n")
+        peaks_path = os.path.join(directory, "peaks.bed")
+        with open(peaks_path, 'w') as f:
+            for number in range(peaks):
+                start = random.randrange(1, 150000000)
+                f.write(f"chr{random.randint(1, 22)}\t{start}\t{start + random.randint(200, 2000)}\tpeak{number}\t{random.randint(1, 1000)}\n")
+        argv = ["-p", peaks_path, "-r", reference_path, "--pn", str(peaks), "-d", str(distance), "-o", os.path.join(directory, "out"), "-n", "benchmark"]
+        beta_gui.RefGene.for_reference(reference_path, log=lambda message: None)
+
+        start = time.perf_counter()
+        beta_gui.native_minus(argv, log=lambda message: None)
+        native_run = time.perf_counter() - start
+        genes = beta_gui.RefGene.for_reference(reference_path).table()
+        chroms, centres = beta_gui.peak_centres(beta_gui.selected_peaks({"peaks_file_path": peaks_path, "peak_number": peaks}))
+        # Best of three, on the same parsed peak centres
+        native_scoring = python_scoring = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            scores, _ = beta_gui.score_genes(genes, chroms, centres, distance)
+            native_scoring = min(native_scoring, time.perf_counter() - start)
+            start = time.perf_counter()
+            reference = python_minus_scores(genes, chroms, centres, distance)
+            python_scoring = min(python_scoring, time.perf_counter() - start)
+        with open(os.path.join(directory, "out", "benchmark_targets.txt")) as f:
+            targets = sum(1 for line in f) - 1
+    same = np.allclose(scores, reference, rtol=1e-12, atol=1e-12)
+    print(f"{peaks:,} peaks, {transcripts:,} transcripts, {targets:,} targets")
+    print(f"Scoring: {native_scoring * 1000:.0f} ms with NumPy, {python_scoring * 1000:.0f} ms with Python loops ({python_scoring / native_scoring:.0f}x)")
+    print(f"Whole native run including reading peaks and writing both tables: {native_run:.2f} s")
+    print(f"Scores identical to the Python loops: {same}")
+    return 0 if same else 1
+
+def benchmark_basic(peaks=10000, transcripts=40000, distance=100000):
+    # Native BETA basic on 10k peaks and a DESeq2 table of 20k genes, half the up-regulated genes placed near peaks
+    import numpy as np
+    import random
+    import tempfile
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        reference_path = os.path.join(directory, "refGene.txt")
+        peak_lines, expression_lines = [], ["\tbaseMean\tlog2FoldChange\tlfcSE\tstat\tpvalue\tpadj\n"]
+        with open(reference_path, 'w') as f:
+            for number in range(transcripts):
+                chrom, start = f"chr{random.randint(1, 22)}", random.randrange(1, 150000000)
+                end = start + random.randint(1000, 100000)
+                strand = random.choice('+-')
+                f.write(f"{number % 2000}\tNM_{number:06d}\t{chrom}\t{strand}\t{start}\t{end}\t{start}\t{end}\t1\t{start},\t{end},\t0\tGENE{number // 2}\tcmpl\tcmpl\t0,\n")
+                if number % 2:
+                    continue
+                change = random.gauss(0, 1)
+                padj = random.random() if abs(change) < 1.5 else random.random() / 100
+                if change > 1.5 and random.random() < 0.5:
+                    tss = start if strand == '+' else end
+                    peak_start = max(1, tss + random.randint(-distance // 4, distance // 4))
+                    peak_lines.append(f"{chrom}\t{peak_start}\t{peak_start + 500}\n")
+                expression_lines.append(f"NM_{number:06d}\t100\t{change:.4f}\t0.2\t{change * 5:.4f}\t{padj / 10:.4g}\t{padj:.4g}\n")
+        while len(peak_lines) < peaks:
+            start = random.randrange(1, 150000000)
+            peak_lines.append(f"chr{random.randint(1, 22)}\t{start}\t{start + random.randint(200, 2000)}\n")
+        peaks_path, expression_path = os.path.join(directory, "peaks.bed"), os.path.join(directory, "deseq2.txt")
+        with open(peaks_path, 'w') as f:
+            f.writelines(f"{line.rstrip()}\tpeak{number}\t{random.randint(1, 1000)}\n" for number, line in enumerate(peak_lines))
+        with open(expression_path, 'w') as f:
+            f.writelines(expression_lines)
+        argv = ["-p", peaks_path, "-r", reference_path, "--pn", str(peaks), "-d", str(distance), "-o", os.path.join(directory, "out"), "-n", "benchmark",
+                "-e", expression_path, "-k", "O", "--info", "1,3,7", "--method", "score", "--df", "0.05", "--da", "0.5", "-c", "0.001"]
+        start = time.perf_counter()
+        beta_gui.RefGene.for_reference(reference_path, log=lambda message: None).table()
+        reference_read = time.perf_counter() - start
+        messages = []
+        start = time.perf_counter()
+        beta_gui.native_basic(argv, log=messages.append)
+        native_run = time.perf_counter() - start
+        start = time.perf_counter()
+        table = beta_gui.read_gene_scores(os.path.join(directory, "out", "benchmark_gene_scores.txt"))
+        table_read = time.perf_counter() - start
+        outputs = sorted(os.listdir(os.path.join(directory, "out")))
+    print(f"{peaks:,} peaks, {transcripts:,} transcripts, {len(table['score']):,} expression genes in the reference")
+    print(f"Reading and caching the refGene file: {reference_read:.2f} s (once per reference)")
+    print(f"Whole native run including the expression table, KS tests and all outputs: {native_run:.2f} s")
+    for message in messages[2:5]:
+        print(message)
+    print(f"Outputs: {', '.join(outputs)}")
+    # Re-thresholding the finished run, as the GUI does on every change of --df, --da or -c
+    rethreshold = {}
+    for thresholds in ((0.05, 0.5, 0.001), (0.01, 200, 0.01), (1, 1, 0.05)):
+        start = time.perf_counter()
+        prediction = beta_gui.predict_targets(table, *thresholds)
+        rethreshold[thresholds] = time.perf_counter() - start
+        print(f"Re-threshold --df {thresholds[0]} --da {thresholds[1]} -c {thresholds[2]}: {rethreshold[thresholds] * 1000:.1f} ms, "
+              f"{len(prediction['up']['targets']) if prediction['up']['significant'] else 0} up / {len(prediction['down']['targets']) if prediction['down']['significant'] else 0} down targets")
+    print(f"(reading benchmark_gene_scores.txt once: {table_read * 1000:.0f} ms)")
+    # The KS test of the up-regulated targets against all other genes, natively and by SciPy
+    rank = np.empty(len(table["score"]))
+    rank[np.argsort(-table["score"], kind='stable')] = np.arange(1, len(rank) + 1)
+    up = beta_gui.predict_targets(table, 0.05, 0.5, 0.001)["up"]["targets"]
+    statistic, pvalue = beta_gui.ks_greater(rank[up], np.delete(rank, up))
+    try:
+        from scipy import stats
+        reference = stats.ks_2samp(rank[up], np.delete(rank, up), alternative='greater')
+        print(f"Up-regulated targets against the rest: D = {statistic:.4f}, p = {pvalue:.3e}; SciPy D = {reference.statistic:.4f}, p = {reference.pvalue:.3e}")
+    except ImportError:
+        print(f"Up-regulated targets against the rest: D = {statistic:.4f}, p = {pvalue:.3e} (SciPy not installed to compare)")
+    return 0 if native_run < 1 and max(rethreshold.values()) < 0.1 else 1
+
+BENCHMARKS = {"basic": benchmark_basic, "cmd": benchmark_cmd, "minus": benchmark_minus, "history": benchmark_history, "logging": benchmark_logging, "logview": benchmark_logview, "results": benchmark_results, "startup": benchmark_startup}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Performance benchmarks of the BETA GUI.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), help="Benchmark to run.")
+    args = parser.parse_args()
+    sys.exit(BENCHMARKS[args.benchmark]())
@@ -1,11 +1,26 @@
 import os
+import signal
+import collections
+import re
+import json
+import shutil
+import sys
+import shlex
+import functools
+import codecs
+import locale
+import socket
+import argparse
+import heapq
+import itertools
 from datetime import datetime
 import subprocess
 import threading
+import time
 import logging
 import queue
 import tkinter as tk
-from tkinter import ttk, filedialog
+from tkinter import ttk, filedialog, messagebox
 
 # ===================================================================== #
 # Tooltip class
@@ -34,87 +49,3287 @@ class ToolTip:
             self.tooltip_window.destroy()
             self.tooltip_window = None
 
+# ===================================================================== #
+# Command construction
+# ===================================================================== #
+GENOME_OPTIONS = ["Other", "hg38", "hg19", "hg18", "mm10", "mm9"]
+KIND_OPTIONS = {"DESeq2": "O", "Limma": "LIM", "EdgeR": "O", "Cuffdiff": "CUF", "BETA-Specific Format": "BSF", "Other": "O"}
+# Default (gene ID, logFC, FDR) columns for each kind of expression file
+KIND_INFO_DEFAULTS = {"DESeq2": (1, 3, 7), "Limma": (1, 2, 6), "EdgeR": (1, 2, 5), "Cuffdiff": (2, 10, 13), "BETA-Specific Format": (1, 2, 3), "Other": (1, 2, 3)}
+METHOD_OPTIONS = ['score', 'distance']
+
+DEFAULT_PARAMS = {
+    "genome": "Other",
+    "reference_file_path": "",
+    "bl": False,
+    "peak_number": "10000",
+    "distance": "100000",
+    "output_path": "./",
+    "name_prefix": "",
+    "boundary_file_path": "",
+    "peaks_file_path": "",
+    "gname2": False,
+    "expression_file_path": "",
+    "kind": "DESeq2",
+    "method": "score",
+    "fdr": "1",
+    "gene_amount": "0.5",
+    "pvalue_cutoff": "0.001",
+    "genome_sequence_file_path": "",
+    "number_motifs": "10",
+    "preselect_peaks": False,
+    "preselect_column": "score",
+    "window_genome": False,
+    "subset_reference": False,
+    "tss_filter": False,
+    "engine": "BETA",
+}
+# "native" runs BETA minus or basic with the NumPy engine of this script instead of BETA itself
+ENGINE_OPTIONS = ["BETA", "native"]
+NATIVE_TYPES = ("minus", "basic")
+
+# Entries fire a variable trace per keystroke, the command is rebuilt once typing pauses this long
+CMD_UPDATE_DELAY_MS = 150
+
+def build_argv(params):
+    # Same command line for the GUI tabs and batch mode, params as returned by BetaFrame.get_params.
+    # Memoized on the parameter tuple, so an unchanged form costs one dict lookup
+    return build_argv_from_items(tuple(params.items()))
+
+@functools.lru_cache(maxsize=256)
+def build_argv_from_items(items):
+    params = dict(items)
+    type = params["type"]
+    argv = ["BETA", type]
+    if type in NATIVE_TYPES and params.get("engine") == "native":
+        argv = [sys.executable, os.path.abspath(__file__), "--native", type]
+    if params.get("genome"):
+        if params["genome"] != 'Other':
+            argv += ["-g", str(params['genome'])]
+        else:
+            if params.get("reference_file_path"):
+                argv += ["-r", str(params['reference_file_path'])]
+    if params.get("bl"):
+        argv.append("--bl")
+    if params.get("peak_number"):
+        argv += ["--pn", str(params['peak_number'])]
+    if params.get("distance"):
+        argv += ["-d", str(params['distance'])]
+    if params.get("output_path"):
+        argv += ["-o", str(params['output_path'])]
+    if params.get("name_prefix"):
+        argv += ["-n", '-'.join(params['name_prefix'].split())]
+    if params.get("boundary_file_path"):
+        argv += ["--bf", str(params['boundary_file_path'])]
+    if type != 'minus':
+        if params.get("gname2"):
+            argv.append("--gname2")
+        if params.get("expression_file_path"):
+            argv += ["-e", str(params['expression_file_path'])]
+        if params.get("kind"):
+            argv += ["-k", KIND_OPTIONS[params['kind']]]
+        if params.get("info_id") and params.get("info_change") and params.get("info_stat"):
+            argv += ["--info", f"{params['info_id']},{params['info_change']},{params['info_stat']}"]
+        if params.get("method"):
+            argv += ["--method", str(params['method'])]
+        if params.get("fdr"):
+            argv += ["--df", str(params['fdr'])]
+        if params.get("gene_amount"):
+            argv += ["--da", str(params['gene_amount'])]
+        if params.get("pvalue_cutoff"):
+            argv += ["-c", str(params['pvalue_cutoff'])]
+        if type != 'basic':
+            if params.get("genome_sequence_file_path"):
+                argv += ["--gs", str(params['genome_sequence_file_path'])]
+            if params.get("number_motifs"):
+                argv += ["--mn", str(params['number_motifs'])]
+    if params.get("peaks_file_path"):
+        argv += ["-p", str(params['peaks_file_path'])]
+    return tuple(argv)
+
+def build_cmd(params):
+    # Display form of build_argv, quoted so it can be pasted into a shell
+    return shlex.join(build_argv(params))
+
+# ===================================================================== #
+# Pre-flight file checks
+# ===================================================================== #
+MISSING_VALUES = (b"", b"NA", b"na", b"NaN", b"nan", b"-", b".")
+COMMENT_PREFIXES = (b"#", b"track", b"browser")
+
+def open_input(path):
+    # Binary reader for an input file, decompressing .gz files on the fly
+    if path.endswith(".gz"):
+        import gzip
+        return gzip.open(path, 'rb')
+    return open(path, 'rb', buffering=1 << 20)
+
+def is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+def scan_peaks_file(path, max_examples=5):
+    # Row and column counts of a BED/narrowPeak/broadPeak file and the lines BETA would choke on
+    report = {"path": path, "rows": 0, "columns": collections.Counter(), "skipped": 0, "bad_lines": 0, "examples": []}
+    columns = report["columns"]
+    with open_input(path) as f:
+        for number, line in enumerate(f, start=1):
+            fields = line.split()
+            if not fields or fields[0].startswith(COMMENT_PREFIXES):
+                report["skipped"] += 1
+                continue
+            report["rows"] += 1
+            columns[len(fields)] += 1
+            problem = None
+            if len(fields) < 3:
+                problem = "fewer than 3 columns"
+            elif not (fields[1].isdigit() and fields[2].isdigit()):
+                problem = "header row" if number == 1 else "start/end are not integers"
+            elif int(fields[2]) < int(fields[1]):
+                problem = "end before start"
+            elif len(fields) >= 5 and not is_number(fields[4]):
+                problem = "score (column 5) is not numeric"
+            if problem:
+                report["bad_lines"] += 1
+                if len(report["examples"]) < max_examples:
+                    report["examples"].append((number, problem))
+    return report
+
+def scan_expression_file(path):
+    # Per-column counts of numeric and non-numeric values so any --info choice can be checked without rescanning
+    report = {"path": path, "rows": 0, "columns": collections.Counter(), "non_numeric": collections.Counter(), "first_non_numeric": {}, "missing": collections.Counter()}
+    columns = report["columns"]
+    non_numeric = report["non_numeric"]
+    first_non_numeric = report["first_non_numeric"]
+    with open_input(path) as f:
+        for number, line in enumerate(f, start=1):
+            fields = line.rstrip(b'\r\n').split(b'\t')
+            if fields == [b""]:
+                continue
+            report["rows"] += 1
+            columns[len(fields)] += 1
+            for column, value in enumerate(fields, start=1):
+                if value.strip() in MISSING_VALUES:
+                    report["missing"][column] += 1
+                elif not is_number(value):
+                    non_numeric[column] += 1
+                    first_non_numeric.setdefault(column, number)
+    return report
+
+def check_peaks_report(report):
+    problems = []
+    if report["rows"] == 0:
+        problems.append("no peaks found")
+    if report["bad_lines"]:
+        examples = ", ".join(f"line {number}: {problem}" for number, problem in report["examples"])
+        problems.append(f"{report['bad_lines']} bad lines ({examples})")
+    return problems
+
+def check_expression_report(report, info_id, info_change, info_stat):
+    problems = []
+    if report["rows"] == 0:
+        return ["no rows found"]
+    min_columns = min(report["columns"])
+    for name, column in (("gene ID", info_id), ("logFC", info_change), ("FDR", info_stat)):
+        if not column.isdigit() or int(column) < 1:
+            problems.append(f"{name} column is not set")
+        elif int(column) > min_columns:
+            short_rows = sum(count for columns, count in report["columns"].items() if columns < int(column))
+            problems.append(f"{name} column {column} missing in {short_rows} rows")
+    for name, column in (("logFC", info_change), ("FDR", info_stat)):
+        if column.isdigit() and int(column) in report["non_numeric"]:
+            column = int(column)
+            if report["first_non_numeric"][column] == 1 and report["non_numeric"][column] == 1:
+                problems.append("header row detected (line 1 is not numeric), remove it")
+            else:
+                problems.append(f"{name} column {column} is not numeric in {report['non_numeric'][column]} rows (first at line {report['first_non_numeric'][column]})")
+    return list(dict.fromkeys(problems))
+
+def describe_columns(report):
+    return "/".join(str(columns) for columns, _ in report["columns"].most_common(3)) or "0"
+
+# ===================================================================== #
+# Preprocessing stages
+# ===================================================================== #
+CACHE_ROOT = os.environ.get("BETA_CACHE_ROOT", os.path.join(os.path.expanduser("~"), ".cache", "beta-gui"))
+# Rank columns (0-based) for the peak pre-selection, BETA itself ranks by column 5
+PEAK_SCORE_COLUMNS = {"score": 4, "signalValue": 6, "pValue": 7}
+
+def top_peaks(path, peak_number, column=PEAK_SCORE_COLUMNS["score"]):
+    # Streaming top-N by the given column, returns (peaks in rank order, number of peaks ranked, lines skipped).
+    # Header lines and rows without integer start/end or a numeric score (e.g. ".") are skipped and counted
+    skipped = 0
+    def peaks():
+        nonlocal skipped
+        with open_input(path) as f:
+            for number, line in enumerate(f):
+                fields = line.split()
+                if len(fields) <= column or fields[0].startswith(COMMENT_PREFIXES):
+                    continue
+                try:
+                    score = float(fields[column])
+                except ValueError:
+                    score = float("nan")
+                if score != score or not (fields[1].isdigit() and fields[2].isdigit()):
+                    skipped += 1
+                    continue
+                # Ties keep file order, like the stable sort BETA uses
+                yield score, -number, fields
+
+    total = 0
+    def counted(iterable):
+        nonlocal total
+        for item in iterable:
+            total += 1
+            yield item
+
+    top = heapq.nlargest(peak_number, counted(peaks()), key=lambda peak: (peak[0], peak[1]))
+    return top, total, skipped
+
+def selected_peaks(params):
+    # Fields of the peaks BETA keeps with --pn, best first
+    peak_number = int(params.get("peak_number") or 0)
+    top, _, _ = top_peaks(params["peaks_file_path"], peak_number) if peak_number else ([], 0, 0)
+    if top:
+        return [fields for _, _, fields in top]
+    # Peaks without a score column, BETA keeps them in file order
+    with open_input(params["peaks_file_path"]) as f:
+        rows = [line.split() for line in f]
+    rows = [fields for fields in rows if len(fields) >= 3 and not fields[0].startswith(COMMENT_PREFIXES)]
+    return rows[:peak_number] if peak_number else rows
+
+def select_top_peaks(params, workdir, log):
+    # Keep only the --pn best peaks so BETA parses and sorts a small 5-column file
+    if not params.get("preselect_peaks") or not params.get("peak_number") or not params.get("peaks_file_path"):
+        return params
+    peak_number = int(params["peak_number"])
+    column_name = params.get("preselect_column", "score")
+    start = time.perf_counter()
+
+    top, total, skipped = top_peaks(params["peaks_file_path"], peak_number, PEAK_SCORE_COLUMNS[column_name])
+    if skipped:
+        log(f"Peak pre-selection ignored {skipped} lines without integer start/end or a numeric {column_name}, e.g. header rows or '.' scores.")
+    if total <= peak_number:
+        log(f"Peak pre-selection skipped: {total} peaks with a {column_name} column, no more than --pn {peak_number}.")
+        return params
+
+    selected_path = os.path.join(workdir, "top_peaks.bed")
+    with open(selected_path, 'wb') as f:
+        for score, number, fields in top:
+            name = fields[3] if len(fields) > 3 else f"peak{-number + 1}".encode()
+            f.write(b"\t".join((fields[0], fields[1], fields[2], name, repr(score).encode())) + b"\n")
+    log(f"Pre-selected the top {len(top)} of {total} peaks by {column_name} in {time.perf_counter() - start:.1f}s.")
+    return dict(params, peaks_file_path=selected_path)
+
+class FastaIndex:
+    # samtools-compatible .fai index: name -> (length, offset, bases per line, bytes per line)
+    loaded = {}
+    loaded_lock = threading.Lock()
+
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def for_fasta(cls, fasta_path, log=print):
+        # Shared by all runs of this process, built once and cached on disk for other processes
+        import hashlib
+        stat = os.stat(fasta_path)
+        signature = (os.path.abspath(fasta_path), stat.st_size, stat.st_mtime_ns)
+        with cls.loaded_lock:
+            if signature in cls.loaded:
+                return cls.loaded[signature]
+            index_path = fasta_path + ".fai"
+            if not (os.path.exists(index_path) and os.path.getmtime(index_path) >= stat.st_mtime):
+                index_dir = os.path.join(CACHE_ROOT, "fai")
+                index_path = os.path.join(index_dir, hashlib.blake2b(repr(signature).encode(), digest_size=16).hexdigest() + ".fai")
+                if not os.path.exists(index_path):
+                    log(f"Indexing {os.path.basename(fasta_path)}, this is done once per genome file...")
+                    os.makedirs(index_dir, exist_ok=True)
+                    cls.build(fasta_path, index_path)
+            cls.loaded[signature] = cls.read(index_path)
+            return cls.loaded[signature]
+
+    @classmethod
+    def build(cls, fasta_path, index_path):
+        entries = []
+        name = None
+        with open(fasta_path, 'rb', buffering=1 << 20) as f:
+            offset = 0
+            for line in f:
+                if line.startswith(b">"):
+                    if name is not None:
+                        entries.append((name, length, seq_offset, line_bases, line_bytes))
+                    name = line[1:].split()[0].decode()
+                    length, seq_offset, line_bases, line_bytes = 0, offset + len(line), 0, 0
+                elif name is not None:
+                    bases = len(line.rstrip(b"\r\n"))
+                    if line_bases == 0:
+                        line_bases, line_bytes = bases, len(line)
+                    length += bases
+                offset += len(line)
+        if name is not None:
+            entries.append((name, length, seq_offset, line_bases, line_bytes))
+        with open(index_path + ".tmp", 'w') as f:
+            for entry in entries:
+                f.write("\t".join(map(str, entry)) + "\n")
+        os.replace(index_path + ".tmp", index_path)
+
+    @classmethod
+    def read(cls, index_path):
+        records = collections.OrderedDict()
+        with open(index_path) as f:
+            for line in f:
+                name, length, offset, line_bases, line_bytes = line.split("\t")[:5]
+                records[name] = (int(length), int(offset), int(line_bases), int(line_bytes))
+        return cls(records)
+
+    def fetch(self, sequence, name, start, end):
+        # Bases [start, end) of a record from the memory-mapped FASTA, newlines removed
+        length, offset, line_bases, line_bytes = self.records[name]
+        start, end = max(0, start), min(end, length)
+        # An empty record has no line length to compute offsets with
+        if end <= start or not line_bases:
+            return b""
+        first = offset + start // line_bases * line_bytes + start % line_bases
+        last = offset + end // line_bases * line_bytes + end % line_bases
+        return sequence[first:last].translate(None, b"\r\n")
+
+def merge_windows(peaks, distance):
+    # Sorted, non-overlapping [start, end) windows per chromosome around each peak
+    windows = collections.defaultdict(list)
+    for chrom, start, end in peaks:
+        windows[chrom].append((max(0, start - distance), end + distance))
+    merged = {}
+    for chrom, intervals in windows.items():
+        intervals.sort()
+        result = [list(intervals[0])]
+        for start, end in intervals[1:]:
+            if start <= result[-1][1]:
+                result[-1][1] = max(result[-1][1], end)
+            else:
+                result.append([start, end])
+        merged[chrom] = result
+    return merged
+
+# Windowed genome sequences kept in the cache, the least recently used beyond this are deleted
+WINDOWED_GENOME_CACHE_ENTRIES = 8
+# Cached path -> work directories of prepared runs still reading it, and a lock per path held while it is written
+windowed_genome_users = collections.defaultdict(set)
+windowed_genome_locks = {}
+windowed_genome_lock = threading.Lock()
+
+def evict_windowed_genomes(cache_dir):
+    # Each is nearly as large as the genome, keep only the most recently used ones and any a prepared run still reads
+    with windowed_genome_lock:
+        in_use = {path for path, users in windowed_genome_users.items() if users}
+        cached = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith(".fa")), key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in cached[WINDOWED_GENOME_CACHE_ENTRIES:]:
+            if entry.path in in_use:
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+def release_windowed_genomes(workdir):
+    # Called by remove_workdir, the cached copies read by runs prepared in workdir may be evicted again
+    workdir = os.path.join(workdir, "")
+    with windowed_genome_lock:
+        for path, users in list(windowed_genome_users.items()):
+            users.difference_update({user for user in users if os.path.join(user, "").startswith(workdir)})
+            if not users:
+                del windowed_genome_users[path]
+
+def window_genome_sequence(params, workdir, log, line_width=60):
+    # Hand BETA plus a FASTA holding only the sequence within -d of the selected peaks. Kept with the other caches
+    # by genome file and windows, so reruns and sweeps over the same peaks and distance write it once
+    if params.get("type") != "plus" or not params.get("window_genome") or not params.get("genome_sequence_file_path") or not params.get("peaks_file_path"):
+        return params
+    import hashlib
+    start_time = time.perf_counter()
+    fasta_path = params["genome_sequence_file_path"]
+    index = FastaIndex.for_fasta(fasta_path, log)
+    distance = int(params.get("distance") or 0)
+    peaks = [(fields[0].decode(), int(fields[1]), int(fields[2])) for fields in selected_peaks(params)]
+    windows = merge_windows(peaks, distance)
+    stat = os.stat(fasta_path)
+    signature = (os.path.abspath(fasta_path), stat.st_size, stat.st_mtime_ns, line_width, sorted(windows.items()))
+    cache_dir = os.path.join(CACHE_ROOT, "windows")
+    windowed_path = os.path.join(cache_dir, hashlib.blake2b(repr(signature).encode(), digest_size=16).hexdigest() + ".fa")
+
+    # Marked as read by this run before it is looked up, so eviction by other runs leaves it alone
+    with windowed_genome_lock:
+        windowed_genome_users[windowed_path].add(workdir)
+        path_lock = windowed_genome_locks.setdefault(windowed_path, threading.Lock())
+    with path_lock:
+        if os.path.exists(windowed_path):
+            os.utime(windowed_path)
+            log(f"Reusing the genome sequence around {len(peaks)} peaks (+/- {distance} bp) extracted by an earlier run.")
+            bases_read = None
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            temporary_path = f"{windowed_path}.{os.getpid()}.tmp"
+            try:
+                bases_read = write_windowed_genome(fasta_path, index, windows, temporary_path, line_width)
+                os.replace(temporary_path, windowed_path)
+            except BaseException:
+                try:
+                    os.remove(temporary_path)
+                except OSError:
+                    pass
+                raise
+    evict_windowed_genomes(cache_dir)
+    # A hard link in the run's work directory also keeps the file for BETA if another process evicts it
+    linked_path = os.path.join(workdir, "genome_windows.fa")
+    try:
+        os.link(windowed_path, linked_path)
+    except OSError:
+        linked_path = windowed_path
+    if bases_read is not None:
+        total_bases = sum(record[0] for record in index.records.values())
+        log(f"Extracted {bases_read:,} of {total_bases:,} genome bases around {len(peaks)} peaks (+/- {distance} bp) in {time.perf_counter() - start_time:.1f}s.")
+    return dict(params, genome_sequence_file_path=linked_path)
+
+def write_windowed_genome(fasta_path, index, windows, out_path, line_width):
+    # Coordinates must stay genomic, so bases outside the windows are written as N and
+    # each chromosome ends at its last window, chromosomes without peaks are left out. Returns the bases read
+    import mmap
+    bases_read = 0
+    with open(fasta_path, 'rb') as fasta, open(out_path, 'wb') as out:
+        sequence = mmap.mmap(fasta.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for name in index.records:
+                if name not in windows:
+                    continue
+                length = index.records[name][0]
+                out.write(f">{name}\n".encode())
+                line = bytearray()
+                position = 0
+                for start, end in windows[name]:
+                    end = min(end, length)
+                    if end <= start:
+                        continue
+                    bases_read += end - start
+                    # Written in pieces of at most 1 Mb so large gaps and windows never sit in memory whole
+                    pieces = [b"N" * min(piece, 1 << 20) for piece in range(start - position, 0, -(1 << 20))]
+                    pieces = itertools.chain(pieces, (index.fetch(sequence, name, piece, min(piece + (1 << 20), end)) for piece in range(start, end, 1 << 20)))
+                    position = end
+                    for piece in pieces:
+                        line += piece
+                        full = len(line) // line_width * line_width
+                        if full:
+                            out.write(b"\n".join(line[i:i + line_width] for i in range(0, full, line_width)) + b"\n")
+                            del line[:full]
+                if line:
+                    out.write(bytes(line) + b"\n")
+        finally:
+            sequence.close()
+    return bases_read
+
+class RefGene:
+    # UCSC refGene table as (RefSeq name, gene symbol, line), sorted by chromosome and TSS without duplicate transcripts
+    loaded = {}
+    loaded_lock = threading.Lock()
+
+    def __init__(self, transcripts):
+        self.transcripts = transcripts
+        self.tss = None
+        self.columns = None
+
+    @classmethod
+    def for_reference(cls, reference_path, log=print):
+        # Shared by all runs of this process, parsed once and cached on disk for other processes
+        import hashlib
+        stat = os.stat(reference_path)
+        signature = (os.path.abspath(reference_path), stat.st_size, stat.st_mtime_ns)
+        with cls.loaded_lock:
+            if signature in cls.loaded:
+                return cls.loaded[signature]
+            cache_dir = os.path.join(CACHE_ROOT, "refgene")
+            cache_path = os.path.join(cache_dir, hashlib.blake2b(repr(signature).encode(), digest_size=16).hexdigest() + ".txt")
+            if not os.path.exists(cache_path):
+                log(f"Sorting {os.path.basename(reference_path)}, this is done once per reference file...")
+                os.makedirs(cache_dir, exist_ok=True)
+                cls.build(reference_path, cache_path)
+            cls.loaded[signature] = cls.read(cache_path)
+            return cls.loaded[signature]
+
+    @staticmethod
+    def parse(line):
+        # (chromosome, TSS, name, symbol) of a refGene line, with or without the leading bin column
+        fields = line.rstrip(b"\r\n").split(b"\t")
+        offset = 1 if len(fields) > 3 and fields[3] in (b"+", b"-") else 0
+        name, chrom, strand, tx_start, tx_end = fields[offset:offset + 5]
+        symbol = fields[offset + 11] if len(fields) > offset + 11 else name
+        return chrom, int(tx_start) if strand == b"+" else int(tx_end), name, symbol
+
+    @classmethod
+    def build(cls, reference_path, cache_path):
+        rows = {}
+        with open_input(reference_path) as f:
+            for line in f:
+                if not line.strip() or line.startswith(COMMENT_PREFIXES):
+                    continue
+                chrom, tss, _, _ = cls.parse(line)
+                # Identical transcripts listed twice would be scored twice
+                rows.setdefault(line.rstrip(b"\r\n") + b"\n", (chrom, tss))
+        with open(cache_path + ".tmp", 'wb') as f:
+            f.writelines(sorted(rows, key=rows.__getitem__))
+        os.replace(cache_path + ".tmp", cache_path)
+
+    @classmethod
+    def read(cls, cache_path):
+        transcripts = []
+        with open(cache_path, 'rb') as f:
+            for line in f:
+                _, _, name, symbol = cls.parse(line)
+                transcripts.append((name, symbol, line))
+        return cls(transcripts)
+
+    def tss_by_chromosome(self):
+        # Sorted TSS positions per chromosome, built on first use
+        import numpy as np
+        with self.loaded_lock:
+            if self.tss is None:
+                positions = collections.defaultdict(list)
+                for _, _, line in self.transcripts:
+                    chrom, tss, _, _ = self.parse(line)
+                    positions[chrom].append(tss)
+                self.tss = {chrom: np.sort(np.array(values, dtype=np.int64)) for chrom, values in positions.items()}
+            return self.tss
+
+    def table(self):
+        # Columns of every transcript as lists and arrays, built on first use
+        import numpy as np
+        with self.loaded_lock:
+            if self.columns is None:
+                chroms, starts, ends, strands, tss = [], [], [], [], []
+                for _, _, line in self.transcripts:
+                    fields = line.rstrip(b"\r\n").split(b"\t")
+                    offset = 1 if len(fields) > 3 and fields[3] in (b"+", b"-") else 0
+                    chroms.append(fields[offset + 1])
+                    strands.append(fields[offset + 2])
+                    starts.append(int(fields[offset + 3]))
+                    ends.append(int(fields[offset + 4]))
+                    tss.append(starts[-1] if strands[-1] == b"+" else ends[-1])
+                self.columns = {"chrom": chroms, "start": np.array(starts, dtype=np.int64), "end": np.array(ends, dtype=np.int64), "strand": strands,
+                                "name": [transcript[0] for transcript in self.transcripts], "symbol": [transcript[1] for transcript in self.transcripts],
+                                "tss": np.array(tss, dtype=np.int64)}
+            return self.columns
+
+    def subset(self, gene_ids, by_symbol=False):
+        # Lines of the transcripts named in gene_ids, by RefSeq name or (--gname2) gene symbol
+        column = 1 if by_symbol else 0
+        return [transcript[2] for transcript in self.transcripts if transcript[column] in gene_ids]
+
+def expression_gene_ids(path, info_id):
+    # Gene IDs in the given 1-based column of the expression file, a header name simply matches nothing
+    column = int(info_id) - 1
+    gene_ids = set()
+    with open_input(path) as f:
+        for line in f:
+            if line.startswith(COMMENT_PREFIXES):
+                continue
+            fields = line.rstrip(b"\r\n").split(b"\t")
+            if len(fields) > column:
+                gene_ids.add(fields[column].strip().strip(b'"'))
+    return gene_ids
+
+def filter_peaks_by_tss(params, workdir, log):
+    # Drop selected peaks with no TSS within -d bp, they add nothing to any gene's regulatory potential
+    if not params.get("tss_filter") or not params.get("peaks_file_path"):
+        return params
+    if params.get("genome") != "Other" or not params.get("reference_file_path"):
+        log("TSS distance filter skipped: it needs the refGene file of genome Other.")
+        return params
+    import numpy as np
+    start = time.perf_counter()
+    tss = RefGene.for_reference(params["reference_file_path"], log).tss_by_chromosome()
+    distance = int(params.get("distance") or 0)
+    # Applied after the --pn selection, so BETA ranks exactly the peaks it would have kept
+    peaks = selected_peaks(params)
+    keep = np.zeros(len(peaks), dtype=bool)
+    by_chromosome = collections.defaultdict(list)
+    for number, fields in enumerate(peaks):
+        by_chromosome[fields[0]].append(number)
+    for chrom, numbers in by_chromosome.items():
+        positions = tss.get(chrom)
+        if positions is None or not len(positions):
+            continue
+        numbers = np.array(numbers)
+        starts = np.array([int(peaks[number][1]) for number in numbers], dtype=np.int64)
+        ends = np.array([int(peaks[number][2]) for number in numbers], dtype=np.int64)
+        # First TSS at or after start - d, the peak stays if it is no further than end + d
+        nearest = np.searchsorted(positions, starts - distance)
+        found = nearest < len(positions)
+        keep[numbers[found]] = positions[nearest[found]] <= ends[found] + distance
+    kept = int(keep.sum())
+    if kept == len(peaks) or kept == 0:
+        # An empty peak file would stop BETA, which handles the no-target case itself
+        log(f"TSS distance filter left the peaks unchanged, {kept} of {len(peaks)} lie within {distance} bp of a TSS.")
+        return params
+    filtered_path = os.path.join(workdir, "tss_peaks.bed")
+    with open(filtered_path, 'wb') as f:
+        f.writelines(b"\t".join(fields) + b"\n" for fields, keep_peak in zip(peaks, keep) if keep_peak)
+    log(f"TSS distance filter removed {len(peaks) - kept} of {len(peaks)} peaks farther than {distance} bp from any TSS in {time.perf_counter() - start:.2f}s.")
+    return dict(params, peaks_file_path=filtered_path)
+
+def subset_reference(params, workdir, log):
+    # Hand BETA basic/plus a refGene holding only the transcripts of genes in the expression file
+    if params.get("type") not in ("basic", "plus") or not params.get("subset_reference") or params.get("genome") != "Other":
+        return params
+    if not params.get("reference_file_path") or not params.get("expression_file_path") or not str(params.get("info_id") or "").isdigit():
+        return params
+    start = time.perf_counter()
+    refgene = RefGene.for_reference(params["reference_file_path"], log)
+    gene_ids = expression_gene_ids(params["expression_file_path"], params["info_id"])
+    by_symbol = bool(params.get("gname2"))
+    lines = refgene.subset(gene_ids, by_symbol)
+    if not lines:
+        log(f"Reference subsetting skipped: no gene ID of the expression file is a {'gene symbol' if by_symbol else 'RefSeq name'} of the reference.")
+        return params
+    subset_path = os.path.join(workdir, "refgene_subset.txt")
+    with open(subset_path, 'wb') as f:
+        f.writelines(lines)
+    log(f"Kept {len(lines)} of {len(refgene.transcripts)} reference transcripts matching the expression file in {time.perf_counter() - start:.2f}s.")
+    return dict(params, reference_file_path=subset_path)
+
+decompress_lock = threading.Lock()
+
+def decompressed_copy(path, log=print):
+    # Plain copy of a .gz file for readers that seek, made once and kept with the other caches
+    import gzip
+    import hashlib
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    copy_dir = os.path.join(CACHE_ROOT, "decompressed")
+    copy_path = os.path.join(copy_dir, hashlib.blake2b(repr(signature).encode(), digest_size=16).hexdigest() + "-" + os.path.basename(path)[:-3])
+    with decompress_lock:
+        if not os.path.exists(copy_path):
+            log(f"Decompressing {os.path.basename(path)}, this is done once per file...")
+            os.makedirs(copy_dir, exist_ok=True)
+            with gzip.open(path, 'rb') as source, open(copy_path + ".tmp", 'wb') as out:
+                shutil.copyfileobj(source, out, 1 << 20)
+            os.replace(copy_path + ".tmp", copy_path)
+    return copy_path
+
+def decompress_genome_sequence(params, workdir, log):
+    # BETA plus and the genome windowing seek in the FASTA, a pipe will not do
+    path = params.get("genome_sequence_file_path") or ""
+    if params.get("type") != "plus" or not path.endswith(".gz"):
+        return params
+    return dict(params, genome_sequence_file_path=decompressed_copy(path, log))
+
+PREPROCESSING_STAGES = [select_top_peaks, filter_peaks_by_tss, subset_reference, decompress_genome_sequence, window_genome_sequence]
+# Parameters each stage reads, a sweep runs a stage once per distinct combination of them
+STAGE_INPUT_PARAMS = {
+    select_top_peaks: ("preselect_peaks", "peak_number", "peaks_file_path", "preselect_column"),
+    filter_peaks_by_tss: ("tss_filter", "peaks_file_path", "peak_number", "genome", "reference_file_path", "distance"),
+    subset_reference: ("type", "subset_reference", "genome", "reference_file_path", "expression_file_path", "info_id", "gname2"),
+    decompress_genome_sequence: ("type", "genome_sequence_file_path"),
+    window_genome_sequence: ("type", "window_genome", "genome_sequence_file_path", "peaks_file_path", "peak_number", "distance"),
+}
+
+# Inputs BETA reads front to back, compressed ones are streamed to it through named pipes
+STREAMED_INPUT_PARAMS = ("peaks_file_path", "expression_file_path", "reference_file_path", "boundary_file_path")
+# Decompression threads of each work directory, stopped when the directory is removed
+input_streams = collections.defaultdict(list)
+input_streams_lock = threading.Lock()
+
+def renew_fifo(fifo_path):
+    # Put a fresh pipe under the name, the reader of the old one keeps it until it is done
+    next_path = fifo_path + ".next"
+    os.mkfifo(next_path, 0o600)
+    os.replace(next_path, fifo_path)
+
+def feed_fifo(source_path, fifo_path, stop):
+    # Decompress into the pipe once per reader that opens it, BETA may read a file more than once. The open for
+    # writing blocks until a reader comes, then a fresh pipe takes the name: readers opening it later wait for
+    # their own copy, while this one reads to the end of the file (EOF) or leaves early (EPIPE)
+    import gzip
+    while not stop.is_set():
+        try:
+            with open(fifo_path, 'wb', buffering=0) as out:
+                if stop.is_set():
+                    return
+                renew_fifo(fifo_path)
+                try:
+                    with gzip.open(source_path, 'rb') as source:
+                        shutil.copyfileobj(source, out, 1 << 20)
+                except BrokenPipeError:
+                    # The reader closed the pipe early
+                    pass
+        except OSError:
+            return
+
+def stream_compressed_inputs(params, workdir, log, use_fifos=True):
+    # Hand BETA the decompressed content of .gz inputs, through a pipe or (on other machines) a copy in workdir
+    import gzip
+    for param in STREAMED_INPUT_PARAMS:
+        path = params.get(param) or ""
+        if not path.endswith(".gz"):
+            continue
+        target = os.path.join(workdir, os.path.basename(path)[:-3])
+        if use_fifos:
+            os.mkfifo(target, 0o600)
+            stop = threading.Event()
+            thread = threading.Thread(target=feed_fifo, args=(path, target, stop), daemon=True)
+            thread.start()
+            with input_streams_lock:
+                input_streams[workdir].append((target, stop, thread))
+            log(f"Streaming {os.path.basename(path)} to BETA through a named pipe.")
+        else:
+            with gzip.open(path, 'rb') as source, open(target, 'wb') as out:
+                shutil.copyfileobj(source, out, 1 << 20)
+            log(f"Decompressed {os.path.basename(path)} into the scratch directory.")
+        params = dict(params, **{param: target})
+    return params
+
+def remove_workdir(workdir):
+    # Release decompression threads still waiting for a reader, then delete the run's scratch files
+    with input_streams_lock:
+        streams = input_streams.pop(workdir, [])
+    for fifo_path, stop, thread in streams:
+        stop.set()
+        for _ in range(10):
+            if not thread.is_alive():
+                break
+            try:
+                # Opening the read end lets a writer blocked in open() return and see the stop flag
+                os.close(os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK))
+            except OSError:
+                break
+            thread.join(0.1)
+    release_windowed_genomes(workdir)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+def preprocess(params, log, scratch_dir=None):
+    # Run every enabled stage in a per-run scratch directory, the caller removes it with remove_workdir when the run ends
+    import tempfile
+    workdir = tempfile.mkdtemp(prefix="beta-run-", dir=scratch_dir)
+    try:
+        for stage in PREPROCESSING_STAGES:
+            params = stage(params, workdir, log)
+        # Named pipes only work for a BETA on this machine, a shared scratch directory means it runs elsewhere
+        params = stream_compressed_inputs(params, workdir, log, use_fifos=scratch_dir is None)
+    except Exception:
+        remove_workdir(workdir)
+        raise
+    return params, workdir
+
+def preprocess_sweep(jobs, log, scratch_dir=None):
+    # preprocess for the runs of a sweep in one scratch directory: each stage runs once per distinct combination of
+    # the parameters it reads, and compressed inputs are decompressed once instead of streamed to every run
+    import tempfile
+    workdir = tempfile.mkdtemp(prefix="beta-sweep-", dir=scratch_dir)
+    changes = {}
+    prepared = []
+    try:
+        for params in jobs:
+            for stage in PREPROCESSING_STAGES:
+                key = (stage,) + tuple(params.get(name) for name in STAGE_INPUT_PARAMS[stage])
+                if key not in changes:
+                    stage_dir = os.path.join(workdir, f"stage{len(changes)}")
+                    os.mkdir(stage_dir)
+                    result = stage(params, stage_dir, log)
+                    changes[key] = {name: value for name, value in result.items() if params.get(name) != value}
+                params = dict(params, **changes[key])
+            for param in STREAMED_INPUT_PARAMS:
+                path = params.get(param) or ""
+                if path.endswith(".gz"):
+                    if (param, path) not in changes:
+                        copy_dir = os.path.join(workdir, f"input{len(changes)}")
+                        os.mkdir(copy_dir)
+                        changes[(param, path)] = stream_compressed_inputs({param: path}, copy_dir, log, use_fifos=False)[param]
+                    params = dict(params, **{param: changes[(param, path)]})
+            prepared.append(params)
+    except Exception:
+        remove_workdir(workdir)
+        raise
+    return prepared, workdir
+
+# ===================================================================== #
+# Native BETA engine
+# ===================================================================== #
+# Default --info columns of each expression format (-k), as for the first kind with that format in the GUI
+KIND_CODE_INFO_DEFAULTS = {code: KIND_INFO_DEFAULTS[kind] for kind, code in reversed(list(KIND_OPTIONS.items()))}
+
+def native_parser(type):
+    # The options of "BETA minus" and "BETA basic" that build_argv writes, with BETA's defaults
+    descriptions = {"minus": "Regulatory potential of every gene from binding data alone, computed like BETA minus.",
+                    "basic": "Direct targets and activating/repressive function of a factor from binding and expression data, predicted like BETA basic."}
+    parser = argparse.ArgumentParser(prog=f"beta_gui.py --native {type}", description=descriptions[type])
+    parser.add_argument("-p", "--peakfile", required=True)
+    parser.add_argument("-g", "--genome")
+    parser.add_argument("-r", "--reference")
+    parser.add_argument("--pn", type=int, default=10000)
+    parser.add_argument("-d", "--distance", type=int, default=100000)
+    parser.add_argument("-o", "--output", default=".")
+    parser.add_argument("-n", "--name", default="NA")
+    parser.add_argument("--bl", action="store_true")
+    parser.add_argument("--bf")
+    if type == "basic":
+        parser.add_argument("-e", "--diff_expr", required=True)
+        parser.add_argument("-k", "--kind", choices=sorted(KIND_CODE_INFO_DEFAULTS), default="O")
+        parser.add_argument("--info")
+        parser.add_argument("--gname2", action="store_true")
+        parser.add_argument("--method", choices=METHOD_OPTIONS, default="score")
+        parser.add_argument("--df", type=float, default=1)
+        parser.add_argument("--da", type=float, default=0.5)
+        parser.add_argument("-c", "--cutoff", type=float, default=0.001)
+    return parser
+
+def peak_centres(peaks):
+    # Chromosomes and centre positions of peaks given as split BED lines
+    import numpy as np
+    return [fields[0] for fields in peaks], np.array([(int(fields[1]) + int(fields[2])) // 2 for fields in peaks], dtype=np.int64)
+
+def score_genes(genes, peak_chroms, centres, distance):
+    # Regulatory potential of each transcript, the sum of exp(-(0.5 + 4 * |peak centre - TSS| / distance))
+    # over the peak centres within distance of its TSS. Also returns the (transcript, peak, offset) pairs
+    import numpy as np
+    scores = np.zeros(len(genes["tss"]))
+    if not len(centres) or not len(scores):
+        return scores, (np.zeros(0, dtype=np.int64),) * 3
+    # Chromosome and position in one sortable key, so all chromosomes are searched at once
+    chrom_ids = {chrom: number for number, chrom in enumerate(set(peak_chroms).union(genes["chrom"]))}
+    peak_chroms = np.fromiter(map(chrom_ids.__getitem__, peak_chroms), dtype=np.int64, count=len(centres))
+    gene_chroms = np.fromiter(map(chrom_ids.__getitem__, genes["chrom"]), dtype=np.int64, count=len(scores))
+    shift = np.int64(1 << 40)
+    peak_keys = peak_chroms * shift + centres
+    numbers = np.argsort(peak_keys, kind='stable')
+    peak_keys = peak_keys[numbers]
+    gene_keys = gene_chroms * shift + genes["tss"]
+    # Each TSS sees the slice [first, last) of the sorted centres
+    first = np.searchsorted(peak_keys, gene_keys - distance, side='left')
+    last = np.searchsorted(peak_keys, gene_keys + distance, side='right')
+    counts = last - first
+    gene_index = np.repeat(np.arange(len(scores)), counts)
+    position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - first, counts)
+    offset = peak_keys[position] - gene_keys[gene_index]
+    scores += np.bincount(gene_index, np.exp(-(0.5 + 4 * np.abs(offset) / distance)), minlength=len(scores))
+    return scores, (gene_index, numbers[position], offset)
+
+def score_native_inputs(args, log):
+    # Transcripts, selected peaks and regulatory potentials for the shared options of minus and basic
+    if not args.reference:
+        raise ValueError("the native engine needs a refGene file (genome Other), BETA's built-in genome annotations are not available to it")
+    if args.bl or args.bf:
+        raise ValueError("the native engine does not support CTCF boundaries (--bl)")
+    if args.distance <= 0:
+        raise ValueError("the distance (-d) must be positive")
+    start = time.perf_counter()
+    genes = RefGene.for_reference(args.reference, log).table()
+    peaks = selected_peaks({"peaks_file_path": args.peakfile, "peak_number": args.pn})
+    log(f"Read {len(peaks)} peaks and {len(genes['tss'])} transcripts in {time.perf_counter() - start:.2f}s.")
+    scores, pairs = score_genes(genes, *peak_centres(peaks), args.distance)
+    return genes, peaks, scores, pairs
+
+def write_associated_peaks(path, genes, peaks, pairs, rows, distance):
+    # Peaks of the transcripts in rows, in that order, nearest first, distances signed along the transcript
+    import numpy as np
+    gene_index, peak_index, offset = pairs
+    rank = np.full(len(genes["tss"]), -1, dtype=np.int64)
+    rank[rows] = np.arange(len(rows))
+    keep = rank[gene_index] >= 0
+    gene_index, peak_index, offset = gene_index[keep], peak_index[keep], offset[keep]
+    signed = np.where(np.array(genes["strand"])[gene_index] == b"-", -offset, offset)
+    order = np.lexsort((np.abs(signed), rank[gene_index]))
+    gene_index, peak_index, signed = gene_index[order].tolist(), peak_index[order].tolist(), signed[order]
+    weights = np.exp(-(0.5 + 4 * np.abs(signed) / distance)).tolist()
+    names, symbols = genes["name"], genes["symbol"]
+    coordinates = {}
+    with open(path, 'w') as f:
+        f.write("#chrom\tpStart\tpEnd\trefseqID\tSymbol\tdistance\tscore\n")
+        for row, number, offset, weight in zip(gene_index, peak_index, signed.tolist(), weights):
+            if number not in coordinates:
+                coordinates[number] = b"\t".join(peaks[number][:3]).decode()
+            f.write(f"{coordinates[number]}\t{names[row].decode()}\t{symbols[row].decode()}\t{offset}\t{weight:.3f}\n")
+
+def native_minus(argv, log=print):
+    # BETA minus in NumPy: ranks transcripts by regulatory potential and writes NAME_targets.txt and NAME_targets_associated_peaks.txt
+    import numpy as np
+    args = native_parser("minus").parse_args(argv)
+    start = time.perf_counter()
+    genes, peaks, scores, pairs = score_native_inputs(args, log)
+    # Highest potential first, ties in annotation order
+    ranked = np.argsort(-scores, kind='stable')
+    ranked = ranked[scores[ranked] > 0]
+    log(f"Scored {len(ranked)} transcripts with peaks within {args.distance} bp of their TSS in {time.perf_counter() - start:.2f}s.")
+
+    os.makedirs(args.output, exist_ok=True)
+    targets_path = os.path.join(args.output, f"{args.name}_targets.txt")
+    chroms, names, strands, symbols = ([value.decode() for value in genes[column]] for column in ("chrom", "name", "strand", "symbol"))
+    starts, ends, score_values = genes["start"].tolist(), genes["end"].tolist(), scores.tolist()
+    with open(targets_path, 'w') as f:
+        f.write("#chroms\ttxStart\ttxEnd\trefseqID\tscore\tstrand\tSymbol\n")
+        f.writelines(f"{chroms[row]}\t{starts[row]}\t{ends[row]}\t{names[row]}\t{score_values[row]:.3f}\t{strands[row]}\t{symbols[row]}\n" for row in ranked.tolist())
+    peaks_path = os.path.join(args.output, f"{args.name}_targets_associated_peaks.txt")
+    write_associated_peaks(peaks_path, genes, peaks, pairs, ranked, args.distance)
+    log(f"Wrote {targets_path} and {peaks_path} in {time.perf_counter() - start:.2f}s.")
+    return 0
+
+def read_expression(path, info):
+    # Gene IDs, logFC and statistic from the 1-based --info columns of an expression table. Headers and rows
+    # without numbers there are skipped, a repeated gene ID keeps its first row
+    import numpy as np
+    columns = [int(column) - 1 for column in info.split(",") if column.strip().isdigit()]
+    if len(columns) != 3 or min(columns) < 0:
+        raise ValueError(f"--info needs three column numbers starting from 1, got '{info}'")
+    id_column, change_column, stat_column = columns
+    ids, changes, stats, seen = [], [], [], set()
+    with open_input(path) as f:
+        for line in f:
+            if line.startswith(COMMENT_PREFIXES):
+                continue
+            fields = line.rstrip(b"\r\n").split(b"\t")
+            if len(fields) <= max(columns):
+                continue
+            try:
+                change, stat = float(fields[change_column]), float(fields[stat_column])
+            except ValueError:
+                continue
+            gene_id = fields[id_column].strip().strip(b'"')
+            if change != change or stat != stat or gene_id in seen:
+                continue
+            seen.add(gene_id)
+            ids.append(gene_id)
+            changes.append(change)
+            stats.append(stat)
+    return ids, np.array(changes, dtype=float), np.array(stats, dtype=float)
+
+# Columns of NAME_gene_scores.txt, the per-gene table "beta_gui.py --native basic" writes next to BETA's outputs
+GENE_SCORE_COLUMNS = ("chroms", "txStart", "txEnd", "refseqID", "score", "strand", "Symbol", "distance", "logFC", "stat")
+
+def gene_score_table(genes, scores, pairs, ids, changes, stats, by_symbol=False):
+    # One row per expression gene found in the reference, for its transcript with the highest regulatory potential
+    # (then the nearest peak): the columns of GENE_SCORE_COLUMNS, distance inf without a peak within -d, and the
+    # transcript's row of the reference in "row"
+    import numpy as np
+    gene_index, _, offset = pairs
+    nearest = np.full(len(scores), np.inf)
+    np.minimum.at(nearest, gene_index, np.abs(offset).astype(float))
+    keys = genes["symbol" if by_symbol else "name"]
+    best = {}
+    for row in np.lexsort((nearest, -scores)).tolist():
+        best.setdefault(keys[row], row)
+    matched = [(number, best[gene_id]) for number, gene_id in enumerate(ids) if gene_id in best]
+    numbers = np.array([number for number, _ in matched], dtype=np.int64)
+    rows = np.array([row for _, row in matched], dtype=np.int64)
+    return {"chroms": [genes["chrom"][row].decode() for row in rows.tolist()], "txStart": genes["start"][rows], "txEnd": genes["end"][rows],
+            "refseqID": [genes["name"][row].decode() for row in rows.tolist()], "score": scores[rows], "strand": [genes["strand"][row].decode() for row in rows.tolist()],
+            "Symbol": [genes["symbol"][row].decode() for row in rows.tolist()], "distance": nearest[rows], "logFC": changes[numbers], "stat": stats[numbers], "row": rows}
+
+def write_gene_scores(path, table, key=None, source="native"):
+    # key: gene_scores_key of the run the table belongs to. source is "native" for the native engine's own run,
+    # "approximation" for a table computed natively for a run made by BETA
+    with open(path, 'w') as f:
+        if key is not None:
+            f.write(f"##key\t{key}\n##source\t{source}\n")
+        f.write("#" + "\t".join(GENE_SCORE_COLUMNS) + "\n")
+        columns = [table[column].tolist() if hasattr(table[column], "tolist") else table[column] for column in GENE_SCORE_COLUMNS]
+        for chrom, start, end, name, score, strand, symbol, distance, change, stat in zip(*columns):
+            # Numbers written exactly, so a re-thresholded run ranks ties as the run itself did
+            f.write(f"{chrom}\t{start}\t{end}\t{name}\t{score!r}\t{strand}\t{symbol}\t{'NA' if distance == float('inf') else int(distance)}\t{change!r}\t{stat!r}\n")
+
+def read_gene_scores(path):
+    # The table of write_gene_scores, as gene_score_table returns it, with its "key" (None if not stamped) and "source"
+    import numpy as np
+    columns = {column: [] for column in GENE_SCORE_COLUMNS}
+    metadata = {"key": None, "source": "native"}
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if line.startswith("##") and len(fields) == 2:
+                metadata[fields[0][2:]] = fields[1]
+                continue
+            if line.startswith("#") or len(fields) != len(GENE_SCORE_COLUMNS):
+                continue
+            for column, value in zip(GENE_SCORE_COLUMNS, fields):
+                columns[column].append(value)
+    for column in ("txStart", "txEnd"):
+        columns[column] = np.array(columns[column], dtype=np.int64)
+    for column in ("score", "logFC", "stat"):
+        columns[column] = np.array(columns[column], dtype=float)
+    columns["distance"] = np.array([float("inf") if value == "NA" else float(value) for value in columns["distance"]])
+    columns.update(metadata)
+    return columns
+
+# Largest product of sample sizes given SciPy's exact KS p value, about 10 ms
+KS_EXACT_MAX_PAIRS = 1000000
+
+def ks_greater(sample, background):
+    # One-sided two-sample KS test that sample tends to smaller values than background: (D+, p value). Like
+    # scipy.stats.ks_2samp(alternative='greater'): exact with SciPy (if installed) for small samples, where that takes
+    # milliseconds, otherwise Hodges' asymptotic p value, computed here so large inputs do not wait for SciPy
+    import numpy as np
+    if not len(sample) or not len(background):
+        return float("nan"), 1.0
+    if len(sample) * len(background) <= KS_EXACT_MAX_PAIRS:
+        try:
+            from scipy import stats
+            result = stats.ks_2samp(sample, background, alternative='greater')
+            return float(result.statistic), float(result.pvalue)
+        except ImportError:
+            pass
+    values = np.concatenate((sample, background))
+    difference = np.searchsorted(np.sort(sample), values, side='right') / len(sample) - np.searchsorted(np.sort(background), values, side='right') / len(background)
+    statistic = max(float(difference.max()), 0.0)
+    m, n = sorted((float(len(sample)), float(len(background))), reverse=True)
+    z = np.sqrt(m * n / (m + n)) * statistic
+    return statistic, float(np.clip(np.exp(-2 * z ** 2 - 2 * z * (m + 2 * n) / np.sqrt(m * n * (m + n)) / 3.0), 0, 1))
+
+def predict_targets(table, fdr, amount, cutoff, method="score"):
+    # Function prediction and direct targets of BETA basic from a gene score table. Up/down-regulated genes are
+    # those with logFC > 0 / < 0 and stat <= fdr, the top amount (a fraction if <= 1) by stat. The regulatory
+    # ranks of each group are KS-tested against the genes in neither group; a group with p < cutoff gets its
+    # genes with a peak within -d as targets, by rank product (regulatory rank / genes * expression rank / group size)
+    import numpy as np
+    score, distance, change, stat = table["score"], table["distance"], table["logFC"], table["stat"]
+    total = len(score)
+    rank = np.empty(total)
+    rank[np.argsort(distance if method == "distance" else -score, kind='stable')] = np.arange(1, total + 1)
+    groups = {}
+    selected = np.zeros(total, dtype=bool)
+    for group, sign in (("up", 1), ("down", -1)):
+        candidates = np.flatnonzero((np.sign(change) == sign) & (stat <= fdr))
+        candidates = candidates[np.lexsort((-np.abs(change[candidates]), stat[candidates]))]
+        count = int(len(candidates) * amount) if amount <= 1 else min(int(amount), len(candidates))
+        groups[group] = candidates[:count]
+        selected[groups[group]] = True
+    background = np.flatnonzero(~selected)
+    prediction = {"genes": total, "background": len(background)}
+    for group, members in groups.items():
+        statistic, pvalue = ks_greater(rank[members], rank[background])
+        product = rank[members] / total * np.arange(1, len(members) + 1) / max(len(members), 1)
+        bound = score[members] > 0
+        order = np.argsort(product[bound], kind='stable')
+        prediction[group] = {"genes": len(members), "statistic": statistic, "pvalue": pvalue, "significant": pvalue < cutoff,
+                             "targets": members[bound][order], "rank_product": product[bound][order]}
+    return prediction
+
+def describe_function(prediction):
+    # BETA's one-line function prediction: activating and/or repressive, or neither
+    functions = [function for group, function in (("up", "activating"), ("down", "repressive")) if prediction[group]["significant"]]
+    return f"The factor has {' and '.join(functions)} function." if functions else "Neither up- nor down-regulated genes are significantly closer to binding sites."
+
+def write_prediction(output, name, table, prediction):
+    # NAME_function_prediction.txt, and NAME_uptarget.txt / NAME_downtarget.txt for the significant groups; returns the paths written
+    path = os.path.join(output, f"{name}_function_prediction.txt")
+    with open(path, 'w') as f:
+        f.write("#group\tgenes\tks_statistic\tp_value\tfunction\n")
+        for group, function in (("up", "activating"), ("down", "repressive")):
+            result = prediction[group]
+            f.write(f"{group}\t{result['genes']}\t{result['statistic']:.4f}\t{result['pvalue']:.3e}\t{function if result['significant'] else 'NA'}\n")
+        f.write(f"background\t{prediction['background']}\tNA\tNA\tNA\n")
+    paths = [path]
+    for group in ("up", "down"):
+        result = prediction[group]
+        if not result["significant"]:
+            continue
+        path = os.path.join(output, f"{name}_{group}target.txt")
+        with open(path, 'w') as f:
+            f.write("#Chroms\ttxStart\ttxEnd\trefseqID\trank product\tStrands\tGeneSymbol\n")
+            for row, product in zip(result["targets"].tolist(), result["rank_product"].tolist()):
+                f.write(f"{table['chroms'][row]}\t{table['txStart'][row]}\t{table['txEnd'][row]}\t{table['refseqID'][row]}\t{product:.3e}\t{table['strand'][row]}\t{table['Symbol'][row]}\n")
+        paths.append(path)
+    return paths
+
+def check_thresholds(fdr, amount, cutoff):
+    if fdr < 0 or amount <= 0 or not 0 < cutoff <= 1:
+        raise ValueError("--df must be at least 0, --da positive and -c between 0 and 1")
+
+def native_gene_scores(args, log):
+    # Regulatory potentials as for minus, joined to the expression table: (transcripts, peaks, pairs, gene score table)
+    start = time.perf_counter()
+    ids, changes, stats = read_expression(args.diff_expr, args.info or ",".join(map(str, KIND_CODE_INFO_DEFAULTS[args.kind])))
+    genes, peaks, scores, pairs = score_native_inputs(args, log)
+    table = gene_score_table(genes, scores, pairs, ids, changes, stats, by_symbol=args.gname2)
+    if not len(table["score"]):
+        raise ValueError(f"none of the {len(ids)} gene IDs of {args.diff_expr} is a {'gene symbol' if args.gname2 else 'RefSeq name'} of the reference")
+    log(f"Scored {len(table['score'])} of {len(ids)} expression genes found in the reference in {time.perf_counter() - start:.2f}s.")
+    return genes, peaks, pairs, table
+
+def native_basic(argv, log=print):
+    # BETA basic in NumPy: function prediction and target tables from the gene score table, which is written
+    # too as NAME_gene_scores.txt to re-threshold the run without rescoring
+    args = native_parser("basic").parse_args(argv)
+    check_thresholds(args.df, args.da, args.cutoff)
+    start = time.perf_counter()
+    genes, peaks, pairs, table = native_gene_scores(args, log)
+    prediction = predict_targets(table, args.df, args.da, args.cutoff, args.method)
+    for group, label in (("up", "Up-regulated"), ("down", "Down-regulated")):
+        result = prediction[group]
+        log(f"{label} genes: {result['genes']}, one-sided KS test against {prediction['background']} others: D = {result['statistic']:.4f}, p = {result['pvalue']:.3e}")
+    log(describe_function(prediction))
+
+    os.makedirs(args.output, exist_ok=True)
+    scores_path = os.path.join(args.output, f"{args.name}_gene_scores.txt")
+    write_gene_scores(scores_path, table)
+    paths = [scores_path] + write_prediction(args.output, args.name, table, prediction)
+    for group in ("up", "down"):
+        if prediction[group]["significant"]:
+            paths.append(os.path.join(args.output, f"{args.name}_{group}target_associate_peaks.bed"))
+            write_associated_peaks(paths[-1], genes, peaks, pairs, table["row"][prediction[group]["targets"]], args.distance)
+    log(f"Wrote {', '.join(paths)} in {time.perf_counter() - start:.2f}s.")
+    return 0
+
+NATIVE_ENGINES = {"minus": native_minus, "basic": native_basic}
+
+def run_native(argv):
+    # Entry point of "beta_gui.py --native minus|basic ...", reports errors and exit codes like BETA
+    if not argv or argv[0] not in NATIVE_ENGINES:
+        print(f"The native engine implements BETA {' and '.join(NATIVE_ENGINES)} only.", file=sys.stderr)
+        return 2
+    try:
+        return NATIVE_ENGINES[argv[0]](argv[1:], log=lambda message: print(message, flush=True))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+# ===================================================================== #
+# Re-thresholding
+# ===================================================================== #
+# Parameters the gene scores of a basic or plus run depend on, thresholds and motif options left out
+SCORE_PARAMS = ("type", "engine", "genome", "reference_file_path", "bl", "boundary_file_path", "peaks_file_path", "peak_number", "distance",
+                "preselect_peaks", "preselect_column", "tss_filter", "subset_reference", "name_prefix",
+                "expression_file_path", "kind", "info_id", "info_change", "info_stat", "gname2")
+
+def gene_scores_path(params):
+    # NAME_gene_scores.txt of the run params describes
+    return os.path.join(params.get("output_path") or "./", f"{'-'.join(str(params.get('name_prefix') or '').split()) or 'NA'}_gene_scores.txt")
+
+def gene_scores_key(params, cache=None):
+    # Result cache key of the inputs and scoring parameters of a run, the same for the GUI form and a manifest row
+    cache = cache or ResultCache()
+    return cache.key({name: params.get(name, DEFAULT_PARAMS.get(name, "BETA" if name == "engine" else "")) for name in SCORE_PARAMS})
+
+def finish_gene_scores(params, cache=None, log=print):
+    # After a successful basic or plus run: its gene_scores_key, stamped into the native engine's NAME_gene_scores.txt.
+    # Callers keep it in the run's metrics record, which is how runs made by BETA are recognised (see finished_run_key)
+    if params.get("type") == "minus":
+        return None
+    try:
+        key = gene_scores_key(params, cache)
+        path = gene_scores_path(params)
+        if params.get("engine") == "native" and os.path.exists(path):
+            with open(path) as f:
+                lines = [line for line in f if not line.startswith("##")]
+            with open(path + ".tmp", 'w') as f:
+                f.write(f"##key\t{key}\n##source\tnative\n")
+                f.writelines(lines)
+            os.replace(path + ".tmp", path)
+    except OSError as e:
+        log(f"Could not fingerprint the run for re-thresholding: {e}")
+        return None
+    return key
+
+def finished_run_key(params):
+    # gene_scores_key of the last successful run named like params in its output directory, from BETA-metrics.jsonl
+    name = '-'.join(str(params.get("name_prefix") or "").split()) or "NA"
+    key = None
+    try:
+        with open(os.path.join(params.get("output_path") or "./", METRICS_FILE_NAME)) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("prefix") == name and record.get("type") == params.get("type") and record.get("state") in ("done", "cached"):
+                    key = record.get("scores_key")
+    except OSError:
+        return None
+    return key
+
+def load_gene_scores(params, log=print, cache=None, table=None):
+    # Gene score table of the finished basic or plus run params describes; table: one read earlier, checked again.
+    # A table computed for other inputs or scoring parameters (an earlier run under the same name) is refused.
+    # Runs made by BETA have none: once the run is known to have used params, it is approximated natively from
+    # its inputs and saved next to its outputs with source "approximation"
+    path = gene_scores_path(params)
+    key = gene_scores_key(params, cache)
+    if table is None and os.path.exists(path):
+        table = read_gene_scores(path)
+    if table is not None and table["key"] == key:
+        return table
+    name = os.path.basename(path)[:-len("_gene_scores.txt")]
+    if params.get("engine") != "native" and finished_run_key(params) == key:
+        if params.get("genome") != "Other" or params.get("bl"):
+            raise ValueError(f"Runs made by BETA are re-thresholded from gene scores computed here, which needs genome Other and no CTCF boundaries")
+        args = native_parser("basic").parse_args(build_argv(dict(params, type="basic", engine="native"))[4:])
+        log(f"Approximating the gene scores of the BETA run {name} natively...")
+        table = native_gene_scores(args, log)[3]
+        # Per thread, the GUI may compute the same table twice while the first is still being written
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        write_gene_scores(temporary, table, key, "approximation")
+        os.replace(temporary, path)
+        table.update(key=key, source="approximation")
+        return table
+    if table is not None:
+        raise ValueError(f"{os.path.basename(path)} belongs to a run with other input files or scoring parameters (-d, --pn, --info, --gname2, ...) than these. Set them back to the run's or run again")
+    raise ValueError(f"No finished run named {name} with these input files and scoring parameters (-d, --pn, --info, --gname2, ...) in {params.get('output_path') or './'}")
+
+def rethreshold_name(name, fdr, amount, cutoff):
+    # Prefix of the tables saved for new thresholds, e.g. NAME_df0.05_da0.5_c0.001, so they sit beside the original ones
+    return f"{name}_df{fdr:g}_da{amount:g}_c{cutoff:g}"
+
+def describe_targets(prediction, table=None):
+    # table: the gene score table, to say when the numbers only approximate a run made by BETA
+    lines = []
+    if table is not None and table.get("source") == "approximation":
+        lines.append("Approximation: gene scores computed natively for a run made by BETA, whose own tables may differ.")
+    for group, label in (("up", "Up-regulated"), ("down", "Down-regulated")):
+        result = prediction[group]
+        outcome = f"{len(result['targets'])} targets" if result["significant"] else "not significant"
+        lines.append(f"{label}: {result['genes']} genes, D = {result['statistic']:.3f}, p = {result['pvalue']:.2e}, {outcome}")
+    return "\n".join(lines + [describe_function(prediction)])
+
+def rethreshold_parser():
+    parser = argparse.ArgumentParser(prog="beta_gui.py --rethreshold", description="Targets and function prediction of a finished BETA basic or plus run for new thresholds, from its NAME_gene_scores.txt.")
+    parser.add_argument("gene_scores", help="NAME_gene_scores.txt written by the native engine or the GUI's re-threshold option.")
+    parser.add_argument("--method", choices=METHOD_OPTIONS, default="score")
+    parser.add_argument("--df", type=float, default=1)
+    parser.add_argument("--da", type=float, default=0.5)
+    parser.add_argument("-c", "--cutoff", type=float, default=0.001)
+    parser.add_argument("-o", "--output", help="Write the function prediction and target tables to this directory.")
+    return parser
+
+def run_rethreshold(argv):
+    # Entry point of "beta_gui.py --rethreshold ..."
+    args = rethreshold_parser().parse_args(argv)
+    try:
+        check_thresholds(args.df, args.da, args.cutoff)
+        table = read_gene_scores(args.gene_scores)
+        start = time.perf_counter()
+        prediction = predict_targets(table, args.df, args.da, args.cutoff, args.method)
+        print(describe_targets(prediction, table))
+        print(f"Re-thresholded {len(table['score'])} genes in {(time.perf_counter() - start) * 1000:.1f} ms.")
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            base = os.path.basename(args.gene_scores)
+            name = base[:-len("_gene_scores.txt")] if base.endswith("_gene_scores.txt") else os.path.splitext(base)[0]
+            name = rethreshold_name(name, args.df, args.da, args.cutoff)
+            print(f"Wrote {', '.join(write_prediction(args.output, name, table, prediction))}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+# ===================================================================== #
+# ResultCache class
+# ===================================================================== #
+# Parameters that do not change BETA's results
+RUN_OPTION_PARAMS = ("output_path", "timeout_minutes")
+RUN_LOG_PATTERN = re.compile(r"^BETA-.*\.(log|jsonl|sbatch|out)$")
+INPUT_FILE_PARAMS = ("peaks_file_path", "expression_file_path", "reference_file_path", "genome_sequence_file_path", "boundary_file_path")
+
+def is_run_output(relpath, prefix):
+    # BETA names every table NAME_... and BETA plus its motif directories NAME_..., "NA" when there is no name
+    top = relpath.split(os.sep, 1)[0]
+    return top == prefix or top.startswith(f"{prefix}_")
+
+def file_digest(path, chunk_size=1 << 20):
+    # BLAKE2b of the file contents, streamed in chunks
+    import hashlib
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def count_lines(path, chunk_size=1 << 20):
+    with open_input(path) as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(chunk_size), b''))
+
+def float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class ResultCache:
+    chunk_size = 1 << 20
+    index_name = "index.json"
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.environ.get("BETA_CACHE_DIR", os.path.join(CACHE_ROOT, "results"))
+        self.max_bytes = max_bytes or int(float(os.environ.get("BETA_CACHE_MAX_GB", 20)) * 1e9)
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, self.index_name)) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("entries", {})
+        index.setdefault("fingerprints", {})
+        index.setdefault("stats", {"hits": 0, "misses": 0, "bytes_saved": 0, "seconds_saved": 0.0})
+        return index
+
+    def save_index(self):
+        # Atomic replace so a crash or a second GUI never leaves a truncated index
+        path = os.path.join(self.cache_dir, self.index_name)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(self.index, f)
+        os.replace(path + ".tmp", path)
+
+    def fingerprint(self, path):
+        # Content hash remembered per (size, mtime) so unchanged files are hashed once
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            known = self.index["fingerprints"].get(path)
+        if known and known[0] == signature:
+            return known[1]
+        fingerprint = file_digest(path, self.chunk_size)
+        with self.lock:
+            self.index["fingerprints"][path] = [signature, fingerprint]
+        return fingerprint
+
+    def key(self, params):
+        # Everything that changes BETA's results, the output directory excluded
+        import hashlib
+        normalized = {}
+        for name, value in params.items():
+            if name in RUN_OPTION_PARAMS:
+                continue
+            if name in INPUT_FILE_PARAMS:
+                value = self.fingerprint(value) if value else ""
+            elif name == "name_prefix":
+                value = '-'.join(value.split())
+            elif isinstance(value, str):
+                try:
+                    number = float(value)
+                    value = str(int(number)) if number.is_integer() else repr(number)
+                except ValueError:
+                    pass
+            normalized[name] = value
+        return hashlib.blake2b(json.dumps(normalized, sort_keys=True).encode(), digest_size=20).hexdigest()
+
+    def snapshot(self, output_path):
+        files = {}
+        for dirpath, _, filenames in os.walk(output_path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files[os.path.relpath(path, output_path)] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def restore(self, key, output_path):
+        with self.lock:
+            entry = self.index["entries"].get(key)
+            # Entries without a prefix predate store() keeping to the run's own files and may hold other runs' tables
+            if entry is None or "prefix" not in entry:
+                self.index["stats"]["misses"] += 1
+                return None
+        entry_dir = os.path.join(self.cache_dir, key)
+        for relpath in entry["files"]:
+            destination = os.path.join(output_path, relpath)
+            os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+            shutil.copy2(os.path.join(entry_dir, relpath), destination)
+        with self.lock:
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            stats = self.index["stats"]
+            stats["hits"] += 1
+            stats["bytes_saved"] += entry["bytes"]
+            stats["seconds_saved"] += entry["wall_seconds"]
+            self.save_index()
+        return entry["files"]
+
+    def store(self, key, output_path, before, wall_seconds, prefix):
+        # Files of this run (named after its prefix) that BETA created or rewrote, so tables that concurrent
+        # runs write to the same output directory never end up in this run's entry
+        after = self.snapshot(output_path)
+        files = [relpath for relpath, signature in after.items() if before.get(relpath) != signature and is_run_output(relpath, prefix) and not RUN_LOG_PATTERN.match(os.path.basename(relpath))]
+        if not files:
+            return
+        entry_dir = os.path.join(self.cache_dir, key)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        for relpath in files:
+            destination = os.path.join(entry_dir, relpath)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(os.path.join(output_path, relpath), destination)
+        with self.lock:
+            self.index["entries"][key] = {
+                "files": files,
+                "prefix": prefix,
+                "bytes": sum(after[relpath][0] for relpath in files),
+                "wall_seconds": wall_seconds,
+                "created": time.time(),
+                "last_used": time.time(),
+                "hits": 0,
+            }
+            self.evict()
+            self.save_index()
+
+    def evict(self):
+        # Drop least recently used entries until the cache fits, called with the lock held
+        entries = self.index["entries"]
+        total = sum(entry["bytes"] for entry in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]["bytes"]
+            del entries[key]
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.index["entries"]):
+                shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            self.index["entries"] = {}
+            self.save_index()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.index["stats"])
+            stats["entries"] = len(self.index["entries"])
+            stats["bytes"] = sum(entry["bytes"] for entry in self.index["entries"].values())
+            return stats
+
+# ===================================================================== #
+# ResourceSampler class
+# ===================================================================== #
+METRICS_FILE_NAME = "BETA-metrics.jsonl"
+metrics_lock = threading.Lock()
+
+def append_metrics(output_path, record):
+    # One JSON record per run, appended next to the run logs so records from many runs can be aggregated
+    with metrics_lock:
+        with open(os.path.join(output_path, METRICS_FILE_NAME), 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+def wait_without_reaping(process):
+    # Block until the child exits but leave it a zombie, so its /proc entry can be sampled one last time
+    if hasattr(os, "waitid"):
+        try:
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        except ChildProcessError:
+            pass
+
+def signal_process_group(process, signum):
+    # BETA runs in its own session, so this reaches the shell, BETA and any R children
+    try:
+        os.killpg(process.pid, signum)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def stop_process_group(process, grace):
+    # SIGTERM now, SIGKILL for whatever is left after the grace period
+    signal_process_group(process, signal.SIGTERM)
+    killer = threading.Timer(grace, signal_process_group, args=(process, signal.SIGKILL))
+    killer.daemon = True
+    killer.start()
+
+class ResourceSampler:
+    interval = 1.0
+    clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.start_time = time.time()
+        self.cpu_seconds = 0.0
+        self.rss_bytes = 0
+        self.peak_rss_bytes = 0
+        self.read_bytes = 0
+        self.write_bytes = 0
+        self.processes = 0
+        self.cpu_percent = 0.0
+        self.samples = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        self.sample()
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        # Final sample of the exited (not yet reaped) tree, then stop the sampling thread
+        self.stop_event.set()
+        self.thread.join()
+        self.sample()
+
+    def descendants(self):
+        pids = [self.pid]
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/task/{pid}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass
+        return pids
+
+    def sample(self):
+        cpu_ticks = 0
+        rss_pages = 0
+        read_bytes = 0
+        write_bytes = 0
+        processes = 0
+        peak_single = 0
+        for pid in self.descendants():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    # Fields after the parenthesised command name, which may itself contain spaces
+                    fields = f.read().rsplit(")", 1)[1].split()
+                # utime, stime and the cutime, cstime of already reaped children
+                cpu_ticks += sum(int(value) for value in fields[11:15])
+                rss_pages += int(fields[21])
+                processes += 1
+                # Kernel-tracked high water mark catches peaks between samples
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmHWM:"):
+                            peak_single = max(peak_single, int(line.split()[1]) * 1024)
+                            break
+                with open(f"/proc/{pid}/io") as f:
+                    for line in f:
+                        name, value = line.split(":")
+                        if name == "read_bytes":
+                            read_bytes += int(value)
+                        elif name == "write_bytes":
+                            write_bytes += int(value)
+            except (OSError, IndexError, ValueError):
+                # Process exited between listing and reading
+                continue
+        now = time.time()
+        with self.lock:
+            cpu_seconds = cpu_ticks / self.clock_ticks
+            # Counters of exited, unreaped processes disappear, keep the cumulative totals monotonic
+            if self.samples:
+                self.cpu_percent = 100 * max(0.0, cpu_seconds - self.cpu_seconds) / max(now - self.last_sample, 1e-6)
+            self.cpu_seconds = max(self.cpu_seconds, cpu_seconds)
+            self.read_bytes = max(self.read_bytes, read_bytes)
+            self.write_bytes = max(self.write_bytes, write_bytes)
+            self.rss_bytes = rss_pages * self.page_size
+            self.peak_rss_bytes = max(self.peak_rss_bytes, self.rss_bytes, peak_single)
+            self.processes = processes
+            self.last_sample = now
+            self.samples += 1
+
+    def summary(self):
+        with self.lock:
+            return {
+                "wall_seconds": round(time.time() - self.start_time, 3),
+                "cpu_seconds": round(self.cpu_seconds, 3),
+                "cpu_percent": round(self.cpu_percent, 1),
+                "rss_bytes": self.rss_bytes,
+                "peak_rss_bytes": self.peak_rss_bytes,
+                "read_bytes": self.read_bytes,
+                "write_bytes": self.write_bytes,
+                "processes": self.processes,
+                "samples": self.samples,
+            }
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+def format_seconds(value):
+    if value < 90:
+        return f"{value:.0f} s"
+    if value < 600:
+        return f"{value / 60:.1f} min"
+    if value < 5400:
+        return f"{value / 60:.0f} min"
+    return f"{value / 3600:.1f} h"
+
+# ===================================================================== #
+# Run history
+# ===================================================================== #
+HISTORY_COLUMNS = ("type", "genome", "prefix", "state", "exit_code", "host", "executor", "output_path", "command", "argv", "params", "log",
+                   "submitted", "start", "end", "wall_seconds", "cpu_seconds", "peak_rss_bytes", "read_bytes", "write_bytes",
+                   "peaks", "expression_rows", "peak_number", "distance")
+
+class RunHistory:
+    # Every finished run in one SQLite database, indexed for lookups by input file and by type and genome
+    schema = '''
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY, type TEXT, genome TEXT, prefix TEXT, state TEXT, exit_code INTEGER, host TEXT, executor TEXT,
+            output_path TEXT, command TEXT, argv TEXT, params TEXT, log TEXT, submitted REAL, start REAL, end REAL,
+            wall_seconds REAL, cpu_seconds REAL, peak_rss_bytes INTEGER, read_bytes INTEGER, write_bytes INTEGER,
+            peaks INTEGER, expression_rows INTEGER, peak_number REAL, distance REAL);
+        CREATE TABLE IF NOT EXISTS inputs (run_id INTEGER REFERENCES runs(id), param TEXT, path TEXT, size INTEGER, fingerprint TEXT);
+        CREATE TABLE IF NOT EXISTS fingerprints (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, fingerprint TEXT);
+        CREATE INDEX IF NOT EXISTS runs_type_genome ON runs(type, genome, state);
+        CREATE INDEX IF NOT EXISTS runs_state_wall ON runs(state, type, genome, wall_seconds);
+        CREATE INDEX IF NOT EXISTS runs_state_rss ON runs(state, type, genome, peak_rss_bytes);
+        CREATE INDEX IF NOT EXISTS runs_start ON runs(start);
+        CREATE INDEX IF NOT EXISTS inputs_run ON inputs(run_id);
+        CREATE INDEX IF NOT EXISTS inputs_fingerprint ON inputs(fingerprint);
+        CREATE INDEX IF NOT EXISTS inputs_path ON inputs(path);
+    '''
+    # Columns added after the first release, added to older databases when opened
+    added_columns = {"peaks": "INTEGER", "expression_rows": "INTEGER", "peak_number": "REAL", "distance": "REAL"}
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("BETA_HISTORY_DB", os.path.join(CACHE_ROOT, "history.sqlite"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.execute(self.schema, script=True)
+        existing = {row["name"] for row in self.execute("PRAGMA table_info(runs)")}
+        for column, column_type in self.added_columns.items():
+            if column not in existing:
+                self.execute(f"ALTER TABLE runs ADD COLUMN {column} {column_type}")
+
+    def execute(self, sql, args=(), script=False):
+        # A connection per call since runs finish on their own threads; SQLite errors surface as OSError like other I/O
+        import sqlite3
+        try:
+            connection = sqlite3.connect(self.path, timeout=30)
+            try:
+                connection.row_factory = sqlite3.Row
+                with connection:
+                    if script:
+                        connection.execute("PRAGMA journal_mode=WAL")
+                        connection.executescript(sql)
+                        return []
+                    if callable(sql):
+                        return sql(connection)
+                    return connection.execute(sql, args).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            raise OSError(f"Run history {self.path}: {e}") from e
+
+    def fingerprint(self, path):
+        # Same content hash as the result cache, remembered per (size, mtime)
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        known = self.execute("SELECT size, mtime_ns, fingerprint FROM fingerprints WHERE path = ?", (path,))
+        if known and (known[0]["size"], known[0]["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return known[0]["fingerprint"]
+        fingerprint = file_digest(path)
+        self.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns, fingerprint))
+        return fingerprint
+
+    def record(self, record, params, argv):
+        # record is the metrics record of the run, see SubprocessRunner.write_metrics.
+        # Paths are stored absolute so the parameters can be loaded back from any working directory
+        params = dict(params, output_path=os.path.join(os.path.abspath(params.get("output_path", "./")), ""),
+                      **{name: os.path.abspath(params[name]) for name in INPUT_FILE_PARAMS if params.get(name)})
+        inputs = []
+        for name in INPUT_FILE_PARAMS:
+            path = params.get(name)
+            if path:
+                try:
+                    inputs.append((name, os.path.abspath(path), os.path.getsize(path), self.fingerprint(path)))
+                except OSError:
+                    inputs.append((name, os.path.abspath(path), None, None))
+        # Size of the run, what the runtime predictor learns from
+        features = {"peak_number": float_or_none(params.get("peak_number")), "distance": float_or_none(params.get("distance"))}
+        for name, param in (("peaks", "peaks_file_path"), ("expression_rows", "expression_file_path")):
+            if params.get(param):
+                try:
+                    features[name] = count_lines(params[param])
+                except OSError:
+                    pass
+        values = dict(record, **features, genome=params.get("genome"), output_path=params["output_path"],
+                      argv=json.dumps(list(argv)), params=json.dumps(params))
+        def insert(connection):
+            run_id = connection.execute(f"INSERT INTO runs ({', '.join(HISTORY_COLUMNS)}) VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})",
+                                        [values.get(column) for column in HISTORY_COLUMNS]).lastrowid
+            connection.executemany("INSERT INTO inputs VALUES (?, ?, ?, ?, ?)", [(run_id,) + row for row in inputs])
+            return run_id
+        return self.execute(insert)
+
+    def runs(self, type=None, genome=None, path=None, limit=1000):
+        # Most recent first; path finds runs on that file or on any file with the same contents
+        conditions, args = [], []
+        if type:
+            conditions.append("type = ?")
+            args.append(type)
+        if genome:
+            conditions.append("genome = ?")
+            args.append(genome)
+        if path:
+            path = os.path.abspath(path)
+            try:
+                fingerprint = self.fingerprint(path)
+            except OSError:
+                fingerprint = None
+            conditions.append("id IN (SELECT run_id FROM inputs WHERE path = ? OR fingerprint = ?)")
+            args += [path, fingerprint]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.execute(f"SELECT * FROM runs {where} ORDER BY start DESC LIMIT ?", args + [limit])
+
+    def summary(self, state="done"):
+        # Runs, median wall time and median peak RSS per type and genome. Medians are read from
+        # the (state, type, genome, value) indexes, so only the middle of each group is visited
+        def medians(connection):
+            summary = {}
+            for column in ("wall_seconds", "peak_rss_bytes"):
+                # Counting over the covering index of the column avoids reading the table itself
+                groups = connection.execute(f"SELECT type, genome, COUNT(*) AS runs, COUNT({column}) AS count FROM runs "
+                                            "WHERE state = ? GROUP BY type, genome", (state,)).fetchall()
+                for group in groups:
+                    entry = summary.setdefault((group["type"] or "", group["genome"] or ""), {"type": group["type"], "genome": group["genome"], "runs": group["runs"]})
+                    middle = connection.execute(f"SELECT {column} FROM runs WHERE state = ? AND type = ? AND genome = ? AND {column} IS NOT NULL "
+                                                f"ORDER BY {column} LIMIT ? OFFSET ?", (state, group["type"], group["genome"], 2 - group["count"] % 2, (group["count"] - 1) // 2)).fetchall()
+                    entry[f"median_{column}"] = sum(row[0] for row in middle) / len(middle) if middle else None
+            return [entry for _, entry in sorted(summary.items())]
+        return self.execute(medians)
+
+    def params(self, run_id):
+        rows = self.execute("SELECT params FROM runs WHERE id = ?", (run_id,))
+        return json.loads(rows[0]["params"]) if rows and rows[0]["params"] else None
+
+class RunPredictor:
+    # Log-linear least squares of wall time and peak RSS on the size of a run, fitted per BETA type on the run history
+    min_runs = 5
+    max_runs = 2000
+
+    def __init__(self, history):
+        self.history = history
+        # type -> (runs seen when fitted, model)
+        self.models = {}
+
+    def features(self, type, genomes, genome, peaks, peak_number, distance, expression_rows):
+        import math
+        row = [1.0, math.log1p(peaks or 0), math.log1p(peak_number or 0), math.log1p(distance or 0)]
+        if type != 'minus':
+            row.append(math.log1p(expression_rows or 0))
+        # One indicator per genome seen in the history besides the first, an unseen genome counts as the first
+        return row + [1.0 if genome == other else 0.0 for other in genomes[1:]]
+
+    def model(self, type):
+        import numpy as np
+        seen = tuple(self.history.execute("SELECT COUNT(*), MAX(id) FROM runs WHERE type = ? AND state = 'done'", (type,))[0])
+        if type in self.models and self.models[type][0] == seen:
+            return self.models[type][1]
+        rows = self.history.execute("SELECT genome, peaks, expression_rows, peak_number, distance, wall_seconds, peak_rss_bytes FROM runs "
+                                    "WHERE type = ? AND state = 'done' AND peaks IS NOT NULL AND wall_seconds > 0 ORDER BY id DESC LIMIT ?", (type, self.max_runs))
+        model = None
+        if rows:
+            genomes = sorted({row["genome"] or "" for row in rows})
+            targets = np.log(np.array([[row["wall_seconds"], max(row["peak_rss_bytes"] or 1, 1)] for row in rows], dtype=np.float64))
+            model = {"runs": len(rows), "genomes": genomes, "median": np.exp(np.median(targets, axis=0))}
+            design = np.array([self.features(type, genomes, row["genome"] or "", row["peaks"], row["peak_number"], row["distance"], row["expression_rows"]) for row in rows])
+            if len(rows) >= max(self.min_runs, design.shape[1] + 2):
+                coefficients, _, rank, _ = np.linalg.lstsq(design, targets, rcond=None)
+                residuals = targets - design @ coefficients
+                model["coefficients"] = coefficients
+                # Spread of the log error, an estimate is shown as a range of one standard deviation
+                model["sigma"] = np.sqrt((residuals ** 2).sum(axis=0) / max(1, len(rows) - rank))
+        self.models[type] = (seen, model)
+        return model
+
+    def predict(self, params, peaks, expression_rows=None):
+        # Expected wall time and peak RSS of a run, None without history for its type
+        import numpy as np
+        type = params["type"]
+        model = self.model(type)
+        if model is None:
+            return None
+        if "coefficients" not in model:
+            wall, rss = model["median"]
+            return {"wall_seconds": wall, "wall_low": None, "wall_high": None, "peak_rss_bytes": rss, "runs": model["runs"], "method": "median"}
+        row = np.array(self.features(type, model["genomes"], params.get("genome") or "", peaks, float_or_none(params.get("peak_number")),
+                                     float_or_none(params.get("distance")), expression_rows))
+        log_wall, log_rss = row @ model["coefficients"]
+        return {"wall_seconds": float(np.exp(log_wall)), "wall_low": float(np.exp(log_wall - model["sigma"][0])), "wall_high": float(np.exp(log_wall + model["sigma"][0])),
+                "peak_rss_bytes": float(np.exp(log_rss)), "runs": model["runs"], "method": "model"}
+
+def describe_prediction(prediction):
+    if prediction is None:
+        return "No estimate yet: no finished runs of this type in the history."
+    wall = format_seconds(prediction["wall_seconds"])
+    if prediction["wall_low"] is not None:
+        wall += f" ({format_seconds(prediction['wall_low'])} to {format_seconds(prediction['wall_high'])})"
+    basis = f"{prediction['runs']} earlier runs" if prediction["method"] == "model" else f"median of {prediction['runs']} earlier runs"
+    return f"Estimate: {wall}, {format_bytes(prediction['peak_rss_bytes'])} peak memory ({basis})"
+
+# ===================================================================== #
+# RunLog class
+# ===================================================================== #
+class RunLog:
+    # Logger private to one run, its file writes happen on a QueueListener thread
+    formatter = logging.Formatter('%(levelname)s : %(name)s : %(message)s')
+
+    def __init__(self, name, log_path):
+        import logging.handlers
+        self.log_path = log_path
+        self.records = queue.SimpleQueue()
+        # Not registered with logging.getLogger, so nothing is shared with (or leaked to) other runs
+        self.logger = logging.Logger(name, logging.DEBUG)
+        self.logger.addHandler(logging.handlers.QueueHandler(self.records))
+        self.file_handler = logging.FileHandler(log_path)
+        self.file_handler.setFormatter(self.formatter)
+        self.listener = logging.handlers.QueueListener(self.records, self.file_handler)
+        self.listener.start()
+        self.closed = False
+
+    def log(self, level, message):
+        if not self.closed:
+            self.logger.log(level, message)
+
+    def info(self, message):
+        self.log(logging.INFO, message)
+
+    def error(self, message):
+        self.log(logging.ERROR, message)
+
+    def close(self):
+        # Flushes everything still queued, then detaches the file
+        if self.closed:
+            return
+        self.closed = True
+        self.listener.stop()
+        self.file_handler.close()
+        self.logger.handlers.clear()
+
+# ===================================================================== #
+# Executors
+# ===================================================================== #
+class LocalJob:
+    # BETA as a child process in its own process group, so cancelling reaches all of its children
+    def __init__(self, argv):
+        self.process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, universal_newlines=True, start_new_session=True)
+        self.sampler = ResourceSampler(self.process.pid)
+        self.sampler.start()
+        self.description = f"process {self.process.pid}"
+
+    def output(self):
+        return self.process.stdout
+
+    def wait(self):
+        wait_without_reaping(self.process)
+        self.sampler.stop()
+        return self.process.wait()
+
+    def stop(self, grace):
+        stop_process_group(self.process, grace)
+
+class LocalExecutor:
+    name = "local"
+
+    def scratch_dir(self, output_path):
+        # Preprocessed inputs only need to be visible on this machine
+        return None
+
+    def submit(self, argv, log_path, job_name, log):
+        return LocalJob(argv)
+
+class SlurmJob:
+    # A submitted batch job, followed through the scheduler's status commands and its output file
+    def __init__(self, executor, job_id, output_path, log):
+        self.executor = executor
+        self.job_id = job_id
+        self.output_path = output_path
+        self.log = log
+        self.sampler = None
+        self.description = f"Slurm job {job_id}"
+        self.finished = threading.Event()
+
+    def output(self):
+        # Lines of the job's output file as it is written on the compute node, until the job has ended
+        position = 0
+        partial = ""
+        while True:
+            finished = self.finished.is_set()
+            try:
+                with open(self.output_path, errors='replace') as f:
+                    f.seek(position)
+                    chunk = f.read()
+                    position = f.tell()
+            except FileNotFoundError:
+                chunk = ""
+            lines = (partial + chunk).split('\n')
+            partial = lines.pop()
+            yield from (line + '\n' for line in lines)
+            if finished:
+                if partial:
+                    yield partial + '\n'
+                return
+            self.finished.wait(self.executor.poll_seconds)
+
+    def wait(self):
+        state = None
+        error = None
+        failures = 0
+        while True:
+            try:
+                queue_state = self.executor.queue_state(self.job_id)
+            except (FileNotFoundError, PermissionError) as e:
+                # A missing or forbidden squeue will not fix itself
+                return self.give_up(f"Cannot query {self.description}: {e}")
+            except OSError as e:
+                # The controller may be busy or restarting, the job is still there
+                failures += 1
+                if failures >= self.executor.queue_retries:
+                    return self.give_up(f"Could not query {self.description} {failures} times in a row: {e}")
+                if str(e) != error:
+                    error = str(e)
+                    self.log(f"Could not query {self.description}, retrying: {e}", logging.WARNING)
+                time.sleep(self.executor.poll_seconds)
+                continue
+            failures = 0
+            if queue_state is None:
+                break
+            if queue_state != state:
+                state = queue_state
+                self.log(f"{self.description} is {state.lower()}.")
+            time.sleep(self.executor.poll_seconds)
+        # Gone from the queue, the accounting database has the exit code once it records a terminal state
+        returncode = -1
+        missing = 0
+        while True:
+            accounting = self.executor.accounting(self.job_id)
+            if accounting is None:
+                missing += 1
+                if missing >= self.executor.accounting_retries:
+                    self.log(f"No accounting record for {self.description}, treating it as failed.", logging.WARNING)
+                    break
+            elif accounting[0] in self.executor.terminal_states:
+                state, returncode = accounting
+                self.log(f"{self.description} ended as {state.lower()} with exit code {returncode}.")
+                break
+            elif accounting[0] != state:
+                # e.g. still COMPLETING, or RUNNING in a database that lags behind squeue
+                state = accounting[0]
+                self.log(f"{self.description} is {state.lower()}.")
+            time.sleep(self.executor.poll_seconds)
+        self.finished.set()
+        return returncode
+
+    def give_up(self, reason):
+        # The job's state is unknown, fail the run and try not to leave the job running unwatched
+        self.log(f"{reason}, treating it as failed.", logging.ERROR)
+        try:
+            self.stop(0)
+        except OSError as e:
+            self.log(f"Could not cancel {self.description}: {e}", logging.WARNING)
+        self.finished.set()
+        return -1
+
+    def stop(self, grace):
+        # Slurm signals the job's processes itself, SIGTERM then SIGKILL after its KillWait
+        self.executor.run_command(self.executor.cancel_command, self.job_id)
+
+class SlurmExecutor:
+    name = "slurm"
+    accounting_retries = 5
+    # Consecutive failed squeue calls before a job is given up on, about 5 minutes at the default --poll-seconds
+    queue_retries = 30
+    # Job states sacct reports once a job can no longer change
+    terminal_states = ("COMPLETED", "FAILED", "CANCELLED", "TIMEOUT", "OUT_OF_MEMORY", "NODE_FAIL", "PREEMPTED", "BOOT_FAIL", "DEADLINE")
+    # Slots in the GUI queue when --jobs is not given, the cluster decides what actually runs
+    default_max_jobs = 20
+
+    def __init__(self, submit_command="sbatch", queue_command="squeue", accounting_command="sacct", cancel_command="scancel", options="", poll_seconds=10):
+        # Commands are split like a shell would, so wrappers (e.g. "ssh login1 sbatch") or a stub script work too
+        self.submit_command = submit_command
+        self.queue_command = queue_command
+        self.accounting_command = accounting_command
+        self.cancel_command = cancel_command
+        self.options = shlex.split(options)
+        self.poll_seconds = poll_seconds
+
+    def scratch_dir(self, output_path):
+        # Preprocessed inputs must be readable on the compute nodes, like the home directory holding the cache root
+        scratch = os.path.join(CACHE_ROOT, "scratch")
+        os.makedirs(scratch, exist_ok=True)
+        return scratch
+
+    def run_command(self, command, *args):
+        result = subprocess.run(shlex.split(command) + list(args), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise OSError(f"{command} {' '.join(args)} failed: {result.stderr.strip() or result.stdout.strip()}")
+        return result.stdout
+
+    def write_script(self, argv, log_path, job_name):
+        stem = os.path.splitext(os.path.abspath(log_path))[0]
+        script_path = f"{stem}.sbatch"
+        output_path = f"{stem}.out"
+        with open(script_path, 'w') as f:
+            f.write("#!/bin/bash\n")
+            f.write(f"#SBATCH --job-name={job_name}\n")
+            f.write(f"#SBATCH --output={output_path}\n")
+            for option in self.options:
+                f.write(f"#SBATCH {option}\n")
+            f.write(f"cd {shlex.quote(os.getcwd())}\n")
+            f.write(f"exec {shlex.join(argv)}\n")
+        return script_path, output_path
+
+    def submit(self, argv, log_path, job_name, log):
+        script_path, output_path = self.write_script(argv, log_path, job_name)
+        log(f"Job script: {script_path}")
+        # --parsable prints "jobid" or "jobid;cluster"
+        job_id = self.run_command(self.submit_command, "--parsable", script_path).strip().split(';')[0]
+        if not job_id:
+            raise OSError(f"{self.submit_command} did not report a job id")
+        log(f"Submitted Slurm job {job_id}, output: {output_path}")
+        return SlurmJob(self, job_id, output_path, log)
+
+    def queue_state(self, job_id):
+        # e.g. PENDING or RUNNING, None once the job has left the queue. Other squeue failures raise OSError
+        try:
+            state = self.run_command(self.queue_command, "--noheader", "--jobs", job_id, "--format", "%T").strip()
+        except OSError as e:
+            # squeue fails for job ids it no longer knows
+            if "invalid job id" in str(e).lower():
+                return None
+            raise
+        return state or None
+
+    def accounting(self, job_id):
+        # (state, exit code) of the job's allocation, None while the record is not there yet or sacct fails
+        try:
+            output = self.run_command(self.accounting_command, "--noheader", "--parsable2", "--allocations", "--jobs", job_id, "--format", "State,ExitCode")
+        except OSError:
+            return None
+        for line in output.splitlines():
+            if '|' in line:
+                state, exit_code = line.split('|')[:2]
+                # "CANCELLED by 1234", exit code as "code:signal"
+                state = state.split()[0] if state else "UNKNOWN"
+                code, _, signal_number = exit_code.partition(':')
+                if code.isdigit() and int(code):
+                    returncode = int(code)
+                elif signal_number.isdigit() and int(signal_number):
+                    returncode = -int(signal_number)
+                else:
+                    returncode = 0 if state == "COMPLETED" else -1
+                return state, returncode
+        return None
+
+class ZygoteJob:
+    # A job forked by the pre-warmed worker, its output and exit code arrive over the worker's socket
+    def __init__(self, connection):
+        self.connection = connection
+        self.reader = connection.makefile('rb')
+        self.returncode = None
+        self.finished = threading.Event()
+        kind, _, value = self.reader.readline().decode().partition(' ')
+        if kind != "P":
+            connection.close()
+            raise OSError("The BETA worker did not start the job")
+        # The job leads its own session, like a LocalJob, and sampling /proc does not need it to be our child
+        self.pid = int(value)
+        self.sampler = ResourceSampler(self.pid)
+        self.sampler.start()
+        self.description = f"process {self.pid} (pre-warmed worker)"
+
+    def output(self):
+        decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors='replace')
+        partial = ""
+        try:
+            while True:
+                kind, _, value = self.reader.readline().decode().partition(' ')
+                if kind == "O":
+                    lines = (partial + decoder.decode(self.reader.read(int(value)))).split('\n')
+                    partial = lines.pop()
+                    yield from (line + '\n' for line in lines)
+                elif kind == "X":
+                    self.returncode = int(value)
+                    break
+                else:
+                    # The worker died with the job
+                    self.returncode = -1
+                    break
+            partial += decoder.decode(b"", final=True)
+            if partial:
+                yield partial
+        finally:
+            self.connection.close()
+            self.finished.set()
+
+    def wait(self):
+        self.finished.wait()
+        self.sampler.stop()
+        return self.returncode
+
+    def stop(self, grace):
+        stop_process_group(self, grace)
+
+class ZygoteExecutor:
+    # Runs on this machine like LocalExecutor, through a worker that has BETA's modules loaded already
+    name = "zygote"
+    startup_seconds = 120
+
+    def __init__(self, command=None, socket_path=None, idle_minutes=60):
+        self.command = command or f"python2 {shlex.quote(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'beta_zygote.py'))}"
+        self.socket_path = socket_path or os.path.join(CACHE_ROOT, f"zygote-{os.getuid()}.sock")
+        self.idle_minutes = idle_minutes
+        self.start_lock = threading.Lock()
+
+    def scratch_dir(self, output_path):
+        return None
+
+    def connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.socket_path)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def ensure_started(self, log):
+        # Connect to the running worker, or start one and wait until it has loaded BETA
+        with self.start_lock:
+            try:
+                return self.connect()
+            except OSError:
+                pass
+            os.makedirs(os.path.dirname(self.socket_path), mode=0o700, exist_ok=True)
+            worker_log = os.path.splitext(self.socket_path)[0] + ".log"
+            log(f"Starting the BETA worker: {self.command}, log: {worker_log}")
+            with open(worker_log, 'a') as f:
+                worker = subprocess.Popen(shlex.split(self.command) + ["--socket", self.socket_path, "--idle-minutes", str(self.idle_minutes)],
+                                          stdin=subprocess.DEVNULL, stdout=f, stderr=subprocess.STDOUT, start_new_session=True)
+            deadline = time.time() + self.startup_seconds
+            while time.time() < deadline:
+                try:
+                    return self.connect()
+                except OSError:
+                    if worker.poll() is not None:
+                        raise OSError(f"The BETA worker exited with code {worker.returncode}, see {worker_log}")
+                    time.sleep(0.1)
+            raise OSError(f"The BETA worker did not start within {self.startup_seconds} s, see {worker_log}")
+
+    def submit(self, argv, log_path, job_name, log):
+        connection = self.ensure_started(log)
+        request = {"argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)}
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        return ZygoteJob(connection)
+
+EXECUTORS = {"local": LocalExecutor, "slurm": SlurmExecutor, "zygote": ZygoteExecutor}
+
+# ===================================================================== #
+# Log viewer
+# ===================================================================== #
+class LogIndex:
+    # Byte offset of every line of a log file, extended as the file grows
+    chunk_bytes = 1 << 24
+
+    def __init__(self, path):
+        import numpy as np
+        self.path = path
+        self.data = b""
+        # Start of every complete line, followed by the end of the last one; a view of a buffer grown by doubling
+        self.buffer = np.zeros(1 << 16, dtype=np.int64)
+        self.starts = self.buffer[:1]
+        self.indexed = 0
+
+    @property
+    def lines(self):
+        return len(self.starts) - 1
+
+    def update(self, max_bytes=None):
+        # Index up to max_bytes of what was appended since the last call, returns True once the whole file is indexed
+        import numpy as np
+        import mmap
+        size = os.path.getsize(self.path)
+        if size < self.indexed:
+            # Truncated or replaced, start over
+            self.data = b""
+            self.starts = self.buffer[:1]
+            self.indexed = 0
+        if size > len(self.data):
+            with open(self.path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        end = len(self.data) if max_bytes is None else min(len(self.data), self.indexed + max_bytes)
+        count = len(self.starts)
+        for offset in range(self.indexed, end, self.chunk_bytes):
+            new = np.flatnonzero(np.frombuffer(self.data, dtype=np.uint8, count=min(self.chunk_bytes, end - offset), offset=offset) == 10) + (offset + 1)
+            if count + len(new) > len(self.buffer):
+                buffer = np.empty(max(2 * len(self.buffer), count + len(new)), dtype=np.int64)
+                buffer[:count] = self.buffer[:count]
+                self.buffer = buffer
+            self.buffer[count:count + len(new)] = new
+            count += len(new)
+        # data is replaced before starts, so a reader taking starts first never sees offsets past the end of data.
+        # Entries already in starts are never rewritten, only appended after it
+        self.starts = self.buffer[:count]
+        self.indexed = end
+        return end == len(self.data)
+
+    def line(self, number):
+        starts, data = self.starts, self.data
+        return data[starts[number]:starts[number + 1]].decode(errors='replace').rstrip('\r\n')
+
+    def search(self, pattern):
+        # Numbers of the lines matching a regex, over the lines indexed so far
+        import numpy as np
+        starts, data = self.starts, self.data
+        regex = re.compile(pattern.encode(), re.MULTILINE)
+        positions = np.fromiter((match.start() for match in regex.finditer(data, 0, int(starts[-1]))), dtype=np.int64)
+        return np.unique(np.searchsorted(starts, positions, side='right') - 1)
+
+class LogViewer(ttk.Frame):
+    # Shows only the lines in view, indexing and searching happen in background threads
+    refresh_interval_ms = 100
+    follow_interval_seconds = 0.2
+    scroll_lines = 3
+
+    def __init__(self, parent, path, follow=False):
+        from tkinter import font
+        super().__init__(parent)
+        self.index = LogIndex(path)
+        self.first = 0
+        self.matches = None
+        self.current_match = None
+        self.search_pattern = None
+        self.rendered = None
+        self.search_results = queue.Queue()
+        self.stopped = threading.Event()
+        self.follow_start = None
+        self.follow = tk.BooleanVar(value=follow)
+        # Mirrors follow for the indexing thread, Tk variables belong to the main thread
+        self.following = threading.Event()
+        self.index_thread = None
+
+        controls = ttk.Frame(self)
+        controls.pack(side='top', fill='x', padx=5, pady=5)
+        tk.Label(controls, text="Search:").pack(side='left')
+        self.pattern = tk.StringVar()
+        self.search_entry = tk.Entry(controls, textvariable=self.pattern, width=30)
+        self.search_entry.pack(side='left', padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.start_search())
+        ToolTip(self.search_entry, "Regular expression, press Enter to search the whole log.\nPrefix with (?i) to ignore case.")
+        tk.Button(controls, text="Previous", command=lambda: self.jump(-1)).pack(side='left')
+        tk.Button(controls, text="Next", command=lambda: self.jump(1)).pack(side='left', padx=5)
+        follow_checkbutton = tk.Checkbutton(controls, text="Follow", variable=self.follow)
+        follow_checkbutton.pack(side='right')
+        ToolTip(follow_checkbutton, "Keep showing the end of the log as it grows.")
+
+        self.status_label = tk.Label(self, text="Lines: 0", anchor='w')
+        self.status_label.pack(side='bottom', fill='x')
+
+        text_frame = ttk.Frame(self)
+        text_frame.pack(expand=True, fill='both')
+        self.scrollbar = ttk.Scrollbar(text_frame, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.output_text = tk.Text(text_frame, wrap='none', state=tk.DISABLED)
+        self.output_text.pack(side='left', expand=True, fill='both')
+        self.output_text.tag_configure('match', background='yellow')
+        self.output_text.tag_configure('current', background='orange')
+        self.line_height = font.Font(font=self.output_text['font']).metrics('linespace')
+        self.output_text.bind("<Configure>", lambda e: self.render())
+        self.output_text.bind("<MouseWheel>", lambda e: self.scroll_to(self.first - self.scroll_lines * (1 if e.delta > 0 else -1)))
+        self.output_text.bind("<Button-4>", lambda e: self.scroll_to(self.first - self.scroll_lines))
+        self.output_text.bind("<Button-5>", lambda e: self.scroll_to(self.first + self.scroll_lines))
+        self.bind("<Destroy>", lambda e: self.stopped.set())
+
+        self.follow.trace_add("write", self.update_follow)
+        self.update_follow()
+        self.after(self.refresh_interval_ms, self.refresh)
+
+    def build_index(self):
+        # A chunk at a time so the first lines show while a large log is still being indexed
+        while not self.stopped.is_set():
+            try:
+                done = self.index.update(LogIndex.chunk_bytes)
+            except (OSError, ValueError):
+                done = True
+            if done:
+                if not self.following.is_set():
+                    return
+                self.stopped.wait(self.follow_interval_seconds)
+
+    def update_follow(self, *args):
+        if self.follow.get():
+            self.following.set()
+            self.follow_start = None
+        else:
+            self.following.clear()
+        if self.index_thread is None or not self.index_thread.is_alive():
+            self.index_thread = threading.Thread(target=self.build_index, daemon=True)
+            self.index_thread.start()
+
+    def visible_lines(self):
+        return max(1, self.output_text.winfo_height() // self.line_height)
+
+    def refresh(self):
+        try:
+            while True:
+                pattern, result = self.search_results.get_nowait()
+                if pattern == self.search_pattern:
+                    self.show_search(result)
+        except queue.Empty:
+            pass
+        if self.follow.get():
+            self.first = max(0, self.index.lines - self.visible_lines())
+        # Redrawing an unchanged window would only lose the user's text selection
+        if self.rendered != self.window():
+            self.render()
+        else:
+            self.show_status()
+        if not self.stopped.is_set():
+            self.after(self.refresh_interval_ms, self.refresh)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.index.lines))
+        elif action == 'scroll':
+            self.scroll_to(self.first + int(amount) * (self.visible_lines() if unit == 'pages' else 1))
+
+    def scroll_to(self, first):
+        visible = self.visible_lines()
+        self.first = max(0, min(first, self.index.lines - visible))
+        # Scrolling away from the end stops following, like less +F
+        if self.follow.get() and self.first < self.index.lines - visible:
+            self.follow.set(False)
+        self.render()
+
+    def window(self):
+        return (self.first, self.index.lines, self.visible_lines(), id(self.matches), self.current_match)
+
+    def render(self):
+        self.rendered = self.window()
+        lines = self.index.lines
+        visible = self.visible_lines()
+        shown = [self.index.line(number) for number in range(self.first, min(lines, self.first + visible))]
+        self.output_text.config(state=tk.NORMAL)
+        self.output_text.delete('1.0', tk.END)
+        self.output_text.insert('1.0', '\n'.join(shown))
+        if self.matches is not None and len(self.matches):
+            import numpy as np
+            regex = re.compile(self.search_pattern)
+            low, high = np.searchsorted(self.matches, [self.first, self.first + visible])
+            for number in self.matches[low:high]:
+                row = int(number) - self.first + 1
+                tag = 'current' if number == self.current_match else 'match'
+                for match in regex.finditer(shown[row - 1]):
+                    self.output_text.tag_add(tag, f"{row}.{match.start()}", f"{row}.{max(match.end(), match.start() + 1)}")
+        self.output_text.config(state=tk.DISABLED)
+        if lines:
+            self.scrollbar.set(self.first / lines, min(1.0, (self.first + visible) / lines))
+        else:
+            self.scrollbar.set(0, 1)
+        self.show_status()
+
+    def show_status(self):
+        lines = self.index.lines
+        status = f"Lines: {lines:,}"
+        if self.follow.get():
+            # Growth of the log while following, i.e. how fast the run is writing
+            now = time.perf_counter()
+            if self.follow_start is None:
+                self.follow_start = (now, lines)
+            elapsed = now - self.follow_start[0]
+            if elapsed > 0:
+                status += f" ({(lines - self.follow_start[1]) / elapsed:.0f} lines/s)"
+        size = len(self.index.data)
+        if self.index.indexed < size:
+            status += f" | Indexing {100 * self.index.indexed / size:.0f}%"
+        if self.search_pattern is not None:
+            status += " | Searching..." if self.matches is None else f" | {len(self.matches):,} matching lines"
+        self.status_label.config(text=status)
+
+    def start_search(self):
+        pattern = self.pattern.get()
+        self.matches = None
+        self.current_match = None
+        if not pattern:
+            self.search_pattern = None
+            return
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            self.search_pattern = None
+            self.status_label.config(text=f"Invalid regular expression: {e}")
+            return
+        self.search_pattern = pattern
+        def search():
+            self.search_results.put((pattern, self.index.search(pattern)))
+        threading.Thread(target=search, daemon=True).start()
+
+    def show_search(self, matches):
+        self.matches = matches
+        if len(matches):
+            self.jump(1, from_line=self.first - 1)
+
+    def jump(self, direction, from_line=None):
+        # To the next (1) or previous (-1) matching line
+        import numpy as np
+        if self.matches is None or not len(self.matches):
+            return
+        if from_line is None:
+            from_line = self.current_match if self.current_match is not None else self.first
+        if direction > 0:
+            position = np.searchsorted(self.matches, from_line, side='right') % len(self.matches)
+        else:
+            position = (np.searchsorted(self.matches, from_line, side='left') - 1) % len(self.matches)
+        self.current_match = int(self.matches[position])
+        self.follow.set(False)
+        self.scroll_to(self.current_match - self.visible_lines() // 2)
+
+def open_log_viewer(parent, path, follow=False):
+    popup = tk.Toplevel(parent)
+    popup.title(os.path.basename(path))
+    popup.geometry("800x600")
+    LogViewer(popup, path, follow=follow).pack(expand=True, fill='both')
+    return popup
+
 # ===================================================================== #
 # SubprocessRunner class
 # ===================================================================== #
 class SubprocessRunner:
-    def __init__(self, root, output_path, cmd, type, name_prefix):
+    refresh_interval_ms = 100
+    # Seconds between SIGTERM and SIGKILL when a run is cancelled
+    kill_grace_seconds = 10
+
+    def __init__(self, root, output_path, argv, type, name_prefix, params=None, cache=None, timeout=None, executor=None, history=None):
         self.root = root
+        self.history = history
+        self.executor = executor or LocalExecutor()
+        self.params = params
+        self.cache = cache
+        self.timeout = timeout
         self.output_path = output_path
-        self.cmd = cmd
+        self.argv = list(argv)
+        self.cmd = shlex.join(self.argv)
         self.type = type
         self.name_prefix = name_prefix
-        self.output_queue = queue.Queue()
+        self.prefix = '-'.join(name_prefix.get().split())
+        self.state = "new"
+        self.returncode = None
+        self.submitted_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.on_finished = []
+        self.cache_key = None
+        self.workdir = None
+        self.sampler = None
+        self.job = None
+        self.scheduler = None
+        # Expected wall time and peak RSS, see RunPredictor.predict
+        self.prediction = None
+        self.cancel_reason = None
+        self.cancel_lock = threading.Lock()
+        # gene_scores_key of a successful basic or plus run, for re-thresholding it later
+        self.scores_key = None
+
+    def run_subprocess(self, start=True):
+        # Create a new Toplevel window
+        self.popup = tk.Toplevel(self.root)
+        self.popup.title(f"Running BETA-{self.type}")
+        self.popup.geometry("800x600")
+        self.popup.protocol("WM_DELETE_WINDOW", self.close_popup)
+
+        self.cancel_button = tk.Button(self.popup, text="Cancel run", command=self.cancel)
+        self.cancel_button.pack(side='top', anchor='e', padx=5, pady=5)
+        ToolTip(self.cancel_button, f"Stop BETA and all its child processes (SIGTERM, then SIGKILL after {self.kill_grace_seconds}s).")
+
+        # Live resource usage of the BETA process tree
+        self.metrics_label = tk.Label(self.popup, text="Waiting to start...", anchor='w', font=('Courier', 10))
+        self.metrics_label.pack(side='bottom', fill='x')
+
+        # Set up logging
+        current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.log_path = f"{self.output_path}BETA-{self.type}-{self.prefix}_{current_time}.log"
+        self.run_log = RunLog(f"BETA-{self.type}", self.log_path)
+
+        # Output is shown by following the log file, nothing is copied through Tk
+        self.viewer = LogViewer(self.popup, self.log_path, follow=True)
+        self.viewer.pack(expand=True, fill='both')
+
+        def update_output():
+            try:
+                if self.sampler is not None:
+                    self.show_metrics()
+                if self.state not in ("new", "queued", "running"):
+                    self.cancel_button.config(state=tk.DISABLED)
+                self.popup.after(self.refresh_interval_ms, update_output)
+            except tk.TclError:
+                # Window has been closed
+                pass
+
+        self.popup.after(self.refresh_interval_ms, update_output)
+        if start:
+            self.start()
+
+    def start(self):
+        # Safe to call from any thread, the popup only reads the log file and the sampler
+        self.state = "running"
+        self.started_at = time.time()
+        threading.Thread(target=self.run_cmd, daemon=True).start()
+
+    def emit(self, message, level=logging.INFO):
+        # Every message goes to the log file (in the background), the popup follows that file
+        self.run_log.log(level, message.strip())
+
+    def read_output(self, lines):
+        for line in lines:
+            if line.strip():  # Only process non-empty lines
+                self.run_log.info(line.strip())
+        if hasattr(lines, "close"):
+            lines.close()
+
+    def restore_cached(self):
+        try:
+            self.cache_key = self.cache.key(self.params)
+            restored = self.cache.restore(self.cache_key, self.output_path)
+        except OSError as e:
+            self.cache_key = None
+            self.emit(f"Result cache unavailable: {e}", logging.WARNING)
+            return False
+        if restored is None:
+            return False
+        for relpath in restored:
+            self.emit(f"Restored from cache: {relpath}")
+        self.returncode = 0
+        self.state = "cached"
+        self.emit("Identical run found in the result cache, BETA was not run.")
+        return True
+
+    def run_cmd(self):
+        try:
+            self.emit(f"Command: {self.cmd}")
+            if self.cache is not None and self.params is not None:
+                if self.restore_cached():
+                    self.scores_key = finish_gene_scores(self.params, self.cache, self.emit)
+                    return
+                before = self.cache.snapshot(self.output_path)
+            if self.params is not None:
+                params, self.workdir = preprocess(self.params, self.emit, self.executor.scratch_dir(self.output_path))
+                if params != self.params:
+                    self.argv = list(build_argv(params))
+                    self.cmd = build_cmd(params)
+                    self.emit(f"Command after preprocessing: {self.cmd}")
+            with self.cancel_lock:
+                if self.cancel_reason is not None:
+                    self.state = "cancelled"
+                    self.emit(f"{self.cancel_reason} before BETA started.", logging.WARNING)
+                    return
+                self.job = self.executor.submit(self.argv, self.log_path, f"BETA-{self.type}-{self.prefix}".rstrip('-'), self.emit)
+            if self.timeout:
+                timer = threading.Timer(self.timeout, self.cancel, args=(f"Timed out after {self.timeout / 60:g} minutes",))
+                timer.daemon = True
+                timer.start()
+
+            self.sampler = self.job.sampler
+
+            self.t = threading.Thread(target=self.read_output, args=(self.job.output(),))
+            self.t.daemon = True
+            self.t.start()
+
+            self.returncode = self.job.wait()
+            if self.timeout:
+                timer.cancel()
+            # Orphaned children may still hold the pipe open, don't wait on them forever
+            self.t.join(self.kill_grace_seconds if self.cancel_reason else None)
+            if self.cancel_reason is not None:
+                self.state = "cancelled"
+                self.emit(f"Run cancelled: {self.cancel_reason}.", logging.WARNING)
+                return
+            self.state = "done" if self.returncode == 0 else "failed"
+            if self.returncode == 0 and self.params is not None:
+                self.scores_key = finish_gene_scores(self.params, self.cache, self.emit)
+            if self.returncode == 0 and self.cache is not None and self.cache_key is not None:
+                self.cache.store(self.cache_key, self.output_path, before, time.time() - self.started_at, self.prefix or "NA")
+            self.emit("Process completed.")
+        except (OSError, ValueError) as e:
+            self.state = "failed"
+            self.emit(f"Failed to start process: {e}", logging.ERROR)
+        finally:
+            if self.workdir is not None:
+                remove_workdir(self.workdir)
+            self.finished_at = time.time()
+            self.write_metrics()
+            self.run_log.close()
+            for callback in self.on_finished:
+                callback(self)
+
+    def removed(self):
+        # Taken out of the scheduler's queue before it started
+        self.state = "removed"
+        self.emit("Removed from queue.")
+        self.run_log.close()
+
+    def cancel(self, reason="Cancelled by user"):
+        if self.state == "queued" and self.scheduler is not None:
+            if self.scheduler.remove(self.job_id):
+                self.state = "cancelled"
+            return
+        with self.cancel_lock:
+            if self.state != "running" or self.cancel_reason is not None:
+                return
+            self.cancel_reason = reason
+            job = self.job
+        if job is None:
+            # Still preprocessing, run_cmd stops before launching BETA
+            return
+        self.emit(f"{reason}, stopping {job.description}.", logging.WARNING)
+        try:
+            job.stop(self.kill_grace_seconds)
+        except OSError as e:
+            self.emit(f"Could not stop {job.description}: {e}", logging.ERROR)
+
+    def close_popup(self):
+        if self.state in ("queued", "running"):
+            if not messagebox.askokcancel("Cancel run?", "Closing this window cancels the BETA run. Continue?", parent=self.popup):
+                return
+            self.cancel()
+        self.popup.destroy()
+
+    def write_metrics(self):
+        record = {
+            "log": os.path.basename(getattr(self, "log_path", "")),
+            "type": self.type,
+            "prefix": self.prefix or "NA",
+            "command": self.cmd,
+            "state": self.state,
+            "exit_code": self.returncode,
+            "host": os.uname().nodename,
+            "executor": self.executor.name,
+            "submitted": self.submitted_at,
+            "start": self.started_at,
+            "end": self.finished_at,
+        }
+        if self.scores_key is not None:
+            record["scores_key"] = self.scores_key
+        record.update(self.sampler.summary() if self.sampler is not None else {"wall_seconds": round(self.finished_at - self.started_at, 3)})
+        try:
+            append_metrics(self.output_path, record)
+        except OSError as e:
+            self.emit(f"Could not write run metrics: {e}", logging.WARNING)
+        if self.history is not None and self.params is not None:
+            try:
+                self.history.record(record, self.params, self.argv)
+            except OSError as e:
+                self.emit(f"Could not record the run in the history: {e}", logging.WARNING)
+
+    def show_metrics(self):
+        metrics = self.sampler.summary()
+        self.metrics_label.config(text=(
+            f"Wall {metrics['wall_seconds']:.0f}s | CPU {metrics['cpu_percent']:.0f}% ({metrics['cpu_seconds']:.0f}s) | "
+            f"RSS {format_bytes(metrics['rss_bytes'])} (peak {format_bytes(metrics['peak_rss_bytes'])}) | "
+            f"Read {format_bytes(metrics['read_bytes'])} | Written {format_bytes(metrics['write_bytes'])} | Processes {metrics['processes']}"))
+
+# ===================================================================== #
+# JobScheduler class
+# ===================================================================== #
+def default_max_jobs():
+    # Respect CPU affinity / cgroup pinning on shared nodes where available
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, cores - 1)
+
+class JobScheduler:
+    priorities = {"High": 0, "Normal": 1, "Low": 2}
+
+    def __init__(self, max_jobs=None, memory_limit_bytes=None):
+        self.max_jobs = max_jobs or default_max_jobs()
+        # Runs also wait while their predicted peak memory would not fit next to the running ones
+        self.memory_limit_bytes = memory_limit_bytes
+        self.lock = threading.Lock()
+        self.pending = []
+        self.running = []
+        self.finished = []
+        self.counter = itertools.count(1)
+
+    def submit(self, runner, priority="Normal"):
+        with self.lock:
+            runner.job_id = next(self.counter)
+            runner.scheduler = self
+            runner.priority = priority
+            runner.state = "queued"
+            runner.submitted_at = time.time()
+            runner.on_finished.append(self.job_finished)
+            # Lower priority value first, FIFO within the same priority
+            heapq.heappush(self.pending, (self.priorities[priority], runner.job_id, runner))
+            position = len(self.pending)
+        runner.emit(f"Queued as job {runner.job_id} ({priority} priority, {position} waiting, {len(self.running)}/{self.max_jobs} slots busy).")
+        if runner.prediction is not None:
+            runner.emit(describe_prediction(runner.prediction))
+        self.dispatch()
+
+    def predicted_memory(self, runners):
+        return sum(runner.prediction["peak_rss_bytes"] for runner in runners if runner.prediction is not None)
+
+    def admits(self, runner):
+        # A run is never held back when nothing else is running, even if its prediction exceeds the limit
+        if self.memory_limit_bytes is None or not self.running:
+            return True
+        return self.predicted_memory(self.running + [runner]) <= self.memory_limit_bytes
+
+    def dispatch(self):
+        to_start = []
+        with self.lock:
+            while self.pending and len(self.running) < self.max_jobs:
+                # The head of the queue waits for memory rather than being overtaken, so priorities hold
+                if not self.admits(self.pending[0][2]):
+                    break
+                _, _, runner = heapq.heappop(self.pending)
+                self.running.append(runner)
+                to_start.append(runner)
+        for runner in to_start:
+            runner.start()
+
+    def job_finished(self, runner):
+        with self.lock:
+            if runner in self.running:
+                self.running.remove(runner)
+            self.finished.append(runner)
+        self.dispatch()
+
+    def remove(self, job_id):
+        with self.lock:
+            for i, (_, queued_id, runner) in enumerate(self.pending):
+                if queued_id == job_id:
+                    self.pending.pop(i)
+                    heapq.heapify(self.pending)
+                    runner.removed()
+                    return True
+        return False
+
+    def set_max_jobs(self, max_jobs):
+        with self.lock:
+            self.max_jobs = max(1, int(max_jobs))
+        self.dispatch()
+
+    def snapshot(self):
+        with self.lock:
+            pending = [runner for _, _, runner in sorted(self.pending)]
+            return list(self.running), pending, list(self.finished)
+
+# ===================================================================== #
+# QueueFrame class
+# ===================================================================== #
+class QueueFrame(ttk.Frame):
+    refresh_interval_ms = 500
+
+    def __init__(self, notebook, scheduler):
+        super().__init__(notebook)
+        self.scheduler = scheduler
+
+        controls = ttk.Frame(self)
+        controls.pack(side='top', fill='x', padx=10, pady=10)
+        tk.Label(controls, text="Parallel runs:").pack(side='left')
+        self.max_jobs = tk.StringVar(value=str(scheduler.max_jobs))
+        self.max_jobs_spinbox = tk.Spinbox(controls, from_=1, to=max(os.cpu_count() or 1, scheduler.max_jobs), width=4, textvariable=self.max_jobs, command=self.update_max_jobs)
+        self.max_jobs_spinbox.pack(side='left', padx=5)
+        self.max_jobs_spinbox.bind("<Return>", lambda e: self.update_max_jobs())
+        ToolTip(self.max_jobs_spinbox, "Maximum number of BETA runs executing at the same time.\nFurther runs wait in the queue.")
+        self.cancel_button = tk.Button(controls, text="Cancel selected", command=self.cancel_selected)
+        self.cancel_button.pack(side='right')
+        ToolTip(self.cancel_button, "Remove selected waiting runs from the queue and stop selected running runs.")
+        self.open_log_button = tk.Button(controls, text="Open log file...", command=self.open_log_file)
+        self.open_log_button.pack(side='right', padx=5)
+        ToolTip(self.open_log_button, "View any BETA run log, however large.")
+        self.view_log_button = tk.Button(controls, text="View log", command=self.view_selected_log)
+        self.view_log_button.pack(side='right')
+        ToolTip(self.view_log_button, "View the log of the selected run, following it while the run is active.")
+
+        columns = ("job", "type", "prefix", "state", "priority", "submitted", "waited", "runtime")
+        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        for column in columns:
+            self.tree.heading(column, text=column.capitalize())
+            self.tree.column(column, width=80, anchor='w')
+        self.tree.pack(expand=True, fill='both', padx=10, pady=(0, 10))
+
+        self.after(self.refresh_interval_ms, self.refresh)
+
+    def update_max_jobs(self):
+        if self.max_jobs.get().isdigit():
+            self.scheduler.set_max_jobs(self.max_jobs.get())
+
+    def cancel_selected(self):
+        running, pending, _ = self.scheduler.snapshot()
+        selected = set(self.tree.selection())
+        for runner in running + pending:
+            if str(runner.job_id) in selected:
+                runner.cancel()
+
+    def view_selected_log(self):
+        running, pending, finished = self.scheduler.snapshot()
+        selected = set(self.tree.selection())
+        for runner in running + pending + finished:
+            if str(runner.job_id) in selected and os.path.exists(runner.log_path):
+                open_log_viewer(self, runner.log_path, follow=runner.state in ("queued", "running"))
+
+    def open_log_file(self):
+        path = filedialog.askopenfilename(title="Select a BETA log", filetypes=[("Log files", "*.log"), ("All files", "*.*")])
+        if path:
+            open_log_viewer(self, path)
+
+    def refresh(self):
+        now = time.time()
+        running, pending, finished = self.scheduler.snapshot()
+        selection = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for runner in running + pending + finished[::-1]:
+            started = runner.started_at or now
+            waited = started - runner.submitted_at
+            runtime = ((runner.finished_at or now) - runner.started_at) if runner.started_at else 0
+            self.tree.insert('', tk.END, iid=str(runner.job_id), values=(
+                runner.job_id, runner.type, runner.prefix or "NA", runner.state, runner.priority,
+                datetime.fromtimestamp(runner.submitted_at).strftime("%H:%M:%S"),
+                f"{waited:.0f}s", f"{runtime:.0f}s"))
+        self.tree.selection_set([item for item in selection if self.tree.exists(item)])
+        self.after(self.refresh_interval_ms, self.refresh)
+
+# ===================================================================== #
+# CacheFrame class
+# ===================================================================== #
+class CacheFrame(ttk.Frame):
+    refresh_interval_ms = 2000
+
+    def __init__(self, notebook, cache):
+        super().__init__(notebook)
+        self.cache = cache
+
+        tk.Label(self, text=f"Result cache: {cache.cache_dir}", font=('Arial', 10, 'bold'), anchor='w').pack(side='top', fill='x', padx=10, pady=10)
+        self.stats_label = tk.Label(self, text="", justify="left", anchor='w')
+        self.stats_label.pack(side='top', fill='x', padx=10)
+        self.clear_button = tk.Button(self, text="Clear cache", command=self.clear)
+        self.clear_button.pack(side='top', anchor='w', padx=10, pady=10)
+        ToolTip(self.clear_button, "Delete all cached BETA outputs.")
+
+        self.after(0, self.refresh)
+
+    def clear(self):
+        self.cache.clear()
+        self.refresh(reschedule=False)
+
+    def refresh(self, reschedule=True):
+        stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = 100 * stats["hits"] / lookups if lookups else 0
+        self.stats_label.config(text=(
+            f"Cached runs: {stats['entries']}\n"
+            f"Size: {stats['bytes'] / 1e9:.2f} GB of {self.cache.max_bytes / 1e9:.2f} GB (least recently used runs are evicted first)\n"
+            f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {hit_rate:.0f}%\n"
+            f"Output restored from cache: {stats['bytes_saved'] / 1e9:.2f} GB, {stats['seconds_saved'] / 60:.1f} minutes of BETA runtime saved"))
+        if reschedule:
+            self.after(self.refresh_interval_ms, self.refresh)
+
+# ===================================================================== #
+# Result tables
+# ===================================================================== #
+# Tables written by BETA, e.g. NAME_uptarget.txt, NAME_downtarget_associate_peaks.bed, NAME_targets.txt
+RESULT_FILE_PATTERN = re.compile(r".*_(uptarget|downtarget|targets)(_associated?_peaks)?\.(txt|bed)$")
+
+def find_result_files(directory):
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name for name in names if RESULT_FILE_PATTERN.match(name))
+
+class ResultTable:
+    # Rows are located by byte offset and only decoded when shown, columns are parsed once when first sorted on
+    chunk_bytes = 1 << 22
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.data = b""
+        self.offsets = None
+        self.header = []
+        self.rows = 0
+        self.keys = {}
+        self.orders = {}
+
+    def load(self):
+        import numpy as np
+        self.file = open(self.path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size:
+            import mmap
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Start of every line, found one chunk at a time so the whole file is never copied
+        starts = [np.zeros(1, dtype=np.int64)]
+        for offset in range(0, size, self.chunk_bytes):
+            count = min(self.chunk_bytes, size - offset)
+            newlines = np.flatnonzero(np.frombuffer(self.data, dtype=np.uint8, count=count, offset=offset) == 10)
+            starts.append(newlines.astype(np.int64) + offset + 1)
+        offsets = np.concatenate(starts)
+        if offsets[-1] != size:
+            offsets = np.append(offsets, size)
+        first_row = self.line(offsets, 0) if len(offsets) > 1 else []
+        second_row = self.line(offsets, 1) if len(offsets) > 2 else []
+        # BETA headers start with '#', other tables are taken to have a header when only the line below it holds numbers
+        has_header = bool(first_row) and (first_row[0].startswith('#') or (not any(is_number(value) for value in first_row) and any(is_number(value) for value in second_row)))
+        if has_header:
+            self.header = [value.lstrip('#') for value in first_row]
+            offsets = offsets[1:]
+        width = max(len(first_row), len(second_row))
+        self.header += [f"Column {column + 1}" for column in range(len(self.header), width)]
+        self.offsets = offsets
+        self.rows = len(offsets) - 1
+        return self
+
+    def line(self, offsets, row):
+        return self.data[offsets[row]:offsets[row + 1]].decode(errors='replace').rstrip('\r\n').split('\t')
+
+    def row(self, row):
+        return self.line(self.offsets, row)
+
+    def column_keys(self, column):
+        # Numbers sort numerically, anything else as text; called from a worker thread
+        import numpy as np
+        if column not in self.keys:
+            values = []
+            for start in range(0, self.rows, 100000):
+                stop = min(start + 100000, self.rows)
+                block = self.data[self.offsets[start]:self.offsets[stop]].split(b'\n')[:stop - start]
+                for line in block:
+                    fields = line.rstrip(b'\r').split(b'\t')
+                    values.append(fields[column] if column < len(fields) else b"")
+            try:
+                self.keys[column] = np.array(values, dtype=np.float64)
+            except ValueError:
+                self.keys[column] = np.array(values, dtype=np.bytes_)
+        return self.keys[column]
+
+    def sorted_order(self, column, descending=False):
+        import numpy as np
+        if column not in self.orders:
+            self.orders[column] = np.argsort(self.column_keys(column), kind='stable')
+        return self.orders[column][::-1] if descending else self.orders[column]
+
+    def matching_rows(self, text):
+        # Rows containing the text anywhere, found with one regex pass over the mapped file.
+        # Lowercase text matches any case, text with capitals only itself (much faster)
+        import numpy as np
+        flags = re.IGNORECASE if text == text.lower() else 0
+        positions = np.fromiter((match.start() for match in re.finditer(re.escape(text.encode()), self.data, flags)), dtype=np.int64)
+        rows = np.unique(np.searchsorted(self.offsets, positions, side='right') - 1)
+        return rows[(rows >= 0) & (rows < self.rows)]
+
+    def view(self, order=None, filter_text=""):
+        # Rows to show, in display order
+        import numpy as np
+        view = order if order is not None else np.arange(self.rows)
+        if filter_text:
+            mask = np.zeros(self.rows, dtype=bool)
+            mask[self.matching_rows(filter_text)] = True
+            view = view[mask[view]]
+        return view
+
+    def close(self):
+        if isinstance(self.data, bytes):
+            self.data = b""
+        else:
+            self.data.close()
+        if self.file is not None:
+            self.file.close()
+
+# ===================================================================== #
+# ResultsFrame class
+# ===================================================================== #
+class ResultsFrame(ttk.Frame):
+    poll_interval_ms = 50
+    filter_delay_ms = 300
+    scroll_rows = 3
 
-    def run_subprocess(self):
-        # Create a new Toplevel window
-        self.popup = tk.Toplevel(self.root)
-        self.popup.title(f"Running BETA-{self.type}")
-        self.popup.geometry("800x600")
+    def __init__(self, notebook, directory="./"):
+        super().__init__(notebook)
+        self.directory = directory
+        self.table = None
+        self.view = None
+        self.first = 0
+        self.sort_column = None
+        self.descending = False
+        self.pending_filter = None
+        self.generation = 0
+        self.work_results = queue.Queue()
+        self.row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
 
-        # Create a Text widget to display output
-        self.output_text = tk.Text(self.popup)
-        self.output_text.pack(expand=True, fill='both')
+        controls = ttk.Frame(self)
+        controls.pack(side='top', fill='x', padx=10, pady=10)
+        tk.Button(controls, text="Output directory", command=self.choose_directory).pack(side='left')
+        self.file_choice = tk.StringVar()
+        self.file_menu = ttk.Combobox(controls, textvariable=self.file_choice, state='readonly', width=45)
+        self.file_menu.pack(side='left', padx=5)
+        self.file_menu.bind("<<ComboboxSelected>>", lambda e: self.open_table())
+        refresh_button = tk.Button(controls, text="Refresh", command=self.refresh_files)
+        refresh_button.pack(side='left')
+        ToolTip(refresh_button, "Look again for BETA result tables in the output directory.")
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add("write", self.request_filter)
+        self.filter_entry = tk.Entry(controls, textvariable=self.filter_text, width=20)
+        self.filter_entry.pack(side='right')
+        tk.Label(controls, text="Filter:").pack(side='right')
+        ToolTip(self.filter_entry, "Only show rows containing this text.\nLowercase text matches any case, text with capitals matches exactly.")
 
-        # Set up logging
-        self.logger = logging.getLogger(f"BETA-{self.type}")
-        self.logger.setLevel(logging.DEBUG)
-        current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.file_handler = logging.FileHandler(f"{self.output_path}BETA-{self.type}-{'-'.join(self.name_prefix.get().split())}_{current_time}.log")
-        self.formatter = logging.Formatter('%(levelname)s : %(name)s : %(message)s')
-        self.file_handler.setFormatter(self.formatter)
-        self.logger.addHandler(self.file_handler)
+        self.status = tk.Label(self, text="", anchor='w', justify='left')
+        self.status.pack(side='top', fill='x', padx=10)
 
-        
-        def read_output(pipe, queue):
-            for line in iter(pipe.readline, b''):
-                if line.strip():  # Only process non-empty lines
-                    queue.put(line)
-            pipe.close()
+        table_frame = ttk.Frame(self)
+        table_frame.pack(expand=True, fill='both', padx=10, pady=(0, 10))
+        self.scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        # Only as many items as fit on screen exist, scrolling replaces their values
+        self.tree = ttk.Treeview(table_frame, show='headings', selectmode='browse')
+        self.tree.pack(side='left', expand=True, fill='both')
+        self.tree.bind("<Configure>", lambda e: self.render())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.first - self.scroll_rows * (1 if e.delta > 0 else -1)))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.first - self.scroll_rows))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.first + self.scroll_rows))
 
-        def update_output():
+        self.refresh_files()
+
+    def choose_directory(self):
+        directory = filedialog.askdirectory(initialdir=self.directory)
+        if directory:
+            self.directory = directory
+            self.refresh_files()
+
+    def refresh_files(self):
+        names = find_result_files(self.directory)
+        self.file_menu.config(values=names)
+        if self.file_choice.get() not in names:
+            self.file_choice.set(names[0] if names else "")
+            self.open_table()
+        if not names:
+            self.status.config(text=f"No BETA result tables in {os.path.abspath(self.directory)}")
+
+    def run_in_worker(self, work, message):
+        # Results of superseded work are dropped by poll_work
+        self.generation += 1
+        generation = self.generation
+        def run():
             try:
-                while True:
-                    try:
-                        line = self.output_queue.get_nowait()
-                        self.output_text.insert(tk.END, line)
-                        self.output_text.see(tk.END)
-                        self.output_text.update()
-                        self.logger.info(line.strip())
-                    except queue.Empty:
-                        break
-                self.popup.after(10, update_output)  # Check for new output every 10ms
-            except tk.TclError:
-                # Window has been closed
-                pass
-        
+                result = work()
+            except (OSError, ImportError, ValueError) as e:
+                result = e
+            self.work_results.put((generation, result))
+        self.status.config(text=message)
+        threading.Thread(target=run, daemon=True).start()
+        self.after(self.poll_interval_ms, self.poll_work)
 
-        def run_cmd():
-            self.logger.info(f"Command: {self.cmd}")
-            self.output_text.insert(tk.END, f"Command: {self.cmd}\n")
-            self.process = subprocess.Popen(self.cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, universal_newlines=True)
-            
-            self.t = threading.Thread(target=read_output, args=(self.process.stdout, self.output_queue))
-            self.t.daemon = True
-            self.t.start()
-            
-            self.process.wait()
-            self.output_queue.put("Process completed.\n")
-        
-        threading.Thread(target=run_cmd, daemon=True).start()
-        self.popup.after(10, update_output)
+    def poll_work(self):
+        try:
+            generation, result = self.work_results.get_nowait()
+        except queue.Empty:
+            self.after(self.poll_interval_ms, self.poll_work)
+            return
+        if generation != self.generation:
+            return
+        if isinstance(result, Exception):
+            self.status.config(text=f"Could not read table: {result}")
+        elif isinstance(result, ResultTable):
+            self.show_table(result)
+        else:
+            self.view = result
+            self.scroll_to(0)
+
+    def open_table(self):
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+        self.view = None
+        self.sort_column = None
+        self.tree.delete(*self.tree.get_children())
+        if self.file_choice.get():
+            path = os.path.join(self.directory, self.file_choice.get())
+            self.run_in_worker(lambda: ResultTable(path).load(), f"Indexing {path}...")
+
+    def show_table(self, table):
+        self.table = table
+        columns = [str(column) for column in range(len(table.header))]
+        self.tree.config(columns=columns)
+        for column, name in zip(columns, table.header):
+            self.tree.heading(column, text=name, command=lambda c=int(column): self.sort_by(c))
+            self.tree.column(column, width=100, anchor='w')
+        self.update_view()
+
+    def update_view(self):
+        if self.table is None:
+            return
+        table, column, descending, filter_text = self.table, self.sort_column, self.descending, self.filter_text.get()
+        def work():
+            order = table.sorted_order(column, descending) if column is not None else None
+            return table.view(order, filter_text)
+        self.run_in_worker(work, "Sorting and filtering..." if column is not None or filter_text else "Loading...")
+
+    def sort_by(self, column):
+        self.descending = not self.descending if column == self.sort_column else False
+        self.sort_column = column
+        for index, name in enumerate(self.table.header):
+            arrow = (" ▼" if self.descending else " ▲") if index == column else ""
+            self.tree.heading(str(index), text=name + arrow)
+        self.update_view()
+
+    def request_filter(self, *args):
+        if self.pending_filter is not None:
+            self.after_cancel(self.pending_filter)
+        self.pending_filter = self.after(self.filter_delay_ms, self.apply_filter)
+
+    def apply_filter(self):
+        self.pending_filter = None
+        self.update_view()
+
+    def visible_rows(self):
+        # The heading takes about one row
+        return max(1, self.tree.winfo_height() // self.row_height - 1)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        visible = self.visible_rows()
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.view)) if self.view is not None else 0)
+        elif action == 'scroll':
+            self.scroll_to(self.first + int(amount) * (visible if unit == 'pages' else 1))
+
+    def scroll_to(self, first):
+        if self.view is None:
+            return
+        self.first = max(0, min(first, len(self.view) - self.visible_rows()))
+        self.render()
+
+    def render(self):
+        if self.view is None or self.table is None:
+            return
+        visible = self.visible_rows()
+        total = len(self.view)
+        rows = [self.table.row(row) for row in self.view[self.first:self.first + visible]]
+        items = self.tree.get_children()
+        for index, values in enumerate(rows):
+            if index < len(items):
+                self.tree.item(items[index], values=values)
+            else:
+                self.tree.insert('', tk.END, iid=str(index), values=values)
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + visible) / total))
+        else:
+            self.scrollbar.set(0, 1)
+        shown = f"{total:,} of {self.table.rows:,} rows" if total != self.table.rows else f"{total:,} rows"
+        self.status.config(text=f"{self.table.path}: {shown}, showing {self.first + 1 if total else 0}-{min(total, self.first + visible):,}")
+
+# ===================================================================== #
+# HistoryFrame class
+# ===================================================================== #
+class HistoryFrame(ttk.Frame):
+    def __init__(self, notebook, history, frames):
+        super().__init__(notebook)
+        self.notebook = notebook
+        self.history = history
+        # BetaFrame per BETA type, for loading parameters back
+        self.frames = frames
+        self.file_path = ""
+
+        controls = ttk.Frame(self)
+        controls.pack(side='top', fill='x', padx=10, pady=10)
+        tk.Label(controls, text="Type:").pack(side='left')
+        self.type_choice = tk.StringVar(value="All")
+        type_menu = ttk.Combobox(controls, textvariable=self.type_choice, values=["All", "plus", "basic", "minus"], state='readonly', width=6)
+        type_menu.pack(side='left', padx=5)
+        type_menu.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+        tk.Label(controls, text="Genome:").pack(side='left')
+        self.genome_choice = tk.StringVar(value="All")
+        genome_menu = ttk.Combobox(controls, textvariable=self.genome_choice, values=["All"] + GENOME_OPTIONS, state='readonly', width=6)
+        genome_menu.pack(side='left', padx=5)
+        genome_menu.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+        self.file_button = tk.Button(controls, text="Runs on file...", command=self.choose_file)
+        self.file_button.pack(side='left', padx=5)
+        ToolTip(self.file_button, "Only show runs that used this file, or a file with the same contents, as an input.")
+        self.clear_file_button = tk.Button(controls, text="All files", command=lambda: self.set_file(""))
+        self.clear_file_button.pack(side='left')
+        self.load_button = tk.Button(controls, text="Load parameters", command=self.load_selected)
+        self.load_button.pack(side='right')
+        ToolTip(self.load_button, "Fill the BETA tab of the selected run with its parameters.")
+
+        self.status = tk.Label(self, text="", anchor='w')
+        self.status.pack(side='top', fill='x', padx=10)
+
+        columns = ("id", "start", "type", "genome", "prefix", "state", "exit", "wall", "peak RSS", "output")
+        self.tree = ttk.Treeview(self, columns=columns, show='headings')
+        for column in columns:
+            self.tree.heading(column, text=column.capitalize() if column != "peak RSS" else "Peak RSS")
+            self.tree.column(column, width=70, anchor='w')
+        self.tree.column("start", width=130)
+        self.tree.column("output", width=200)
+        self.tree.pack(expand=True, fill='both', padx=10)
+        self.tree.bind("<Double-1>", lambda e: self.load_selected())
+
+        tk.Label(self, text="Successful runs by type and genome:", anchor='w').pack(side='top', fill='x', padx=10, pady=(10, 0))
+        summary_columns = ("type", "genome", "runs", "median wall", "median peak RSS")
+        self.summary_tree = ttk.Treeview(self, columns=summary_columns, show='headings', height=6)
+        for column in summary_columns:
+            self.summary_tree.heading(column, text=column.capitalize().replace("rss", "RSS"))
+            self.summary_tree.column(column, width=100, anchor='w')
+        self.summary_tree.pack(fill='x', padx=10, pady=(0, 10))
+
+    def choose_file(self):
+        path = filedialog.askopenfilename(title="Select an input file")
+        if path:
+            self.set_file(path)
+
+    def set_file(self, path):
+        self.file_path = path
+        self.refresh()
+
+    def refresh(self):
+        start = time.perf_counter()
+        type = self.type_choice.get() if self.type_choice.get() != "All" else None
+        genome = self.genome_choice.get() if self.genome_choice.get() != "All" else None
+        try:
+            runs = self.history.runs(type=type, genome=genome, path=self.file_path)
+            summary = self.history.summary()
+        except OSError as e:
+            self.status.config(text=str(e))
+            return
+        self.tree.delete(*self.tree.get_children())
+        for run in runs:
+            self.tree.insert('', tk.END, iid=str(run["id"]), values=(
+                run["id"], datetime.fromtimestamp(run["start"]).strftime("%Y-%m-%d %H:%M") if run["start"] else "",
+                run["type"], run["genome"] or "", run["prefix"], run["state"], run["exit_code"],
+                f"{run['wall_seconds']:.0f}s" if run["wall_seconds"] is not None else "",
+                format_bytes(run["peak_rss_bytes"]) if run["peak_rss_bytes"] else "", run["output_path"]))
+        self.summary_tree.delete(*self.summary_tree.get_children())
+        for row in summary:
+            self.summary_tree.insert('', tk.END, values=(
+                row["type"], row["genome"] or "", row["runs"],
+                f"{row['median_wall_seconds']:.0f}s" if row["median_wall_seconds"] is not None else "",
+                format_bytes(row["median_peak_rss_bytes"]) if row["median_peak_rss_bytes"] else ""))
+        on_file = f" on {os.path.basename(self.file_path)}" if self.file_path else ""
+        self.status.config(text=f"{len(runs)} runs{on_file} ({(time.perf_counter() - start) * 1000:.0f} ms), history: {self.history.path}")
+
+    def load_selected(self):
+        for item in self.tree.selection():
+            params = self.history.params(int(item))
+            frame = self.frames.get(params.get("type")) if params else None
+            if frame is not None:
+                frame.set_params(params)
+                self.notebook.select(frame)
 
 # ===================================================================== #
 # BetaFrame class
 # ===================================================================== #
 class BetaFrame(tk.Canvas):
-    def __init__(self, notebook, type="plus", max_width=800):
+    def __init__(self, notebook, type="plus", max_width=800, scheduler=None, cache=None, builder=None, executor=None, history=None, predictor=None):
         super().__init__()
+        self.predictor = predictor
+        self.prediction = None
         self.notebook = notebook
+        self.scheduler = scheduler
+        self.cache = cache
+        self.executor = executor
+        self.history = history
+        self.builder = builder
         self.max_width = max_width
         self.num_widgets = 0
         self.type = type
         self.output_path = "./"
+        self.preflight = {}
+        self.preflight_pending = set()
+        self.preflight_results = queue.Queue()
 
         self.style = ttk.Style()
         self.style.theme_use('alt')
@@ -132,6 +3347,12 @@ class BetaFrame(tk.Canvas):
         self.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
         
+    def ensure_built(self):
+        # Widgets are created the first time the tab is shown
+        if self.builder is not None:
+            builder, self.builder = self.builder, None
+            builder(self)
+
     def add_description(self, text):
         self.description = tk.Label(self.scrollable_frame, text=text, justify="left", wraplength=self.max_width, font=('Arial', 12, 'bold'))
         self.description.grid(row=self.num_widgets, columnspan=2, padx=10, pady=10, sticky='NSEW')
@@ -146,56 +3367,69 @@ class BetaFrame(tk.Canvas):
         self.num_widgets += 1
         '''
         self.cmd = tk.StringVar()
+        self.argv = ()
+        self.pending_cmd_update = None
 
-    def update_cmd(self):
-        command_text = f"BETA {self.type}"
-        if self.genome.get():
-            if self.genome.get() != 'Other':
-                command_text += f" -g {self.genome.get()}"
-            else:
-                if self.reference_file_path != "":
-                    command_text += f" -r {self.reference_file_path}"
-        if self.bl_state.get():
-            command_text += " --bl"
-        if self.peak_number.get():
-            command_text += f" --pn {self.peak_number.get()}"
-        if self.distance.get():
-            command_text += f" -d {self.distance.get()}"
-        if self.output_path:
-            command_text += f" -o {self.output_path}"
-        if self.name_prefix and self.name_prefix.get() != "":
-            command_text += f" -n {'-'.join(self.name_prefix.get().split())}"
-        else:
-            command_text = command_text.replace(f" -n {self.name_prefix.get()}", "")
-        if self.boundary_file_path:
-            command_text += f" --bf {self.boundary_file_path}"
+    def get_params(self):
+        params = {
+            "type": self.type,
+            "genome": self.genome.get(),
+            "reference_file_path": self.reference_file_path,
+            "bl": self.bl_state.get(),
+            "peak_number": self.peak_number.get(),
+            "distance": self.distance.get(),
+            "output_path": self.output_path,
+            "name_prefix": self.name_prefix.get(),
+            "boundary_file_path": self.boundary_file_path,
+            "peaks_file_path": self.peaks_file_path,
+        }
+        if hasattr(self, "window_genome_state"):
+            params["window_genome"] = self.window_genome_state.get()
+        if hasattr(self, "engine"):
+            params["engine"] = self.engine.get()
+        if hasattr(self, "tss_filter_state"):
+            params["tss_filter"] = self.tss_filter_state.get()
+        if hasattr(self, "subset_reference_state"):
+            params["subset_reference"] = self.subset_reference_state.get()
+        if hasattr(self, "preselect_state"):
+            params["preselect_peaks"] = self.preselect_state.get()
+            params["preselect_column"] = self.preselect_column.get()
         if self.type != 'minus':
-            if self.gname_state.get():
-                command_text += " --gname2"
-            if self.expression_file_path:
-                command_text += f" -e {self.expression_file_path}"
-            if self.kind.get():
-                command_text += f" -k {self.kind_options[self.kind.get()]}"
-            if self.kind_info_id.get() and self.kind_info_change.get() and self.kind_info_stat.get():
-                command_text += f" --info {self.kind_info_id.get()},{self.kind_info_change.get()},{self.kind_info_stat.get()}"
-            if self.method.get():
-                command_text += f" --method {self.method.get()}"
-            if self.fdr.get():
-                command_text += f" --df {self.fdr.get()}"
-            if self.gene_amount.get():
-                command_text += f" --da {self.gene_amount.get()}"
-            if self.pvalue_cutoff.get():
-                command_text += f" -c {self.pvalue_cutoff.get()}"
+            params.update({
+                "gname2": self.gname_state.get(),
+                "expression_file_path": self.expression_file_path,
+                "kind": self.kind.get(),
+                "info_id": self.kind_info_id.get(),
+                "info_change": self.kind_info_change.get(),
+                "info_stat": self.kind_info_stat.get(),
+                "method": self.method.get(),
+                "fdr": self.fdr.get(),
+                "gene_amount": self.gene_amount.get(),
+                "pvalue_cutoff": self.pvalue_cutoff.get(),
+            })
             if self.type != 'basic':
-                if self.genome_sequence_file_path:
-                    command_text += f" --gs {self.genome_sequence_file_path}"
-                if self.number_motifs.get():
-                    command_text += f" --mn {self.number_motifs.get()}"
-        if self.peaks_file_path:
-            command_text += f" -p {self.peaks_file_path}"
-        
+                params.update({
+                    "genome_sequence_file_path": self.genome_sequence_file_path,
+                    "number_motifs": self.number_motifs.get(),
+                })
+        return params
+
+    def update_cmd(self):
         #self.cmd.config(text=command_text)
-        self.cmd = command_text
+        if self.pending_cmd_update is not None:
+            self.after_cancel(self.pending_cmd_update)
+            self.pending_cmd_update = None
+        params = self.get_params()
+        self.argv = build_argv(params)
+        self.cmd = build_cmd(params)
+        self.update_estimate()
+        self.update_rethreshold()
+
+    def request_update_cmd(self):
+        # Typing fires a trace per keystroke, rebuild once the burst settles
+        if self.pending_cmd_update is not None:
+            self.after_cancel(self.pending_cmd_update)
+        self.pending_cmd_update = self.after(CMD_UPDATE_DELAY_MS, self.update_cmd)
 
     def add_label(self, text, font=('Arial', 10), colspan=1, column=0, padx=10, pady=10, sticky='NSEW'):
         label = tk.Label(self.scrollable_frame, text=text, justify="left", font=font, wraplength=self.max_width)
@@ -223,14 +3457,16 @@ class BetaFrame(tk.Canvas):
         self.expression_file_path = filedialog.askopenfilename(
             title="Select Expression File",
             initialdir="./",
-            filetypes=(("Tab-delimited", "*.tsv"),
+            filetypes=(("Tab-delimited", "*.tsv *.tsv.gz"),
+                    ("Gzip-compressed", "*.gz"),
                     ("All files", "*.*"))
         )
         if self.expression_file_path:
-            self.expression_label.config(text=f"Expression file:\n{os.path.basename(self.expression_file_path)}")
+            self.expression_label.config(text=f"Expression file:\n{os.path.basename(self.expression_file_path)}\nChecking...", fg="black")
         else:
             self.expression_file_path = ""
-            self.expression_label.config(text="No expression file selected.")
+            self.expression_label.config(text="No expression file selected.", fg="black")
+        self.start_preflight("expression", self.expression_file_path)
         self.validate_run_params()
         self.update_cmd()
 
@@ -247,16 +3483,18 @@ class BetaFrame(tk.Canvas):
         self.peaks_file_path = filedialog.askopenfilename(
             title="Select Peaks File",
             initialdir="./", 
-            filetypes=(("Bed", "*.bed"),
-                    ("NarrowPeak", "*.narrowPeak"),
-                    ("BroadPeak", "*.broadPeak"),
+            filetypes=(("Bed", "*.bed *.bed.gz"),
+                    ("NarrowPeak", "*.narrowPeak *.narrowPeak.gz"),
+                    ("BroadPeak", "*.broadPeak *.broadPeak.gz"),
+                    ("Gzip-compressed", "*.gz"),
                     ("All files", "*.*"))
         )
         if self.peaks_file_path:
-            self.peaks_label.config(text=f"Peaks file:\n{os.path.basename(self.peaks_file_path)}")
+            self.peaks_label.config(text=f"Peaks file:\n{os.path.basename(self.peaks_file_path)}\nChecking...", fg="black")
         else:
             self.peaks_file_path = ""
-            self.peaks_label.config(text="No peaks file selected.")
+            self.peaks_label.config(text="No peaks file selected.", fg="black")
+        self.start_preflight("peaks", self.peaks_file_path)
         self.validate_run_params()
         self.update_cmd()
 
@@ -298,7 +3536,7 @@ class BetaFrame(tk.Canvas):
             title="Select Reference Genome File",
             initialdir="./", 
             filetypes=(("GTF", "*.gtf"),
-                       ("Text", "*.txt"),
+                       ("Text", "*.txt *.txt.gz"),
                        ("Fasta", "*.fa"),
                        ("Tab-delimited", "*.tsv"),
                        ("Comma-separated", "*.csv"),
@@ -329,7 +3567,7 @@ class BetaFrame(tk.Canvas):
         self.validate_run_params()
         self.update_cmd()
 
-    def add_genome_dropdown(self, genome_options=["Other", "hg38", "hg19", "hg18", "mm10", "mm9"]):
+    def add_genome_dropdown(self, genome_options=GENOME_OPTIONS):
         self.genome_options = genome_options
         self.genome = tk.StringVar()
         self.genome.set("Other")
@@ -342,11 +3580,12 @@ class BetaFrame(tk.Canvas):
 
     def update_kind_info_id(self, *args):
         if self.kind_info_id.get():
-            self.update_cmd()
+            self.request_update_cmd()
+        self.refresh_expression_preflight()
 
     def add_info_id_textbox(self):
         # variable for gene id column
-        self.kind_info_id_defaults = {"DESeq2": 1, "Limma": 1, "EdgeR": 1, "Cuffdiff": 2, "BETA-Specific Format": 1, "Other": 1}
+        self.kind_info_id_defaults = {kind: columns[0] for kind, columns in KIND_INFO_DEFAULTS.items()}
         self.validate_command_info_id = self.register(self.validate_integer_input)
         self.kind_info_id = tk.StringVar()
         self.kind_info_id.set(self.kind_info_id_defaults[self.kind.get()])
@@ -363,11 +3602,12 @@ class BetaFrame(tk.Canvas):
 
     def update_kind_info_change(self, *args):
         if self.kind_info_change.get():
-            self.update_cmd()
+            self.request_update_cmd()
+        self.refresh_expression_preflight()
 
     def add_info_change_textbox(self):
         # variable for differential change column
-        self.kind_info_change_defaults = {"DESeq2": 3, "Limma": 2, "EdgeR": 2, "Cuffdiff": 10, "BETA-Specific Format": 2, "Other": 2}
+        self.kind_info_change_defaults = {kind: columns[1] for kind, columns in KIND_INFO_DEFAULTS.items()}
         self.validate_command_info_change = self.register(self.validate_integer_input)
         self.kind_info_change = tk.StringVar()
         self.kind_info_change.set(self.kind_info_change_defaults[self.kind.get()])
@@ -384,11 +3624,12 @@ class BetaFrame(tk.Canvas):
 
     def update_kind_info_stat(self, *args):
         if self.kind_info_stat.get():
-            self.update_cmd()
+            self.request_update_cmd()
+        self.refresh_expression_preflight()
 
     def add_info_stat_textbox(self):
         # variable for differential change column
-        self.kind_info_stat_defaults = {"DESeq2": 7, "Limma": 6, "EdgeR": 5, "Cuffdiff": 13, "BETA-Specific Format": 3, "Other": 3}
+        self.kind_info_stat_defaults = {kind: columns[2] for kind, columns in KIND_INFO_DEFAULTS.items()}
         self.validate_command_info_stat = self.register(self.validate_integer_input)
         self.kind_info_stat = tk.StringVar()
         self.kind_info_stat.set(self.kind_info_stat_defaults[self.kind.get()])
@@ -410,7 +3651,7 @@ class BetaFrame(tk.Canvas):
         self.validate_run_params()
         self.update_cmd()
 
-    def add_kind_dropdown(self, kind_options={"DESeq2": "O", "Limma": "LIM", "EdgeR": "O", "Cuffdiff": "CUF", "BETA-Specific Format": "BSF", "Other": "O"}):
+    def add_kind_dropdown(self, kind_options=KIND_OPTIONS):
         self.kind_options = kind_options
         self.kind = tk.StringVar()
         self.kind.set("DESeq2")
@@ -425,7 +3666,7 @@ class BetaFrame(tk.Canvas):
         self.validate_run_params()
         self.update_cmd()
 
-    def add_method_dropdown(self, method_options=['score', 'distance']):
+    def add_method_dropdown(self, method_options=METHOD_OPTIONS):
         self.method_options = method_options
         self.method = tk.StringVar()
         self.method.set("score")
@@ -483,7 +3724,7 @@ class BetaFrame(tk.Canvas):
 
     def update_name_prefix(self, *args):
         if self.name_prefix:
-            self.update_cmd()
+            self.request_update_cmd()
 
     def add_name_prefix_textbox(self):
         self.name_prefix = tk.StringVar()
@@ -512,7 +3753,7 @@ class BetaFrame(tk.Canvas):
 
     def update_peak_number(self, *args):
         if self.peak_number:
-            self.update_cmd()
+            self.request_update_cmd()
 
     def add_peak_number_textbox(self):
         self.validate_command_peaks = self.register(self.validate_integer_input)
@@ -527,9 +3768,21 @@ class BetaFrame(tk.Canvas):
         ToolTip(self.peak_number_label, "The number of peaks you want to consider.")
         self.num_widgets += 1
 
+    def add_preselect_peaks_checkbox(self):
+        self.preselect_state = tk.BooleanVar()
+        self.preselect_checkbutton = tk.Checkbutton(self.scrollable_frame, text="Pre-select top peaks by", variable=self.preselect_state)
+        self.preselect_checkbutton.grid(row=self.num_widgets, column=0, pady=5, padx=10, sticky='E')
+        ToolTip(self.preselect_checkbutton, "Before launching, keep only the top 'Number of peaks' peaks in a compact 5-column bed file.\nSpeeds up BETA on large peak files with a small number of peaks.")
+        self.preselect_column = tk.StringVar()
+        self.preselect_column.set("score")
+        self.preselect_dropdown = tk.OptionMenu(self.scrollable_frame, self.preselect_column, *PEAK_SCORE_COLUMNS)
+        self.preselect_dropdown.grid(row=self.num_widgets, column=1, pady=5, padx=10, sticky='W')
+        ToolTip(self.preselect_dropdown, "Column used to rank peaks: score (column 5), or signalValue (column 7) / pValue (column 8) of narrowPeak files.")
+        self.num_widgets += 1
+
     def update_distance(self, *args):
         if self.distance:
-            self.update_cmd()
+            self.request_update_cmd()
 
     def add_distance_textbox(self):
         self.validate_command_distance = self.register(self.validate_integer_input)
@@ -544,9 +3797,16 @@ class BetaFrame(tk.Canvas):
         ToolTip(self.distance_label, "Get peaks within this distance from gene TSS.")
         self.num_widgets += 1
 
+    def add_tss_filter_checkbox(self):
+        self.tss_filter_state = tk.BooleanVar()
+        self.tss_filter_checkbutton = tk.Checkbutton(self.scrollable_frame, text="Drop peaks beyond the distance from any TSS", variable=self.tss_filter_state)
+        self.tss_filter_checkbutton.grid(row=self.num_widgets, column=0, columnspan=2, pady=5, padx=10, sticky='NSEW')
+        ToolTip(self.tss_filter_checkbutton, "With genome Other, remove the selected peaks that lie farther than 'Distance of peaks to TSS' from every TSS\nof the refGene file before BETA reads them. Results are unchanged, such peaks never score.")
+        self.num_widgets += 1
+
     def update_fdr(self, *args):
         if self.fdr:
-            self.update_cmd()
+            self.request_update_cmd()
 
     def add_fdr_textbox(self):
         self.validate_command_fdr = self.register(self.validate_number)
@@ -563,7 +3823,7 @@ class BetaFrame(tk.Canvas):
 
     def update_gene_amount(self, *args):
         if self.gene_amount:
-            self.update_cmd()
+            self.request_update_cmd()
 
     def add_gene_amount_textbox(self):
         self.validate_command_genes = self.register(self.validate_number)
@@ -580,7 +3840,7 @@ class BetaFrame(tk.Canvas):
 
     def update_pvalue_cutoff(self, *args):
         if self.pvalue_cutoff:
-            self.update_cmd()
+            self.request_update_cmd()
 
     def add_pvalue_cutoff_textbox(self):
         self.validate_command_pvalue = self.register(self.validate_number)
@@ -608,8 +3868,9 @@ class BetaFrame(tk.Canvas):
         self.genome_sequence_file_path = filedialog.askopenfilename(
             title="Select Genome Sequence File",
             initialdir="./", 
-            filetypes=(("Fasta", "*.fa"),
-                       ("Fasta", "*.fasta"),
+            filetypes=(("Fasta", "*.fa *.fa.gz"),
+                       ("Fasta", "*.fasta *.fasta.gz"),
+                       ("Gzip-compressed", "*.gz"),
                     ("All files", "*.*"))
         )
         if self.genome_sequence_file_path:
@@ -620,9 +3881,23 @@ class BetaFrame(tk.Canvas):
         self.validate_run_params()
         self.update_cmd()
 
+    def add_subset_reference_checkbox(self):
+        self.subset_reference_state = tk.BooleanVar()
+        self.subset_reference_checkbutton = tk.Checkbutton(self.scrollable_frame, text="Use only reference genes in the expression file", variable=self.subset_reference_state)
+        self.subset_reference_checkbutton.grid(row=self.num_widgets, column=0, columnspan=2, pady=5, padx=10, sticky='NSEW')
+        ToolTip(self.subset_reference_checkbutton, "With genome Other, sort the refGene file once, then pass BETA only the transcripts whose RefSeq name\n(or gene symbol with --gname2) is a gene ID of the expression file.\nSaves BETA parsing and scoring the whole reference on every run.")
+        self.num_widgets += 1
+
+    def add_window_genome_checkbox(self):
+        self.window_genome_state = tk.BooleanVar()
+        self.window_genome_checkbutton = tk.Checkbutton(self.scrollable_frame, text="Read only genome sequence near peaks", variable=self.window_genome_state)
+        self.window_genome_checkbutton.grid(row=self.num_widgets, column=0, columnspan=2, pady=5, padx=10, sticky='NSEW')
+        ToolTip(self.window_genome_checkbutton, "Index the genome sequence file once, then pass BETA a local copy holding only the sequence within\n'Distance of peaks to TSS' of the selected peaks (other bases masked as N).\nSaves reading the whole genome from network storage on every run; the copy is cached\nand reused by runs on the same peaks and distance.")
+        self.num_widgets += 1
+
     def update_number_motifs(self, *args):
         if self.number_motifs:
-            self.update_cmd()
+            self.request_update_cmd()
 
     def add_number_motifs_textbox(self):
         self.validate_command_motifs = self.register(self.validate_number)
@@ -637,6 +3912,69 @@ class BetaFrame(tk.Canvas):
         ToolTip(self.number_motifs_label, "Number of motifs (>1) or p-value cutoff (0-1) to retrieve motifs.")
         self.num_widgets += 1
 
+    def start_preflight(self, kind, path):
+        # Scan the selected file in a worker thread, results are picked up by poll_preflight
+        self.preflight[kind] = None
+        if not path:
+            return
+        def scan():
+            start = time.perf_counter()
+            try:
+                report = scan_peaks_file(path) if kind == "peaks" else scan_expression_file(path)
+            except OSError as e:
+                report = {"path": path, "error": str(e)}
+            report["seconds"] = time.perf_counter() - start
+            self.preflight_results.put((kind, report))
+        if not self.preflight_pending:
+            self.after(100, self.poll_preflight)
+        self.preflight_pending.add(kind)
+        threading.Thread(target=scan, daemon=True).start()
+
+    def poll_preflight(self):
+        while True:
+            try:
+                kind, report = self.preflight_results.get_nowait()
+            except queue.Empty:
+                break
+            # Ignore results for a file that has since been replaced
+            if report["path"] == (self.peaks_file_path if kind == "peaks" else self.expression_file_path):
+                self.preflight[kind] = report
+                self.preflight_pending.discard(kind)
+                self.show_preflight(kind)
+        if self.preflight_pending:
+            self.after(100, self.poll_preflight)
+        self.validate_run_params()
+
+    def preflight_problems(self, kind):
+        report = self.preflight.get(kind)
+        if report is None:
+            return []
+        if "error" in report:
+            return [report["error"]]
+        if kind == "peaks":
+            return check_peaks_report(report)
+        return check_expression_report(report, self.kind_info_id.get(), self.kind_info_change.get(), self.kind_info_stat.get())
+
+    def show_preflight(self, kind):
+        report = self.preflight.get(kind)
+        if report is None:
+            return
+        label = self.peaks_label if kind == "peaks" else self.expression_label
+        path = report["path"]
+        problems = self.preflight_problems(kind)
+        summary = f"{kind.capitalize()} file:\n{os.path.basename(path)}"
+        if "error" not in report:
+            summary += f"\n{report['rows']:,} rows, {describe_columns(report)} columns, checked in {report['seconds']:.1f}s"
+        if problems:
+            summary += "\n" + "\n".join(problems)
+        label.config(text=summary, fg="red" if problems else "darkgreen")
+        self.update_estimate()
+
+    def refresh_expression_preflight(self):
+        if self.preflight.get("expression") is not None:
+            self.show_preflight("expression")
+            self.validate_run_params()
+
     def validate_run_params(self):
         if self.genome.get() != "Other":
             if self.peaks_file_path != "":
@@ -668,33 +4006,255 @@ class BetaFrame(tk.Canvas):
                     self.run_button.config(state=tk.DISABLED)
             else:
                 self.run_button.config(state=tk.DISABLED)
+        # The native engine only reads refGene files and has no CTCF boundary support
+        if hasattr(self, "engine") and self.engine.get() == "native" and (self.genome.get() != "Other" or self.bl_state.get()):
+            self.run_button.config(state=tk.DISABLED)
+        # Never launch runs on files that are still being checked or failed the pre-flight checks
+        if self.preflight_pending or self.preflight_problems("peaks") or (self.type != 'minus' and self.preflight_problems("expression")):
+            self.run_button.config(state=tk.DISABLED)
+        if hasattr(self, "sweep_button"):
+            self.sweep_button.config(state=self.run_button.cget('state'))
 
     def run_beta(self):
         #runner = SubprocessRunner(self, self.output_path, self.cmd.cget('text'), self.type, self.name_prefix)
-        runner = SubprocessRunner(self, self.output_path, self.cmd, self.type, self.name_prefix)
-        runner.run_subprocess()
+        cache = self.cache if self.cache is not None and self.use_cache_state.get() else None
+        timeout = float(self.timeout.get()) * 60 if hasattr(self, "timeout") and self.timeout.get() else None
+        self.update_cmd()
+        runner = SubprocessRunner(self, self.output_path, self.argv, self.type, self.name_prefix, params=self.get_params(), cache=cache, timeout=timeout, executor=self.executor, history=self.history)
+        runner.prediction = self.prediction
+        if self.scheduler is None:
+            runner.run_subprocess()
+        else:
+            runner.run_subprocess(start=False)
+            self.scheduler.submit(runner, self.priority.get())
+
+    def add_timeout_textbox(self):
+        self.validate_command_timeout = self.register(self.validate_number)
+        self.timeout = tk.StringVar()
+        self.timeout_label = tk.Label(self.scrollable_frame, text="Timeout (minutes):", wraplength=self.max_width//2)
+        self.timeout_label.grid(row=self.num_widgets, column=0, pady=5, padx=10, sticky='E')
+        self.timeout_entry = tk.Entry(self.scrollable_frame, textvariable=self.timeout, validate="key", validatecommand=(self.validate_command_timeout, '%P'))
+        self.timeout_entry.place(width=100)
+        self.timeout_entry.grid(row=self.num_widgets, column=1, pady=5, sticky='W')
+        ToolTip(self.timeout_label, "Cancel the run if it is still running after this many minutes.\nLeave empty for no limit.")
+        self.num_widgets += 1
+
+    def add_cache_checkbox(self):
+        self.use_cache_state = tk.BooleanVar()
+        self.use_cache_state.set(True)
+        self.use_cache_checkbutton = tk.Checkbutton(self.scrollable_frame, text="Reuse cached results", variable=self.use_cache_state)
+        self.use_cache_checkbutton.grid(row=self.num_widgets, column=0, columnspan=2, pady=5, padx=10, sticky='NSEW')
+        ToolTip(self.use_cache_checkbutton, "Restore the output files of an identical earlier run (same input files and parameters) instead of running BETA again.")
+        self.num_widgets += 1
+
+    def add_priority_dropdown(self):
+        self.priority = tk.StringVar()
+        self.priority.set("Normal")
+        self.priority_label = tk.Label(self.scrollable_frame, text="Queue priority:", wraplength=self.max_width//2)
+        self.priority_label.grid(row=self.num_widgets, column=0, pady=5, padx=10, sticky='E')
+        self.priority_dropdown = tk.OptionMenu(self.scrollable_frame, self.priority, *JobScheduler.priorities)
+        self.priority_dropdown.grid(row=self.num_widgets, column=1, pady=5, padx=10, sticky='W')
+        ToolTip(self.priority_dropdown, "Runs wait in the queue until a slot is free.\nHigher priority runs start first, equal priorities start in order of submission.")
+        self.num_widgets += 1
         
+    def add_engine_dropdown(self):
+        self.engine = tk.StringVar()
+        self.engine.set("BETA")
+        self.engine_label = tk.Label(self.scrollable_frame, text="Engine:", wraplength=self.max_width//2)
+        self.engine_label.grid(row=self.num_widgets, column=0, pady=5, padx=10, sticky='E')
+        self.engine_dropdown = tk.OptionMenu(self.scrollable_frame, self.engine, *ENGINE_OPTIONS, command=lambda _: (self.validate_run_params(), self.update_cmd()))
+        self.engine_dropdown.grid(row=self.num_widgets, column=1, pady=5, padx=10, sticky='W')
+        ToolTip(self.engine_dropdown, f"BETA: run BETA {self.type} in its python2 environment.\nnative: compute the same regulatory potential scores{' and KS-test function prediction' if self.type == 'basic' else ''} with NumPy in Python 3, much faster.\nThe native engine needs genome Other with a refGene file and does not use CTCF boundaries.")
+        self.num_widgets += 1
+
     def add_run_button(self, text):
         self.run_button = tk.Button(self.scrollable_frame, text=text, font=('Arial', 12, 'bold'), command=self.run_beta, state=tk.DISABLED)
         self.run_button.grid(row=self.num_widgets, columnspan=2, pady=5)
         self.num_widgets += 1
 
+    def add_estimate_label(self):
+        if self.predictor is None:
+            return
+        self.estimate_generation = 0
+        self.estimate_results = queue.Queue()
+        self.estimate_label = tk.Label(self.scrollable_frame, text="Estimate: select a peaks file.", wraplength=self.max_width)
+        self.estimate_label.grid(row=self.num_widgets, columnspan=2, pady=(0, 5))
+        ToolTip(self.estimate_label, "Wall time and peak memory predicted from earlier successful runs of this type,\nfrom the number of peaks and expression rows, peak number, distance and genome.")
+        self.num_widgets += 1
+
+    def update_estimate(self):
+        if self.predictor is None or not hasattr(self, "estimate_label"):
+            return
+        report = self.preflight.get("peaks")
+        if not report or "rows" not in report:
+            self.prediction = None
+            self.estimate_label.config(text="Estimate: select a peaks file.")
+            return
+        expression = self.preflight.get("expression") or {}
+        params, peaks, expression_rows = self.get_params(), report["rows"], expression.get("rows")
+        self.estimate_generation += 1
+        generation = self.estimate_generation
+        def work():
+            # The history queries and model refit stay off the Tk thread
+            try:
+                result = self.predictor.predict(params, peaks, expression_rows)
+            except (OSError, ImportError) as e:
+                result = e
+            self.estimate_results.put((generation, result))
+        threading.Thread(target=work, daemon=True).start()
+        self.after(50, self.poll_estimate)
+
+    def poll_estimate(self):
+        # One result per scheduled poll, estimates for superseded parameters are dropped
+        try:
+            generation, result = self.estimate_results.get_nowait()
+        except queue.Empty:
+            self.after(50, self.poll_estimate)
+            return
+        if generation != self.estimate_generation:
+            return
+        if isinstance(result, Exception):
+            self.prediction = None
+            self.estimate_label.config(text=f"No estimate: {result}")
+            return
+        self.prediction = result
+        self.estimate_label.config(text=describe_prediction(self.prediction))
+
+    def add_rethreshold_panel(self):
+        self.rethreshold_loaded = None
+        self.rethreshold_result = None
+        self.rethreshold_generation = 0
+        self.rethreshold_fingerprints = None
+        self.rethreshold_results = queue.Queue()
+        self.rethreshold_state = tk.BooleanVar()
+        self.rethreshold_checkbutton = tk.Checkbutton(self.scrollable_frame, text="Re-threshold the finished run live", variable=self.rethreshold_state, command=self.update_rethreshold)
+        self.rethreshold_checkbutton.grid(row=self.num_widgets, column=0, pady=5, padx=10, sticky='E')
+        self.rethreshold_button = tk.Button(self.scrollable_frame, text="Save tables", command=self.save_rethreshold, state=tk.DISABLED)
+        self.rethreshold_button.grid(row=self.num_widgets, column=1, pady=5, sticky='W')
+        ToolTip(self.rethreshold_checkbutton, "Recompute the up/down targets and function prediction of the run already in the output directory (same prefix)\nas the FDR threshold, number or percent of genes, p-value cutoff or method change, without running BETA again.\nUses NAME_gene_scores.txt of the native engine, if the input files and scoring parameters above are still the run's.\nFor runs made by BETA it is approximated once with the native engine (genome Other only) and marked as such.")
+        ToolTip(self.rethreshold_button, "Write the function prediction and target tables for the current thresholds to the output directory,\nprefixed e.g. NAME_df0.05_da0.5_c0.001, next to the run's own tables.")
+        self.num_widgets += 1
+        self.rethreshold_label = tk.Label(self.scrollable_frame, text="", justify='left', wraplength=self.max_width)
+        self.rethreshold_label.grid(row=self.num_widgets, columnspan=2, pady=(0, 5))
+        self.num_widgets += 1
+
+    def update_rethreshold(self):
+        # Predict targets for the current thresholds in a worker thread; the gene score table is read once per file
+        if not hasattr(self, "rethreshold_state"):
+            return
+        self.rethreshold_result = None
+        self.rethreshold_button.config(state=tk.DISABLED)
+        if not self.rethreshold_state.get():
+            self.rethreshold_label.config(text="")
+            return
+        params = self.get_params()
+        try:
+            thresholds = float(params["fdr"]), float(params["gene_amount"]), float(params["pvalue_cutoff"])
+            check_thresholds(*thresholds)
+        except ValueError:
+            self.rethreshold_label.config(text="Re-threshold: FDR at least 0, genes above 0 and a p-value cutoff from 0 to 1 needed.")
+            return
+        path = gene_scores_path(params)
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            key = None
+        loaded = self.rethreshold_loaded if key is not None and self.rethreshold_loaded and self.rethreshold_loaded[0] == key else None
+        self.rethreshold_generation += 1
+        generation = self.rethreshold_generation
+        def work():
+            start = time.perf_counter()
+            try:
+                # Without a result cache, input fingerprints are still only computed once per file version
+                if self.cache is None and self.rethreshold_fingerprints is None:
+                    self.rethreshold_fingerprints = ResultCache()
+                table = load_gene_scores(params, lambda message: None, self.cache or self.rethreshold_fingerprints, loaded[1] if loaded else None)
+                prediction = predict_targets(table, *thresholds, params["method"])
+                result = (table, thresholds, prediction, time.perf_counter() - start)
+            except (OSError, ValueError, ImportError) as e:
+                result = e
+            self.rethreshold_results.put((generation, path, result))
+        if loaded is None:
+            self.rethreshold_label.config(text=f"Loading the gene scores of {path}...")
+        threading.Thread(target=work, daemon=True).start()
+        self.after(50, self.poll_rethreshold)
+
+    def poll_rethreshold(self):
+        # One result per scheduled poll, results of superseded thresholds are dropped
+        try:
+            generation, path, result = self.rethreshold_results.get_nowait()
+        except queue.Empty:
+            self.after(50, self.poll_rethreshold)
+            return
+        if generation != self.rethreshold_generation:
+            return
+        if isinstance(result, Exception):
+            self.rethreshold_label.config(text=f"Cannot re-threshold: {result}")
+            return
+        table, thresholds, prediction, seconds = result
+        try:
+            self.rethreshold_loaded = ((path, os.stat(path).st_mtime_ns), table)
+        except OSError:
+            self.rethreshold_loaded = None
+        self.rethreshold_result = (path, table, thresholds, prediction)
+        self.rethreshold_label.config(text=f"{describe_targets(prediction, table)}\n({len(table['score']):,} genes of {os.path.basename(path)}, {seconds * 1000:.0f} ms)")
+        self.rethreshold_button.config(state=tk.NORMAL)
+
+    def save_rethreshold(self):
+        if self.rethreshold_result is None:
+            return
+        path, table, thresholds, prediction = self.rethreshold_result
+        name = rethreshold_name(os.path.basename(path)[:-len("_gene_scores.txt")], *thresholds)
+        try:
+            paths = write_prediction(os.path.dirname(path) or ".", name, table, prediction)
+        except OSError as e:
+            messagebox.showerror("BETA", f"Could not save the tables: {e}")
+            return
+        self.rethreshold_label.config(text=f"{describe_targets(prediction, table)}\nSaved {', '.join(os.path.basename(saved) for saved in paths)}")
+
+    def add_sweep_panel(self):
+        self.sweep_spec = tk.StringVar()
+        self.sweep_label = tk.Label(self.scrollable_frame, text="Sweep:", wraplength=self.max_width//2)
+        self.sweep_label.grid(row=self.num_widgets, column=0, pady=5, padx=10, sticky='E')
+        sweep_frame = ttk.Frame(self.scrollable_frame)
+        sweep_frame.grid(row=self.num_widgets, column=1, pady=5, sticky='W')
+        self.sweep_entry = tk.Entry(sweep_frame, textvariable=self.sweep_spec, width=40)
+        self.sweep_entry.pack(side='left')
+        self.sweep_button = tk.Button(sweep_frame, text="Run sweep", command=self.start_sweep, state=tk.DISABLED)
+        self.sweep_button.pack(side='left', padx=5)
+        swept = ", ".join(f"{name} ({option})" for name, (option, _, types) in SWEEP_PARAMS.items() if self.type in types)
+        ToolTip(self.sweep_label, f"Run the form once for every combination of the values given here, e.g.\ndistance=20000:100000:20000 peak_number=5000,10000{' method=score,distance' if self.type != 'minus' else ''}\nValues are comma separated, start:stop:step ranges include stop. Can be swept: {swept}.\nRuns share their preprocessing and are queued on the Queue tab with this priority, sharing its parallel runs;\nthe target counts{' and p-values' if self.type != 'minus' else ''} of every setting are compared in one table, saved as NAME_sweep.tsv.")
+        self.num_widgets += 1
+
+    def start_sweep(self):
+        self.update_cmd()
+        params = self.get_params()
+        try:
+            grid = parse_sweep(self.sweep_spec.get(), self.type)
+        except ValueError as e:
+            messagebox.showerror("BETA sweep", str(e))
+            return
+        cache = self.cache if self.cache is not None and self.use_cache_state.get() else None
+        SweepWindow(self, params, grid, self.scheduler, cache=cache, history=self.history, priority=self.priority.get())
+
     def add_reset_button(self):
         self.reset_button = tk.Button(self.scrollable_frame, text="Reset to Default", font=('Arial',12), command=self.reset_default)
         self.reset_button.grid(row=self.num_widgets, columnspan=2, pady=5)
         self.num_widgets += 1
 
     def reset_default(self):
+        self.preflight = {}
+        self.preflight_pending = set()
         if self.type != 'minus':
             self.expression_file_path = ""
-            self.expression_label.config(text="No expression file selected.")
+            self.expression_label.config(text="No expression file selected.", fg="black")
             self.kind.set("DESeq2")
             self.kind_info_id.set(self.kind_info_id_defaults[self.kind.get()])
             self.kind_info_change.set(self.kind_info_change_defaults[self.kind.get()])
             self.kind_info_stat.set(self.kind_info_stat_defaults[self.kind.get()])
             self.method.set("score")
             self.peaks_file_path = ""
-            self.peaks_label.config(text="No peaks file selected.")
+            self.peaks_label.config(text="No peaks file selected.", fg="black")
             self.boundary_file_path = ""
             self.boundary_label.config(text="No CTCF boundary file selected.")
             self.genome.set("Other")
@@ -702,22 +4262,31 @@ class BetaFrame(tk.Canvas):
             self.reference_file_path = ""
             self.reference_label.config(text="No reference genome file selected.\n(Required only if genome is Other).")
             self.gname_state.set(False)
+            self.subset_reference_state.set(False)
             self.bl_state.set(False)
             self.peak_number.set(10000)
+            self.preselect_state.set(False)
+            self.preselect_column.set("score")
             self.distance.set(100000)
+            self.tss_filter_state.set(False)
             self.name_prefix.set("")
             self.output_path = "./"
+            self.timeout.set("")
             self.fdr.set(1)
             self.gene_amount.set(0.5)
             self.pvalue_cutoff.set(0.001)
-            if self.type != 'basic':
+            self.rethreshold_state.set(False)
+            if self.type == 'basic':
+                self.engine.set("BETA")
+            else:
                 self.number_motifs.set(10)
+                self.window_genome_state.set(False)
                 self.genome_sequence_file_path = ""
                 self.reference_label.config(text="No genome sequence file selected.")
             self.run_button.config(state=tk.DISABLED)
         else:
             self.peaks_file_path = ""
-            self.peaks_label.config(text="No peaks file selected.")
+            self.peaks_label.config(text="No peaks file selected.", fg="black")
             self.boundary_file_path = ""
             self.boundary_label.config(text="No CTCF boundary file selected.")
             self.genome.set("Other")
@@ -726,118 +4295,994 @@ class BetaFrame(tk.Canvas):
             self.reference_label.config(text="No reference genome file selected.\n(Required only if genome is Other).")
             self.bl_state.set(False)
             self.peak_number.set(10000)
+            self.preselect_state.set(False)
+            self.preselect_column.set("score")
             self.distance.set(100000)
+            self.tss_filter_state.set(False)
             self.name_prefix.set("")
             self.output_path = "./"
+            self.timeout.set("")
+            self.engine.set("BETA")
             self.run_button.config(state=tk.DISABLED)
-        
+        self.sweep_spec.set("")
+        self.sweep_button.config(state=tk.DISABLED)
         
         self.update_cmd()
 
-if __name__ == '__main__':
-    # ===================================================================== #
-    # Initialize the main window
-    # ===================================================================== #
-    root = tk.Tk()
+    def set_params(self, params):
+        # Fill the form from a parameter dict as returned by get_params, e.g. a run from the history
+        self.ensure_built()
+        self.genome.set(params.get("genome", "Other"))
+        self.bl_state.set(bool(params.get("bl")))
+        self.update_genome(None)
+        self.update_bl_checkbox()
+        # update_genome and update_bl_checkbox cleared the files that do not apply
+        if self.genome.get() == 'Other':
+            self.reference_file_path = params.get("reference_file_path", "")
+            if self.reference_file_path:
+                self.reference_label.config(text=f"Reference Genome file: {os.path.basename(self.reference_file_path)}")
+            else:
+                self.reference_label.config(text="No reference genome file selected.\n(Required only if genome is Other).")
+        if str(self.boundary_button.cget('state')) == tk.NORMAL and params.get("boundary_file_path"):
+            self.boundary_file_path = params["boundary_file_path"]
+            self.boundary_label.config(text=f"CTCF file: {os.path.basename(self.boundary_file_path)}")
+        self.peaks_file_path = params.get("peaks_file_path", "")
+        if self.peaks_file_path:
+            self.peaks_label.config(text=f"Peaks file:\n{os.path.basename(self.peaks_file_path)}\nChecking...", fg="black")
+        else:
+            self.peaks_label.config(text="No peaks file selected.", fg="black")
+        self.start_preflight("peaks", self.peaks_file_path)
+        self.peak_number.set(params.get("peak_number", DEFAULT_PARAMS["peak_number"]))
+        self.preselect_state.set(bool(params.get("preselect_peaks")))
+        self.preselect_column.set(params.get("preselect_column", DEFAULT_PARAMS["preselect_column"]))
+        self.distance.set(params.get("distance", DEFAULT_PARAMS["distance"]))
+        self.tss_filter_state.set(bool(params.get("tss_filter")))
+        if hasattr(self, "engine"):
+            self.engine.set(params.get("engine", DEFAULT_PARAMS["engine"]))
+        self.name_prefix.set(params.get("name_prefix", ""))
+        self.output_path = params.get("output_path", "./")
+        self.output_label.config(text=f"Output directory: {os.path.basename(self.output_path.rstrip('/')) + '/' if self.output_path != './' else './'}")
+        if self.type != 'minus':
+            self.expression_file_path = params.get("expression_file_path", "")
+            if self.expression_file_path:
+                self.expression_label.config(text=f"Expression file:\n{os.path.basename(self.expression_file_path)}\nChecking...", fg="black")
+            else:
+                self.expression_label.config(text="No expression file selected.", fg="black")
+            self.kind.set(params.get("kind", DEFAULT_PARAMS["kind"]))
+            self.kind_info_id.set(params.get("info_id") or self.kind_info_id_defaults[self.kind.get()])
+            self.kind_info_change.set(params.get("info_change") or self.kind_info_change_defaults[self.kind.get()])
+            self.kind_info_stat.set(params.get("info_stat") or self.kind_info_stat_defaults[self.kind.get()])
+            self.start_preflight("expression", self.expression_file_path)
+            self.gname_state.set(bool(params.get("gname2")))
+            self.subset_reference_state.set(bool(params.get("subset_reference")))
+            self.method.set(params.get("method", DEFAULT_PARAMS["method"]))
+            self.fdr.set(params.get("fdr", DEFAULT_PARAMS["fdr"]))
+            self.gene_amount.set(params.get("gene_amount", DEFAULT_PARAMS["gene_amount"]))
+            self.pvalue_cutoff.set(params.get("pvalue_cutoff", DEFAULT_PARAMS["pvalue_cutoff"]))
+            if self.type != 'basic':
+                self.genome_sequence_file_path = params.get("genome_sequence_file_path", "")
+                if self.genome_sequence_file_path:
+                    self.genome_sequence_label.config(text=f"Genome sequence file: {os.path.basename(self.genome_sequence_file_path)}")
+                else:
+                    self.genome_sequence_label.config(text="No genome sequence file selected.")
+                self.number_motifs.set(params.get("number_motifs", DEFAULT_PARAMS["number_motifs"]))
+                self.window_genome_state.set(bool(params.get("window_genome")))
+        self.validate_run_params()
+        self.update_cmd()
+
+# ===================================================================== #
+# Tab construction
+# ===================================================================== #
+def build_beta_plus(frame):
+    frame.add_description("Predict direct targets of TF and the active/repressive function prediction.\nDo motif analysis at targets region as well.")
+    frame.add_cmd("BETA plus --pn 10000 -d 100000 -o ./ -k O --info 1,3,7 --method score --df 1 --da 0.5 -c 0.001 --mn 10")
+    frame.add_label("--------- REQUIRED PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
+    frame.add_expression_file_button()
+    frame.add_kind_dropdown()
+    frame.add_info_id_textbox()
+    frame.add_info_change_textbox()
+    frame.add_info_stat_textbox()
+    frame.add_fdr_textbox()
+    frame.add_gene_amount_textbox()
+    frame.add_peaks_file_button()
+    frame.add_genome_dropdown()
+    frame.add_reference_file_button()
+    frame.add_subset_reference_checkbox()
+    frame.add_method_dropdown()
+    frame.add_pvalue_cutoff_textbox()
+    frame.add_genome_sequence_file_button()
+    frame.add_window_genome_checkbox()
+    frame.add_number_motifs_textbox()
+    frame.add_label("--------- OPTIONAL PARAMTERS ---------", font=('Arial', 10, 'bold'), colspan=2)
+    frame.add_gname_checkbox()
+    frame.add_bl_checkbox()
+    frame.add_boundary_file_button()
+    frame.add_peak_number_textbox()
+    frame.add_preselect_peaks_checkbox()
+    frame.add_distance_textbox()
+    frame.add_tss_filter_checkbox()
+    frame.add_name_prefix_textbox()
+    frame.add_output_folder_button()
+    frame.add_timeout_textbox()
+    frame.add_cache_checkbox()
+    frame.add_priority_dropdown()
+    frame.add_run_button("Run BETA Plus")
+    frame.add_estimate_label()
+    frame.add_rethreshold_panel()
+    frame.add_sweep_panel()
+    frame.add_reset_button()
+
+def build_beta_basic(frame):
+    frame.add_description("Predict direct targets of TF and the active/repressive function prediction.")
+    frame.add_cmd("BETA basic --pn 10000 -d 100000 -o ./ -k O --info 1,3,7 --method score --df 1 --da 0.5 -c 0.001")
+    frame.add_label("--------- REQUIRED PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
+    frame.add_expression_file_button()
+    frame.add_kind_dropdown()
+    frame.add_info_id_textbox()
+    frame.add_info_change_textbox()
+    frame.add_info_stat_textbox()
+    frame.add_fdr_textbox()
+    frame.add_gene_amount_textbox()
+    frame.add_peaks_file_button()
+    frame.add_genome_dropdown()
+    frame.add_reference_file_button()
+    frame.add_subset_reference_checkbox()
+    frame.add_method_dropdown()
+    frame.add_pvalue_cutoff_textbox()
+    frame.add_label("--------- OPTIONAL PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
+    frame.add_gname_checkbox()
+    frame.add_bl_checkbox()
+    frame.add_boundary_file_button()
+    frame.add_peak_number_textbox()
+    frame.add_preselect_peaks_checkbox()
+    frame.add_distance_textbox()
+    frame.add_tss_filter_checkbox()
+    frame.add_name_prefix_textbox()
+    frame.add_output_folder_button()
+    frame.add_timeout_textbox()
+    frame.add_cache_checkbox()
+    frame.add_priority_dropdown()
+    frame.add_engine_dropdown()
+    frame.add_run_button("Run BETA Basic")
+    frame.add_estimate_label()
+    frame.add_rethreshold_panel()
+    frame.add_sweep_panel()
+    frame.add_reset_button()
+
+def build_beta_minus(frame):
+    frame.add_description("Detect TF target genes based on regulatory potential score only by binding data.")
+    frame.add_cmd("BETA minus --pn 10000 -d 100000 -o ./")
+    frame.add_label("--------- REQUIRED PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
+    frame.add_peaks_file_button()
+    frame.add_genome_dropdown()
+    frame.add_reference_file_button()
+    frame.add_label("--------- OPTIONAL PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
+    frame.add_bl_checkbox()
+    frame.add_boundary_file_button()
+    frame.add_peak_number_textbox()
+    frame.add_preselect_peaks_checkbox()
+    frame.add_distance_textbox()
+    frame.add_tss_filter_checkbox()
+    frame.add_name_prefix_textbox()
+    frame.add_output_folder_button()
+    frame.add_timeout_textbox()
+    frame.add_cache_checkbox()
+    frame.add_priority_dropdown()
+    frame.add_engine_dropdown()
+    frame.add_run_button("Run BETA Minus")
+    frame.add_estimate_label()
+    frame.add_sweep_panel()
+    frame.add_reset_button()
+
+def build_citation(frame):
+    frame.add_label("BETA Paper:", font=('Arial', 12, "bold"), colspan=2, sticky='W')
+    frame.add_text("Wang, S., Sun, H., Ma, J., Zang, C., Wang, C., Wang, J., ... & Liu, X. S. (2013). Target analysis by integration of transcriptome and ChIP-seq data with BETA. Nature protocols, 8(12), 2502-2515.", font=('Arial', 12), width=80, height=2, colspan=2)
+    frame.add_label("BETA Documentation:", font=('Arial', 12, "bold"), colspan=2, sticky='W')
+    frame.add_text("http://cistrome.org/BETA/", font=('Arial', 12), colspan=2)
+    frame.add_label("GUI Contact:", font=('Arial', 12, "bold"), colspan=2, sticky='W')
+    frame.add_text("earezza@ohri.ca", font=('Arial', 12), colspan=2)
+    frame.add_text("https://github.com/earezza", font=('Arial', 12), colspan=2)
+
+# ===================================================================== #
+# Batch mode
+# ===================================================================== #
+def read_manifest(manifest_path):
+    # One job per row, columns named like the keys of DEFAULT_PARAMS plus a required "type" column
+    import csv
+    jobs = []
+    with open(manifest_path, newline='') as manifest:
+        rows = csv.DictReader((line for line in manifest if line.strip() and not line.startswith('#')), delimiter='\t')
+        for row_number, row in enumerate(rows, start=1):
+            row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            if row.get("type") not in ("plus", "basic", "minus"):
+                raise ValueError(f"Manifest row {row_number}: type must be plus, basic or minus, got '{row.get('type', '')}'")
+            params = dict(DEFAULT_PARAMS)
+            params.update({key: value for key, value in row.items() if value != ""})
+            if params["engine"] not in ENGINE_OPTIONS:
+                raise ValueError(f"Manifest row {row_number}: unknown engine '{params['engine']}', expected one of {', '.join(ENGINE_OPTIONS)}")
+            if params["kind"] not in KIND_OPTIONS:
+                raise ValueError(f"Manifest row {row_number}: unknown kind '{params['kind']}', expected one of {', '.join(KIND_OPTIONS)}")
+            info_defaults = KIND_INFO_DEFAULTS[params["kind"]]
+            for key, default in zip(("info_id", "info_change", "info_stat"), info_defaults):
+                params.setdefault(key, str(default))
+            for key in ("bl", "gname2", "preselect_peaks", "window_genome", "subset_reference", "tss_filter"):
+                if isinstance(params[key], str):
+                    params[key] = params[key].lower() in ("1", "true", "yes", "y")
+            if not params["output_path"].endswith('/'):
+                params["output_path"] += '/'
+            if not params["peaks_file_path"]:
+                raise ValueError(f"Manifest row {row_number}: peaks_file_path is required")
+            jobs.append(params)
+    return jobs
+
+class BatchControl:
+    # Processes of running batch jobs, so an interrupted batch or sweep can stop them all
+    def __init__(self):
+        self.processes = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def stop(self):
+        with self.lock:
+            self.stopping.set()
+            processes = list(self.processes)
+        for process in processes:
+            stop_process_group(process, SubprocessRunner.kill_grace_seconds)
+
+batch_control = BatchControl()
+
+def run_batch_job(job_number, params, cache=None, history=None, control=batch_control, prepared=None):
+    # prepared: params already preprocessed by the caller (see preprocess_sweep), which also removes their files
+    argv = build_argv(params)
+    cmd = build_cmd(params)
+    prefix = '-'.join(params["name_prefix"].split())
+    os.makedirs(params["output_path"], exist_ok=True)
+    current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    log_path = f"{params['output_path']}BETA-{params['type']}-{prefix}_{current_time}_job{job_number}.log"
+
+    run_log = RunLog(f"BETA-{params['type']}-job{job_number}", log_path)
+
+    print(f"[job {job_number}] started: {cmd}", flush=True)
+    start = time.time()
+    workdir = None
+    sampler = None
+    state = None
+    scores_key = None
+    timed_out = threading.Event()
+    try:
+        run_log.info(f"Command: {cmd}")
+        key = cache.key(params) if cache is not None else None
+        restored = cache.restore(key, params["output_path"]) if key is not None else None
+        if restored is not None:
+            for relpath in restored:
+                run_log.info(f"Restored from cache: {relpath}")
+            returncode = 0
+            scores_key = finish_gene_scores(params, cache, run_log.info)
+        else:
+            before = cache.snapshot(params["output_path"]) if key is not None else None
+            if prepared is None:
+                run_params, workdir = preprocess(params, run_log.info)
+            else:
+                run_params = prepared
+            if run_params != params:
+                argv = build_argv(run_params)
+                cmd = build_cmd(run_params)
+                run_log.info(f"Command after preprocessing: {cmd}")
+            with control.lock:
+                if control.stopping.is_set():
+                    raise InterruptedError("batch interrupted before the job started")
+                process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, start_new_session=True)
+                control.processes.add(process)
+            timeout = float(params.get("timeout_minutes") or 0) * 60
+            if timeout:
+                def expire():
+                    timed_out.set()
+                    stop_process_group(process, SubprocessRunner.kill_grace_seconds)
+                timer = threading.Timer(timeout, expire)
+                timer.daemon = True
+                timer.start()
+            sampler = ResourceSampler(process.pid)
+            sampler.start()
+            for line in process.stdout:
+                if line.strip():
+                    run_log.info(line.strip())
+            wait_without_reaping(process)
+            sampler.stop()
+            returncode = process.wait()
+            if timeout:
+                timer.cancel()
+            with control.lock:
+                control.processes.discard(process)
+            if timed_out.is_set():
+                state = "cancelled"
+                run_log.error(f"Run cancelled: timed out after {timeout / 60:g} minutes.")
+            elif control.stopping.is_set() and returncode != 0:
+                state = "cancelled"
+                run_log.error("Run cancelled: batch interrupted.")
+            elif returncode == 0:
+                scores_key = finish_gene_scores(params, cache, run_log.info)
+                if key is not None:
+                    cache.store(key, params["output_path"], before, time.time() - start, prefix or "NA")
+        run_log.info("Process completed.")
+    except InterruptedError as e:
+        run_log.error(f"Run cancelled: {e}.")
+        state = "cancelled"
+        returncode = -1
+    except (OSError, ValueError) as e:
+        run_log.error(f"Failed to start process: {e}")
+        returncode = -1
+    finally:
+        if workdir is not None:
+            remove_workdir(workdir)
+        run_log.close()
+    end = time.time()
+    metrics = sampler.summary() if sampler is not None else {"wall_seconds": round(end - start, 3)}
+    record = {"log": os.path.basename(log_path), "type": params["type"], "prefix": prefix or "NA", "command": cmd,
+              "state": state or ("done" if returncode == 0 else "failed"), "exit_code": returncode, "host": os.uname().nodename, "executor": "local", "start": start, "end": end}
+    if scores_key is not None:
+        record["scores_key"] = scores_key
+    record.update(metrics)
+    try:
+        append_metrics(params["output_path"], record)
+    except OSError as e:
+        print(f"[job {job_number}] could not write run metrics: {e}", flush=True)
+    if history is not None:
+        try:
+            history.record(record, params, argv)
+        except OSError as e:
+            print(f"[job {job_number}] could not record the run in the history: {e}", flush=True)
+    print(f"[job {job_number}] finished with exit code {returncode} in {end - start:.1f}s, log: {log_path}", flush=True)
+    return {
+        "job": job_number,
+        "type": params["type"],
+        "prefix": prefix or "NA",
+        "exit_code": returncode,
+        "state": state or ("done" if returncode == 0 else "failed"),
+        "start": datetime.fromtimestamp(start).isoformat(timespec='seconds'),
+        "end": datetime.fromtimestamp(end).isoformat(timespec='seconds'),
+        "wall_seconds": f"{end - start:.1f}",
+        "cpu_seconds": f"{metrics.get('cpu_seconds', 0):.1f}",
+        "peak_rss_bytes": metrics.get("peak_rss_bytes", 0),
+        "read_bytes": metrics.get("read_bytes", 0),
+        "write_bytes": metrics.get("write_bytes", 0),
+        "log": log_path,
+        "command": cmd,
+    }
+
+def run_batch(manifest_path, max_jobs=None, summary_path=None, cache=None, history=None):
+    import csv
+    import concurrent.futures
+    jobs = read_manifest(manifest_path)
+    max_jobs = max_jobs or default_max_jobs()
+    summary_path = summary_path or f"{os.path.splitext(manifest_path)[0]}_summary.tsv"
+    print(f"Running {len(jobs)} BETA jobs from {manifest_path} with {max_jobs} parallel workers", flush=True)
+
+    # Each worker thread only waits on its BETA subprocess, so threads bound the number of concurrent processes
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_jobs) as pool:
+        futures = [pool.submit(run_batch_job, job_number, params, cache, history) for job_number, params in enumerate(jobs, start=1)]
+        try:
+            results = [future.result() for future in futures]
+        except KeyboardInterrupt:
+            print("Interrupted, stopping running jobs...", flush=True)
+            batch_control.stop()
+            for future in futures:
+                future.cancel()
+            results = [future.result() for future in futures if not future.cancelled()]
+
+    fields = ["job", "type", "prefix", "exit_code", "state", "start", "end", "wall_seconds", "cpu_seconds", "peak_rss_bytes", "read_bytes", "write_bytes", "log", "command"]
+    with open(summary_path, 'w', newline='') as summary:
+        writer = csv.DictWriter(summary, fieldnames=fields, delimiter='\t')
+        writer.writeheader()
+        writer.writerows(results)
+
+    failed = sum(1 for result in results if result["exit_code"] != 0)
+    print(f"{len(results) - failed}/{len(jobs)} jobs succeeded, summary written to {summary_path}", flush=True)
+    if batch_control.stopping.is_set():
+        return 130
+    return 1 if failed else 0
+
+# ===================================================================== #
+# Parameter sweeps
+# ===================================================================== #
+# Parameters a sweep can vary: BETA option naming them in setting names, value type, run types that have it
+SWEEP_PARAMS = {
+    "peak_number": ("pn", int, ("plus", "basic", "minus")),
+    "distance": ("d", int, ("plus", "basic", "minus")),
+    "fdr": ("df", float, ("plus", "basic")),
+    "gene_amount": ("da", float, ("plus", "basic")),
+    "pvalue_cutoff": ("c", float, ("plus", "basic")),
+    "number_motifs": ("mn", int, ("plus",)),
+    "method": ("method", str, ("plus", "basic")),
+}
+# These only change the final selection step (see predict_targets)
+SWEEP_THRESHOLD_PARAMS = ("fdr", "gene_amount", "pvalue_cutoff", "method")
+MAX_SWEEP_SETTINGS = 500
+
+def parse_sweep_values(text, kind):
+    # "5000,10000" or "20000:100000:20000" (start:stop:step, stop included) or a mix, duplicates dropped
+    values = []
+    for item in (item.strip() for item in text.split(",")):
+        if not item:
+            continue
+        parts = item.split(":")
+        if kind is str or len(parts) == 1:
+            values.append(kind(item))
+        elif len(parts) == 3:
+            start, stop, step = (kind(part) for part in parts)
+            if step <= 0 or stop < start:
+                raise ValueError(f"range {item} needs start <= stop and a positive step")
+            count = int((stop - start) / step + 1e-9) + 1
+            values += [start + number * step if kind is int else round(start + number * step, 12) for number in range(count)]
+        else:
+            raise ValueError(f"'{item}' is neither a value nor a start:stop:step range")
+    return list(dict.fromkeys(values))
+
+def parse_sweep(spec, type):
+    # "distance=20000:100000:20000 peak_number=5000,10000 method=score,distance" -> {param: [values]}. Parameters
+    # are named as in the manifest or by their BETA option (pn, d, df, da, c, mn, method)
+    aliases = {option: name for name, (option, _, _) in SWEEP_PARAMS.items()}
+    grid = {}
+    for assignment in spec.replace(";", " ").split():
+        name, _, text = assignment.partition("=")
+        name = aliases.get(name.lstrip("-"), name.lstrip("-"))
+        if name not in SWEEP_PARAMS:
+            raise ValueError(f"cannot sweep '{name}', only {', '.join(SWEEP_PARAMS)}")
+        _, kind, types = SWEEP_PARAMS[name]
+        if type not in types:
+            raise ValueError(f"{name} is not an option of BETA {type}")
+        try:
+            values = parse_sweep_values(text, kind)
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from None
+        if not values:
+            raise ValueError(f"{name}: no values given")
+        if name == "method":
+            if set(values) - set(METHOD_OPTIONS):
+                raise ValueError(f"method: expected {' or '.join(METHOD_OPTIONS)}")
+        elif name == "fdr" and min(values) < 0 or name == "pvalue_cutoff" and not 0 < min(values) <= max(values) <= 1 or name not in ("fdr", "pvalue_cutoff") and min(values) <= 0:
+            raise ValueError(f"{name}: value out of range")
+        grid[name] = values
+    if not grid:
+        raise ValueError("nothing to sweep, give e.g. distance=20000:100000:20000 peak_number=5000,10000")
+    settings = 1
+    for values in grid.values():
+        settings *= len(values)
+    if settings > MAX_SWEEP_SETTINGS:
+        raise ValueError(f"{settings} settings, more than the {MAX_SWEEP_SETTINGS} a sweep may have")
+    return grid
+
+def expand_sweep(params, grid):
+    # (setting, params) for every point of the grid, each run named after its values, e.g. NAME_d20000_pn5000_score
+    prefix = '-'.join(str(params.get("name_prefix") or "").split()) or "NA"
+    settings = []
+    for values in itertools.product(*grid.values()):
+        setting = dict(zip(grid, values))
+        tag = "_".join(value if name == "method" else f"{SWEEP_PARAMS[name][0]}{value:g}" for name, value in setting.items())
+        settings.append((setting, dict(params, name_prefix=f"{prefix}_{tag}", **{name: str(value) for name, value in setting.items()})))
+    return settings
+
+def sweep_columns(type, grid):
+    # Columns of the comparison table of a sweep
+    outcome = ["targets"] if type == "minus" else ["up_targets", "up_p", "down_targets", "down_p", "function"]
+    return list(grid) + ["state", "wall_seconds"] + outcome
+
+def count_table_rows(path):
+    # Data rows of a result table, 0 for one that was not written (BETA skips insignificant groups)
+    try:
+        with open(path) as f:
+            return sum(1 for line in f if line.strip() and not line.startswith("#"))
+    except FileNotFoundError:
+        return 0
+
+def read_function_prediction(path):
+    # group -> p value of NAME_function_prediction.txt
+    pvalues = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if not line.startswith("#") and len(fields) >= 4 and is_number(fields[3]):
+                pvalues[fields[0]] = float(fields[3])
+    return pvalues
+
+def sweep_outcome(params, prediction=None):
+    # Target counts of a finished setting and, for basic/plus, the KS p values of its function prediction from the
+    # run's own NAME_function_prediction.txt, NA without one: a BETA run is never reported with native numbers
+    name = '-'.join(params["name_prefix"].split()) or "NA"
+    output = params["output_path"]
+    if params["type"] == "minus":
+        return {"targets": count_table_rows(os.path.join(output, f"{name}_targets.txt"))}
+    outcome = {f"{group}_targets": count_table_rows(os.path.join(output, f"{name}_{group}target.txt")) for group in ("up", "down")}
+    pvalues = {}
+    if prediction is not None:
+        pvalues = {group: prediction[group]["pvalue"] for group in ("up", "down")}
+    elif os.path.exists(os.path.join(output, f"{name}_function_prediction.txt")):
+        pvalues = read_function_prediction(os.path.join(output, f"{name}_function_prediction.txt"))
+    cutoff = float(params["pvalue_cutoff"])
+    for group in ("up", "down"):
+        outcome[f"{group}_p"] = f"{pvalues[group]:.3e}" if group in pvalues else "NA"
+    if len(pvalues) == 2:
+        functions = [function for group, function in (("up", "activating"), ("down", "repressive")) if pvalues[group] < cutoff]
+        outcome["function"] = " and ".join(functions) or "none"
+    else:
+        outcome["function"] = "NA"
+    return outcome
+
+class SweepJob:
+    # One run of a sweep in the JobScheduler queue, so sweeps share its slots and memory limit with the GUI's runs.
+    # It runs in its own thread once the scheduler starts it, and puts itself on done when finished or removed
+    def __init__(self, number, params, prepared, done, sweep_control, cache=None, history=None, prediction=None, log=print):
+        self.number = number
+        self.params = params
+        self.prepared = prepared
+        self.done = done
+        self.cache = cache
+        self.history = history
+        self.log = log
+        self.type = params["type"]
+        self.prefix = '-'.join(params["name_prefix"].split())
+        self.log_path = ""
+        self.prediction = prediction
+        # Its own control so the Queue tab can cancel it alone, stopped as well when the whole sweep is
+        self.sweep_control = sweep_control
+        self.control = BatchControl()
+        self.state = "new"
+        self.result = None
+        self.submitted_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.on_finished = []
+        self.job_id = None
+        self.scheduler = None
+
+    def emit(self, message, level=logging.INFO):
+        self.log(f"Setting {self.number + 1}: {message}")
+
+    def start(self):
+        self.state = "running"
+        self.started_at = time.time()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            if self.sweep_control.stopping.is_set():
+                self.control.stop()
+            self.result = run_batch_job(self.number + 1, self.params, self.cache, self.history, self.control, self.prepared)
+            self.state = self.result["state"]
+            self.log_path = self.result["log"]
+        finally:
+            self.finished_at = time.time()
+            for callback in self.on_finished:
+                callback(self)
+            self.done.put(self)
+
+    def removed(self):
+        self.state = "cancelled"
+        self.finished_at = time.time()
+        self.done.put(self)
+
+    def cancel(self, reason="Cancelled by user"):
+        if self.state == "new":
+            self.removed()
+            return
+        if self.state == "queued" and self.scheduler is not None and self.scheduler.remove(self.job_id):
+            return
+        self.control.stop()
+
+def predict_sweep_job(predictor, params):
+    # Expected peak memory of a sweep run for the scheduler's memory limit, None when it cannot be estimated
+    if predictor is None:
+        return None
+    try:
+        expression_rows = count_lines(params["expression_file_path"]) if params.get("expression_file_path") else None
+        return predictor.predict(params, count_lines(params["peaks_file_path"]), expression_rows)
+    except (OSError, ImportError):
+        return None
+
+def run_sweep(params, grid, scheduler=None, cache=None, history=None, control=None, on_row=None, log=print, priority="Normal"):
+    # Run every setting of the grid as a batch job with shared preprocessing, queued on scheduler (a private one of
+    # default_max_jobs() slots without it) like any other run. Native basic settings differing only in thresholds are
+    # re-thresholded from the gene scores of one of them instead of run.
+    # Returns the comparison rows in grid order; on_row(number, row) sees each as soon as it is ready
+    control = control or BatchControl()
+    scheduler = scheduler or JobScheduler()
+    settings = expand_sweep(params, grid)
+    leaders, followers = {}, collections.defaultdict(list)
+    for number, (_, job) in enumerate(settings):
+        key = number
+        if job["type"] == "basic" and job.get("engine") == "native":
+            key = tuple(sorted((name, str(value)) for name, value in job.items() if name not in SWEEP_THRESHOLD_PARAMS + ("name_prefix",)))
+        if key in leaders:
+            followers[leaders[key]].append(number)
+        else:
+            leaders[key] = number
+    runs = list(leaders.values())
+    log(f"Sweep of {len(settings)} settings: {len(runs)} runs, up to {scheduler.max_jobs} at once" + (f", {len(settings) - len(runs)} settings re-thresholded from their gene scores." if len(runs) < len(settings) else "."))
+    rows = [None] * len(settings)
+
+    def finish(number, row):
+        setting, job = settings[number]
+        rows[number] = dict(setting, prefix='-'.join(job["name_prefix"].split()), **row)
+        if on_row is not None:
+            on_row(number, rows[number])
+
+    def rethreshold(number):
+        # The settings sharing the scores of a finished run
+        leader = settings[number][1]
+        try:
+            table = read_gene_scores(gene_scores_path(leader))
+        except OSError as e:
+            table = e
+        for follower in followers[number]:
+            job = settings[follower][1]
+            start = time.time()
+            try:
+                if isinstance(table, Exception):
+                    raise table
+                prediction = predict_targets(table, float(job["fdr"]), float(job["gene_amount"]), float(job["pvalue_cutoff"]), job["method"])
+                write_prediction(job["output_path"], '-'.join(job["name_prefix"].split()), table, prediction)
+                finish(follower, dict(state="re-thresholded", wall_seconds=f"{time.time() - start:.1f}", log=f"from the gene scores of {'-'.join(leader['name_prefix'].split())}", **sweep_outcome(job, prediction)))
+            except (OSError, ValueError) as e:
+                finish(follower, {"state": "failed", "wall_seconds": "0.0", "log": f"re-thresholding failed: {e}"})
+
+    start = time.perf_counter()
+    prepared, workdir = preprocess_sweep([settings[number][1] for number in runs], log)
+    log(f"Shared preprocessing done in {time.perf_counter() - start:.1f}s.")
+    predictor = RunPredictor(history) if history is not None else None
+    done = queue.Queue()
+    jobs = [SweepJob(number, settings[number][1], run_params, done, control, cache, history, predict_sweep_job(predictor, settings[number][1]), log)
+            for number, run_params in zip(runs, prepared)]
+    waiting = len(jobs)
+    try:
+        try:
+            for job in jobs:
+                scheduler.submit(job, priority)
+            while waiting:
+                try:
+                    job = done.get(timeout=0.5)
+                except queue.Empty:
+                    # Stopping the sweep stops its running jobs and takes the others out of the queue
+                    if control.stopping.is_set():
+                        for job in jobs:
+                            job.cancel()
+                    continue
+                waiting -= 1
+                number = job.number
+                if job.result is None:
+                    finish(number, {"state": "cancelled", "wall_seconds": "0.0", "log": "removed from the queue before it started"})
+                else:
+                    outcome = sweep_outcome(settings[number][1]) if job.result["exit_code"] == 0 else {}
+                    finish(number, dict(state=job.result["state"], wall_seconds=job.result["wall_seconds"], log=job.result["log"], **outcome))
+                if job.result is not None and job.result["exit_code"] == 0:
+                    rethreshold(number)
+                else:
+                    for follower in followers[number]:
+                        finish(follower, {"state": "skipped", "wall_seconds": "0.0", "log": f"run {number + 1} it shares scores with did not succeed"})
+        except KeyboardInterrupt:
+            control.stop()
+            for job in jobs:
+                job.cancel()
+            # The running jobs still use the shared preprocessing
+            for _ in range(waiting):
+                done.get()
+            raise
+    finally:
+        remove_workdir(workdir)
+    return [row for row in rows if row is not None]
+
+def write_sweep_table(path, rows, columns):
+    import csv
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, delimiter='\t', restval="", extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+def run_sweeps(manifest_path, spec, max_jobs=None, table_path=None, cache=None, history=None, memory_limit_bytes=None):
+    # --batch with --sweep: every manifest job swept over the same grid, one comparison table for all
+    jobs = read_manifest(manifest_path)
+    try:
+        grids = [parse_sweep(spec, params["type"]) for params in jobs]
+    except ValueError as e:
+        print(f"Invalid --sweep: {e}", file=sys.stderr, flush=True)
+        return 2
+    table_path = table_path or f"{os.path.splitext(manifest_path)[0]}_sweep.tsv"
+    scheduler = JobScheduler(max_jobs, memory_limit_bytes)
+    rows, columns = [], ["job"]
+    try:
+        for job_number, (params, grid) in enumerate(zip(jobs, grids), start=1):
+            log = lambda message, job_number=job_number: print(f"[sweep {job_number}] {message}", flush=True)
+            for row in run_sweep(params, grid, scheduler, cache, history, batch_control, log=log):
+                rows.append(dict(row, job=job_number))
+            columns += [column for column in sweep_columns(params["type"], grid) if column not in columns]
+    except KeyboardInterrupt:
+        print("Interrupted, running jobs stopped.", flush=True)
+        return 130
+    write_sweep_table(table_path, rows, columns + ["prefix", "log"])
+    done = sum(1 for row in rows if row["state"] in ("done", "re-thresholded"))
+    print(f"{done}/{len(rows)} settings succeeded, comparison table written to {table_path}", flush=True)
+    return 0 if done == len(rows) else 1
+
+class SweepWindow:
+    # Progress and comparison table of a sweep started from a BETA tab, run in the background like --batch --sweep
+    refresh_interval_ms = 200
+
+    def __init__(self, root, params, grid, scheduler=None, cache=None, history=None, priority="Normal"):
+        self.params = params
+        self.grid = grid
+        self.scheduler = scheduler
+        self.priority = priority
+        self.cache = cache
+        self.history = history
+        self.control = BatchControl()
+        self.updates = queue.Queue()
+        self.finished = False
+        self.prefix = '-'.join(params["name_prefix"].split()) or "NA"
+        settings = expand_sweep(params, grid)
+
+        self.popup = tk.Toplevel(root)
+        self.popup.title(f"BETA-{params['type']} sweep of {len(settings)} settings")
+        self.popup.geometry("900x500")
+        self.popup.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = ttk.Frame(self.popup)
+        controls.pack(side='top', fill='x', padx=10, pady=10)
+        self.status_label = tk.Label(controls, text="Preprocessing...", anchor='w', justify='left', wraplength=650)
+        self.status_label.pack(side='left', fill='x', expand=True)
+        self.cancel_button = tk.Button(controls, text="Cancel sweep", command=self.cancel)
+        self.cancel_button.pack(side='right')
+        ToolTip(self.cancel_button, "Stop the running settings and skip those still waiting.")
+
+        self.columns = sweep_columns(params["type"], grid)
+        self.tree = ttk.Treeview(self.popup, columns=self.columns + ["prefix"], show='headings')
+        for column in self.columns + ["prefix"]:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=90 if column != "prefix" else 220, anchor='w')
+        for number, (setting, job) in enumerate(settings):
+            self.tree.insert('', tk.END, iid=str(number), values=[setting.get(column, "waiting" if column == "state" else "") for column in self.columns] + ['-'.join(job["name_prefix"].split())])
+        self.tree.pack(expand=True, fill='both', padx=10, pady=(0, 10))
+
+        current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.log_path = f"{params['output_path']}BETA-{params['type']}-{self.prefix}_sweep_{current_time}.log"
+        threading.Thread(target=self.run, daemon=True).start()
+        self.popup.after(self.refresh_interval_ms, self.poll)
+
+    def run(self):
+        # In a worker thread, the window only reads self.updates
+        os.makedirs(self.params["output_path"], exist_ok=True)
+        run_log = RunLog(f"BETA-{self.params['type']}-sweep", self.log_path)
+        def log(message):
+            run_log.info(message)
+            self.updates.put(("status", message))
+        try:
+            rows = run_sweep(self.params, self.grid, self.scheduler, self.cache, self.history, self.control, on_row=lambda number, row: self.updates.put(("row", (number, row))), log=log, priority=self.priority)
+            path = write_sweep_table(os.path.join(self.params["output_path"], f"{self.prefix}_sweep.tsv"), rows, self.columns + ["prefix", "log"])
+            done = sum(1 for row in rows if row["state"] in ("done", "re-thresholded"))
+            log(f"{done}/{len(rows)} settings succeeded, comparison table written to {path}")
+        except (OSError, ValueError) as e:
+            run_log.error(f"Sweep failed: {e}")
+            self.updates.put(("status", f"Sweep failed: {e}"))
+        finally:
+            run_log.close()
+            self.updates.put(("finished", None))
+
+    def poll(self):
+        try:
+            while True:
+                kind, value = self.updates.get_nowait()
+                if kind == "row":
+                    number, row = value
+                    self.tree.item(str(number), values=[row.get(column, "") for column in self.columns] + [row["prefix"]])
+                elif kind == "status":
+                    self.status_label.config(text=value)
+                else:
+                    self.finished = True
+                    self.cancel_button.config(state=tk.DISABLED)
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            # Window has been closed
+            return
+        if not self.finished:
+            self.popup.after(self.refresh_interval_ms, self.poll)
+
+    def cancel(self):
+        self.control.stop()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Cancelling...")
+
+    def close(self):
+        if not self.finished:
+            if not messagebox.askyesno("BETA sweep", "The sweep is still running. Cancel it and close the window?", parent=self.popup):
+                return
+            self.control.stop()
+        self.popup.destroy()
+
+# ===================================================================== #
+# Verifying the native engine
+# ===================================================================== #
+def read_targets(path):
+    # (chrom, txStart, txEnd, refseqID) -> score of a BETA minus targets table, or rank product of an up/down target table
+    scores = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if line.startswith("#") or len(fields) < 5 or not is_number(fields[4]):
+                continue
+            scores[tuple(fields[:4])] = float(fields[4])
+    return scores
+
+def compare_minus(job_number, outputs, name, tolerance):
+    # Target scores of a minus job's BETA and native outputs, equal within tolerance
+    reference, native = (read_targets(os.path.join(outputs[engine], f"{name}_targets.txt")) for engine in ENGINE_OPTIONS)
+    missing = reference.keys() - native.keys()
+    extra = {key for key in native.keys() - reference.keys() if native[key] > tolerance}
+    differing = [key for key in reference.keys() & native.keys() if abs(reference[key] - native[key]) > tolerance]
+    ok = not (missing or extra or differing)
+    print(f"[job {job_number}] {'OK' if ok else 'MISMATCH'}: {len(reference)} BETA targets, {len(missing)} missing, {len(extra)} extra, {len(differing)} with scores differing by more than {tolerance}")
+    for key in sorted(differing)[:5]:
+        print(f"    {' '.join(key)}: BETA {reference[key]}, native {native[key]}")
+    return ok
+
+def compare_basic(job_number, outputs, name, min_overlap):
+    # Up/down target lists of a basic job's BETA and native outputs: the same groups significant, and target
+    # RefSeq IDs overlapping by at least min_overlap (shared / all)
+    ok = True
+    for group in ("up", "down"):
+        targets = {}
+        for engine in ENGINE_OPTIONS:
+            path = os.path.join(outputs[engine], f"{name}_{group}target.txt")
+            targets[engine] = {key[3] for key in read_targets(path)} if os.path.exists(path) else None
+        reference, native = targets["BETA"], targets["native"]
+        if reference is None or native is None:
+            same = reference is native
+            print(f"[job {job_number}] {group}: {'OK' if same else 'MISMATCH'}, {group}target table written by {', '.join(engine for engine in ENGINE_OPTIONS if targets[engine] is not None) or 'neither engine'}")
+        else:
+            overlap = len(reference & native) / len(reference | native) if reference | native else 1.0
+            same = overlap >= min_overlap
+            print(f"[job {job_number}] {group}: {'OK' if same else 'MISMATCH'}, {len(reference)} BETA targets, {len(native)} native, {overlap:.1%} overlap")
+        ok = ok and same
+    return ok
+
+def verify_native(manifest_path, tolerance=1e-3, min_overlap=0.9):
+    # Correctness check of the native engine: every minus and basic job of the manifest run by BETA and natively, outputs compared
+    import tempfile
+    jobs = [params for params in read_manifest(manifest_path) if params["type"] in NATIVE_TYPES]
+    failures = 0
+    for job_number, params in enumerate(jobs, start=1):
+        with tempfile.TemporaryDirectory() as directory:
+            outputs = {}
+            for engine in ENGINE_OPTIONS:
+                outputs[engine] = os.path.join(directory, engine) + "/"
+                result = run_batch_job(job_number, dict(params, engine=engine, output_path=outputs[engine]))
+                if result["exit_code"] != 0:
+                    print(f"[job {job_number}] {engine} run failed, see {result['log']}")
+                    failures += 1
+                    break
+            else:
+                name = '-'.join(params['name_prefix'].split()) or 'NA'
+                if params["type"] == "minus":
+                    failures += not compare_minus(job_number, outputs, name, tolerance)
+                else:
+                    failures += not compare_basic(job_number, outputs, name, min_overlap)
+    print(f"{len(jobs) - failures}/{len(jobs)} minus and basic jobs match")
+    return 1 if failures or not jobs else 0
+
+# ===================================================================== #
+# Main window
+# ===================================================================== #
+def main_parser():
+    # Command line options of beta_gui.py
+    parser = argparse.ArgumentParser(description="GUI for BETA (Binding and Expression Target Analysis).")
+    parser.add_argument("--batch", metavar="MANIFEST", help="Run the jobs of a tab-delimited manifest without the GUI.")
+    parser.add_argument("--jobs", type=int, default=None, help="Maximum number of BETA jobs running at once (default: usable cores - 1).")
+    parser.add_argument("--no-cache", action="store_true", help="Always run BETA, never restore outputs of identical earlier runs.")
+    parser.add_argument("--no-history", action="store_true", help="Do not record runs in the run history database.")
+    parser.add_argument("--max-memory-gb", type=float, default=None, help="Keep queued GUI and sweep runs waiting while the predicted peak memory of all running runs would exceed this.")
+    parser.add_argument("--summary", default=None, help="Summary table of exit codes and wall times for --batch (default: <manifest>_summary.tsv, with --sweep the comparison table <manifest>_sweep.tsv).")
+    parser.add_argument("--sweep", metavar="SPEC", help='With --batch, run every job for each combination of values, e.g. "distance=20000:100000:20000 peak_number=5000,10000 method=score,distance".')
+    parser.add_argument("--verify-native", metavar="MANIFEST", help="Run the minus and basic jobs of a manifest with BETA and with the native engine and compare their targets.")
+    parser.add_argument("--native", nargs=argparse.REMAINDER, metavar="minus|basic OPTIONS", help="Run the native BETA minus or basic engine with the same options as BETA and exit.")
+    parser.add_argument("--rethreshold", nargs=argparse.REMAINDER, metavar="NAME_gene_scores.txt OPTIONS", help="Recompute the targets of a finished basic or plus run for new --df/--da/-c/--method and exit.")
+    parser.add_argument("--eager-tabs", action="store_true", help="Build every tab at startup instead of when first selected.")
+    executor_options = parser.add_argument_group("executor", "Where GUI runs execute. The commands can be replaced, e.g. by a wrapper or a stub script for testing.")
+    executor_options.add_argument("--executor", choices=sorted(EXECUTORS), default="local", help="Run BETA on this machine, through a pre-warmed worker on this machine (zygote) or submit it to Slurm (default: local).")
+    executor_options.add_argument("--zygote-command", default=None, help="Command starting the pre-warmed worker in BETA's python2 environment (default: python2 beta_zygote.py next to this script).")
+    executor_options.add_argument("--zygote-idle-minutes", type=float, default=60, help="The worker exits after this long without runs, 0 to keep it (default: 60).")
+    executor_options.add_argument("--sbatch", default="sbatch", help="Command submitting a job script (default: sbatch).")
+    executor_options.add_argument("--squeue", default="squeue", help="Command reporting queued and running jobs (default: squeue).")
+    executor_options.add_argument("--sacct", default="sacct", help="Command reporting finished jobs (default: sacct).")
+    executor_options.add_argument("--scancel", default="scancel", help="Command cancelling a job (default: scancel).")
+    executor_options.add_argument("--sbatch-options", default="", help='Extra #SBATCH lines for every job, e.g. "--partition=long --mem=16G --cpus-per-task=2".')
+    executor_options.add_argument("--poll-seconds", type=float, default=10, help="Seconds between job status checks (default: 10).")
+    return parser
+
+def build_main_window(root, args):
+    # The GUI's tabs in root for the options parsed by main_parser, widgets of the selected tab only unless --eager-tabs
     root.title("BETA")
     root.geometry("750x1100")
     root.minsize(width=750, height=700)
 
+    if args.executor == "slurm":
+        executor = SlurmExecutor(args.sbatch, args.squeue, args.sacct, args.scancel, args.sbatch_options, args.poll_seconds)
+    elif args.executor == "zygote":
+        executor = ZygoteExecutor(args.zygote_command, idle_minutes=args.zygote_idle_minutes)
+    else:
+        executor = LocalExecutor()
+    # Central queue limiting how many BETA runs execute (or are submitted) at once
+    memory_limit = args.max_memory_gb * 1e9 if args.max_memory_gb and args.executor != "slurm" else None
+    scheduler = JobScheduler(args.jobs or getattr(executor, "default_max_jobs", None), memory_limit)
+    # Outputs of earlier identical runs, shared by all tabs
+    result_cache = None if args.no_cache else ResultCache()
+    run_history = None if args.no_history else RunHistory()
+    # Wall time and memory estimates learnt from the run history
+    predictor = RunPredictor(run_history) if run_history is not None else None
+
     # Create a notebook (tabbed interface)
     notebook = ttk.Notebook(root)
     notebook.pack(fill='both', expand=True)
 
-    # Create BETA plus frame
-    beta_plus = BetaFrame(notebook, type="plus", max_width=800)
+    # Tabs are empty until first selected, their widgets are built by these functions
+    beta_plus = BetaFrame(notebook, type="plus", max_width=800, scheduler=scheduler, cache=result_cache, builder=build_beta_plus, executor=executor, history=run_history, predictor=predictor)
     notebook.add(beta_plus, text="BETA Plus")
-
-    beta_plus.add_description("Predict direct targets of TF and the active/repressive function prediction.\nDo motif analysis at targets region as well.")
-    beta_plus.add_cmd("BETA plus --pn 10000 -d 100000 -o ./ -k O --info 1,3,7 --method score --df 1 --da 0.5 -c 0.001 --mn 10")
-    beta_plus.add_label("--------- REQUIRED PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
-    beta_plus.add_expression_file_button()
-    beta_plus.add_kind_dropdown()
-    beta_plus.add_info_id_textbox()
-    beta_plus.add_info_change_textbox()
-    beta_plus.add_info_stat_textbox()
-    beta_plus.add_fdr_textbox()
-    beta_plus.add_gene_amount_textbox()
-    beta_plus.add_peaks_file_button()
-    beta_plus.add_genome_dropdown()
-    beta_plus.add_reference_file_button()
-    beta_plus.add_method_dropdown()
-    beta_plus.add_pvalue_cutoff_textbox()
-    beta_plus.add_genome_sequence_file_button()
-    beta_plus.add_number_motifs_textbox()
-    beta_plus.add_label("--------- OPTIONAL PARAMTERS ---------", font=('Arial', 10, 'bold'), colspan=2)
-    beta_plus.add_gname_checkbox()
-    beta_plus.add_bl_checkbox()
-    beta_plus.add_boundary_file_button()
-    beta_plus.add_peak_number_textbox()
-    beta_plus.add_distance_textbox()
-    beta_plus.add_name_prefix_textbox()
-    beta_plus.add_output_folder_button()
-    beta_plus.add_run_button("Run BETA Plus")
-    beta_plus.add_reset_button()
-
-    # Create BETA basic frame
-    beta_basic = BetaFrame(notebook, type="basic", max_width=750)
+    beta_basic = BetaFrame(notebook, type="basic", max_width=750, scheduler=scheduler, cache=result_cache, builder=build_beta_basic, executor=executor, history=run_history, predictor=predictor)
     notebook.add(beta_basic, text="BETA Basic")
-
-    beta_basic.add_description("Predict direct targets of TF and the active/repressive function prediction.")
-    beta_basic.add_cmd("BETA basic --pn 10000 -d 100000 -o ./ -k O --info 1,3,7 --method score --df 1 --da 0.5 -c 0.001")
-    beta_basic.add_label("--------- REQUIRED PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
-    beta_basic.add_expression_file_button()
-    beta_basic.add_kind_dropdown()
-    beta_basic.add_info_id_textbox()
-    beta_basic.add_info_change_textbox()
-    beta_basic.add_info_stat_textbox()
-    beta_basic.add_fdr_textbox()
-    beta_basic.add_gene_amount_textbox()
-    beta_basic.add_peaks_file_button()
-    beta_basic.add_genome_dropdown()
-    beta_basic.add_reference_file_button()
-    beta_basic.add_method_dropdown()
-    beta_basic.add_pvalue_cutoff_textbox()
-    beta_basic.add_label("--------- OPTIONAL PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
-    beta_basic.add_gname_checkbox()
-    beta_basic.add_bl_checkbox()
-    beta_basic.add_boundary_file_button()
-    beta_basic.add_peak_number_textbox()
-    beta_basic.add_distance_textbox()
-    beta_basic.add_name_prefix_textbox()
-    beta_basic.add_output_folder_button()
-    beta_basic.add_run_button("Run BETA Basic")
-    beta_basic.add_reset_button()
-
-    # Create BETA minus frame
-    beta_minus = BetaFrame(notebook, type="minus", max_width=750)
+    beta_minus = BetaFrame(notebook, type="minus", max_width=750, scheduler=scheduler, cache=result_cache, builder=build_beta_minus, executor=executor, history=run_history, predictor=predictor)
     notebook.add(beta_minus, text="BETA Minus")
 
-    beta_minus.add_description("Detect TF target genes based on regulatory potential score only by binding data.")
-    beta_minus.add_cmd("BETA minus --pn 10000 -d 100000 -o ./")
-    beta_minus.add_label("--------- REQUIRED PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
-    beta_minus.add_peaks_file_button()
-    beta_minus.add_genome_dropdown()
-    beta_minus.add_reference_file_button()
-    beta_minus.add_label("--------- OPTIONAL PARAMETERS ---------", font=('Arial', 10, 'bold'), colspan=2)
-    beta_minus.add_bl_checkbox()
-    beta_minus.add_boundary_file_button()
-    beta_minus.add_peak_number_textbox()
-    beta_minus.add_distance_textbox()
-    beta_minus.add_name_prefix_textbox()
-    beta_minus.add_output_folder_button()
-    beta_minus.add_run_button("Run BETA Minus")
-    beta_minus.add_reset_button()
-
-    beta_cite = BetaFrame(notebook, type="", max_width=750)
+    # Create run queue view
+    queue_frame = QueueFrame(notebook, scheduler)
+    notebook.add(queue_frame, text="Queue")
+
+    # Browse the tables BETA wrote
+    results_frame = ResultsFrame(notebook)
+    notebook.add(results_frame, text="Results")
+
+    if run_history is not None:
+        history_frame = HistoryFrame(notebook, run_history, {"plus": beta_plus, "basic": beta_basic, "minus": beta_minus})
+        notebook.add(history_frame, text="History")
+
+    if result_cache is not None:
+        cache_frame = CacheFrame(notebook, result_cache)
+        notebook.add(cache_frame, text="Cache")
+
+    beta_cite = BetaFrame(notebook, type="", max_width=750, builder=build_citation)
     notebook.add(beta_cite, text="Citation")
-    beta_cite.add_label("BETA Paper:", font=('Arial', 12, "bold"), colspan=2, sticky='W')
-    beta_cite.add_text("Wang, S., Sun, H., Ma, J., Zang, C., Wang, C., Wang, J., ... & Liu, X. S. (2013). Target analysis by integration of transcriptome and ChIP-seq data with BETA. Nature protocols, 8(12), 2502-2515.", font=('Arial', 12), width=80, height=2, colspan=2)
-    beta_cite.add_label("BETA Documentation:", font=('Arial', 12, "bold"), colspan=2, sticky='W')
-    beta_cite.add_text("http://cistrome.org/BETA/", font=('Arial', 12), colspan=2)
-    beta_cite.add_label("GUI Contact:", font=('Arial', 12, "bold"), colspan=2, sticky='W')
-    beta_cite.add_text("earezza@ohri.ca", font=('Arial', 12), colspan=2)
-    beta_cite.add_text("https://github.com/earezza", font=('Arial', 12), colspan=2)
+
+    def build_selected_tab(event=None):
+        tab = notebook.nametowidget(notebook.select())
+        if isinstance(tab, BetaFrame):
+            tab.ensure_built()
+        elif isinstance(tab, ResultsFrame):
+            tab.refresh_files()
+        elif isinstance(tab, HistoryFrame):
+            tab.refresh()
+
+    notebook.bind("<<NotebookTabChanged>>", build_selected_tab)
+    build_selected_tab()
+    if args.eager_tabs:
+        for tab in (beta_plus, beta_basic, beta_minus, beta_cite):
+            tab.ensure_built()
+
+if __name__ == '__main__':
+    parser = main_parser()
+    args = parser.parse_args()
+
+    if args.native is not None:
+        sys.exit(run_native(args.native))
+    if args.rethreshold is not None:
+        sys.exit(run_rethreshold(args.rethreshold))
+    if args.verify_native:
+        sys.exit(verify_native(args.verify_native))
+    if args.sweep and not args.batch:
+        parser.error("--sweep needs --batch MANIFEST, or use the sweep panel of a BETA tab")
+    if args.batch and args.sweep:
+        sys.exit(run_sweeps(args.batch, args.sweep, args.jobs, args.summary, None if args.no_cache else ResultCache(), None if args.no_history else RunHistory(),
+                            args.max_memory_gb * 1e9 if args.max_memory_gb else None))
+    if args.batch:
+        sys.exit(run_batch(args.batch, args.jobs, args.summary, None if args.no_cache else ResultCache(), None if args.no_history else RunHistory()))
+
+    root = tk.Tk()
+    build_main_window(root, args)
 
     # ===================================================================== #
     # Start the GUI event loop
@@ -0,0 +1,249 @@
+"""Pre-warmed BETA worker.
+
+Runs inside the python2 environment BETA is installed in, imports BETA (and numpy) once
+and forks a child per job, so a run no longer pays for interpreter startup and imports.
+Jobs arrive over a Unix socket from the GUI (see ZygoteExecutor in beta_gui.py), one per
+connection, as a JSON line {"argv": [...], "cwd": ..., "env": {...}}. The reply is a stream
+of frames:
+
+    P <pid>\\n           process id (and process group) of the job
+    O <length>\\n<data>  output of the job, stdout and stderr merged as when BETA is run directly
+    X <returncode>\\n    exit code, or -signal like subprocess.Popen.returncode
+
+Kept compatible with Python 2.7 and 3.
+"""
+from __future__ import print_function
+
+import argparse
+import errno
+import json
+import os
+import pkgutil
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# ===================================================================== #
+# Preloading
+# ===================================================================== #
+def find_executable(name):
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+def preload(name="BETA"):
+    # Load the BETA script without running it, then import every module of the BETA package
+    path = find_executable(name)
+    if path is None:
+        raise SystemExit("%s not found in PATH" % name)
+    with open(path) as f:
+        source = f.read()
+    namespace = {"__name__": "beta_zygote_preload", "__file__": path}
+    exec(compile(source, path, "exec"), namespace)
+    if "main" not in namespace:
+        raise SystemExit("%s has no main() to call" % path)
+    loaded = []
+    try:
+        import numpy
+        loaded.append("numpy")
+    except ImportError:
+        pass
+    try:
+        package = __import__(name)
+    except ImportError:
+        package = None
+    if package is not None and hasattr(package, "__path__"):
+        for _, module, _ in pkgutil.walk_packages(package.__path__, name + "."):
+            try:
+                __import__(module)
+                loaded.append(module)
+            except Exception:
+                # Optional parts of BETA may need tools that are not installed, they load per run as before
+                pass
+        # Annotation tables are parsed per run, reading them once keeps them in the page cache
+        for directory, _, files in os.walk(package.__path__[0]):
+            for file_name in files:
+                if not file_name.endswith((".py", ".pyc")):
+                    with open(os.path.join(directory, file_name), 'rb') as f:
+                        while f.read(1 << 20):
+                            pass
+    return namespace["main"], path, loaded
+
+# ===================================================================== #
+# Jobs
+# ===================================================================== #
+def native(value):
+    # json gives unicode on Python 2, where argv and the environment hold byte strings
+    if sys.version_info[0] < 3:
+        if isinstance(value, unicode):
+            return value.encode("utf-8")
+        if isinstance(value, list):
+            return [native(item) for item in value]
+        if isinstance(value, dict):
+            return dict((native(key), native(item)) for key, item in value.items())
+    return value
+
+def send(connection, data):
+    try:
+        connection.sendall(data)
+        return True
+    except (IOError, OSError, socket.error):
+        return False
+
+def run_job(main, main_path, request, write_fd):
+    # In the forked job process: behave like "BETA ..." started by subprocess.Popen with start_new_session
+    os.setsid()
+    for signum in (signal.SIGCHLD, signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, signal.SIG_DFL)
+    null = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null, 0)
+    os.dup2(write_fd, 1)
+    os.dup2(write_fd, 2)
+    os.close(null)
+    os.close(write_fd)
+    os.environ.clear()
+    os.environ.update(request.get("env", {}))
+    os.chdir(request.get("cwd", "."))
+    argv = request["argv"]
+    if os.path.basename(argv[0]) != "BETA":
+        # Anything else is simply executed
+        try:
+            os.execvp(argv[0], argv)
+        except OSError as e:
+            sys.stderr.write("%s: %s\n" % (argv[0], e))
+            os._exit(127)
+    sys.argv = [main_path] + list(argv[1:])
+    code = 0
+    try:
+        main()
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            sys.stderr.write("%s\n" % (e.code,))
+            code = 1
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        # Leave out this frame, the traceback reads as if BETA had been run directly
+        kind, value, tb = sys.exc_info()
+        traceback.print_exception(kind, value, tb.tb_next)
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code & 0xFF)
+
+def handle(connection, main, main_path):
+    # In the forked handler: start the job, forward its output in frames, report its exit code
+    reader = connection.makefile('rb')
+    request = native(json.loads(reader.readline().decode("utf-8")))
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        connection.close()
+        run_job(main, main_path, request, write_fd)
+    os.close(write_fd)
+    send(connection, ("P %d\n" % pid).encode())
+    connected = True
+    while True:
+        try:
+            data = os.read(read_fd, 1 << 16)
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            raise
+        if not data:
+            break
+        if connected:
+            connected = send(connection, ("O %d\n" % len(data)).encode() + data)
+        if not connected:
+            # The GUI went away: closing the pipe ends the job like a closed stdout pipe does today
+            break
+    os.close(read_fd)
+    while True:
+        try:
+            _, status = os.waitpid(pid, 0)
+            break
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
+    returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    send(connection, ("X %d\n" % returncode).encode())
+    connection.close()
+
+# ===================================================================== #
+# Server
+# ===================================================================== #
+def reap():
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except OSError:
+            return
+        if pid == 0:
+            return
+
+def serve(socket_path, idle_seconds):
+    main, main_path, loaded = preload()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            print("A worker is already listening on %s" % socket_path)
+            return 0
+        except socket.error:
+            # Left behind by a worker that died
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    server.settimeout(1)
+    print("BETA worker %d ready on %s (preloaded %s and %d modules)" % (os.getpid(), socket_path, main_path, len(loaded)))
+    sys.stdout.flush()
+    last_job = time.time()
+    try:
+        while idle_seconds <= 0 or time.time() - last_job < idle_seconds:
+            reap()
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+            last_job = time.time()
+            connection.settimeout(None)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                server.close()
+                try:
+                    handle(connection, main, main_path)
+                finally:
+                    os._exit(0)
+            connection.close()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    print("BETA worker %d idle for %d s, exiting" % (os.getpid(), idle_seconds))
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pre-warmed BETA worker for the BETA GUI.")
+    parser.add_argument("--socket", required=True, help="Unix socket to take jobs on.")
+    parser.add_argument("--idle-minutes", type=float, default=60, help="Exit after this long without jobs, 0 to never exit (default: 60).")
+    args = parser.parse_args()
+    sys.exit(serve(args.socket, args.idle_minutes * 60))
@@ -0,0 +1,13 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# Parsed references, FASTA indexes and result caches of the tests go to a scratch directory, never ~/.cache/beta-gui
+os.environ["BETA_CACHE_ROOT"] = tempfile.mkdtemp(prefix="beta-tests-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(os.environ["BETA_CACHE_ROOT"], ignore_errors=True)
@@ -0,0 +1,38 @@
+import os
+import shlex
+import sys
+
+import beta_gui
+
+def plus_params(**changes):
+    return dict(beta_gui.DEFAULT_PARAMS, type="plus", genome="hg38", name_prefix="my run", info_id="1", info_change="3", info_stat="7",
+                peaks_file_path="/data/ChIP seq/peaks.bed", expression_file_path="/data/RNA seq/de genes.txt", **changes)
+
+def test_paths_with_spaces_survive_the_shell_round_trip():
+    argv = beta_gui.build_argv(plus_params())
+    assert tuple(shlex.split(beta_gui.build_cmd(plus_params()))) == argv
+    assert argv[argv.index("-p") + 1] == "/data/ChIP seq/peaks.bed"
+    assert argv[argv.index("-e") + 1] == "/data/RNA seq/de genes.txt"
+    # Spaces in the name become dashes, as in BETA's output file names
+    assert argv[argv.index("-n") + 1] == "my-run"
+
+def test_argv_follows_the_parameters():
+    argv = beta_gui.build_argv(plus_params(distance="250000", bl=True))
+    assert argv[:2] == ("BETA", "plus")
+    assert argv[argv.index("-d") + 1] == "250000"
+    assert "--bl" in argv and "-r" not in argv
+    assert argv[argv.index("--info") + 1] == "1,3,7"
+    assert beta_gui.build_argv(plus_params(distance="250000", bl=True)) == argv
+    assert beta_gui.build_argv(plus_params()) != argv
+
+def test_minus_leaves_out_expression_options():
+    argv = beta_gui.build_argv(dict(plus_params(), type="minus", genome="Other", reference_file_path="/data/ref gene.txt"))
+    assert argv[:2] == ("BETA", "minus")
+    assert argv[argv.index("-r") + 1] == "/data/ref gene.txt"
+    assert not {"-e", "--info", "--df", "--gs"} & set(argv)
+
+def test_native_engine_runs_this_script():
+    argv = beta_gui.build_argv(dict(plus_params(), type="basic", engine="native"))
+    assert argv[:4] == (sys.executable, os.path.abspath(beta_gui.__file__), "--native", "basic")
+    # Only minus and basic have a native engine
+    assert beta_gui.build_argv(plus_params(engine="native"))[:2] == ("BETA", "plus")
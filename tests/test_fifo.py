@@ -0,0 +1,42 @@
+import gzip
+import os
+import tempfile
+
+import beta_gui
+
+def stream(tmp_path, content):
+    source = tmp_path / "peaks.bed.gz"
+    with gzip.open(source, 'wb') as f:
+        f.write(content)
+    workdir = tempfile.mkdtemp(dir=tmp_path)
+    params = beta_gui.stream_compressed_inputs({"peaks_file_path": str(source)}, workdir, log=lambda message: None)
+    return params["peaks_file_path"], workdir
+
+def test_every_reader_gets_one_whole_copy(tmp_path):
+    # More than a pipe buffer, so the writer is still busy while each reader reads
+    content = b"".join(f"chr1\t{start}\t{start + 100}\n".encode() for start in range(0, 10000000, 100))
+    path, workdir = stream(tmp_path, content)
+    try:
+        for _ in range(3):
+            with open(path, 'rb') as f:
+                assert f.read() == content
+    finally:
+        beta_gui.remove_workdir(workdir)
+
+def test_reader_leaving_early(tmp_path):
+    content = b"chr1\t100\t200\n" * 200000
+    path, workdir = stream(tmp_path, content)
+    try:
+        with open(path, 'rb') as f:
+            assert f.read(10) == content[:10]
+        with open(path, 'rb') as f:
+            assert f.read() == content
+    finally:
+        beta_gui.remove_workdir(workdir)
+
+def test_remove_workdir_releases_a_waiting_writer(tmp_path):
+    path, workdir = stream(tmp_path, b"chr1\t100\t200\n")
+    threads = [thread for _, _, thread in beta_gui.input_streams[workdir]]
+    beta_gui.remove_workdir(workdir)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not os.path.exists(workdir)
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+import beta_gui
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    # Each test counts the windowed copies of its own cache
+    monkeypatch.setattr(beta_gui, "CACHE_ROOT", str(tmp_path / "cache"))
+
+def write_fasta(path):
+    # chr1 of 250 bases in lines of 60, an empty record, chr2 without peaks
+    chr1 = "".join("ACGT"[number % 4] for number in range(250))
+    with open(path, 'w') as f:
+        f.write(">chr1 description\n" + "".join(chr1[i:i + 60] + "\n" for i in range(0, 250, 60)))
+        f.write(">empty\n")
+        f.write(">chr2\n" + "A" * 60 + "\n")
+    return chr1
+
+def test_empty_record(tmp_path):
+    path = tmp_path / "genome.fa"
+    write_fasta(path)
+    index = beta_gui.FastaIndex.for_fasta(str(path), log=lambda message: None)
+    assert index.records["empty"][0] == 0
+    with open(path, 'rb') as f:
+        sequence = f.read()
+    assert index.fetch(sequence, "empty", 0, 10) == b""
+    assert index.fetch(sequence, "chr1", 55, 65) == b"TACGTACGTA"
+
+def window(params, workdir, log=lambda message: None):
+    os.makedirs(workdir, exist_ok=True)
+    return beta_gui.window_genome_sequence(params, str(workdir), log)["genome_sequence_file_path"]
+
+def windowed_params(tmp_path):
+    fasta = tmp_path / "genome.fa"
+    chr1 = write_fasta(fasta)
+    peaks = tmp_path / "peaks.bed"
+    peaks.write_text("chr1\t100\t110\n")
+    return {"type": "plus", "window_genome": True, "genome_sequence_file_path": str(fasta), "peaks_file_path": str(peaks), "peak_number": "10", "distance": "20"}, chr1
+
+def test_windows_are_cached(tmp_path):
+    params, chr1 = windowed_params(tmp_path)
+    messages = []
+    first = window(params, tmp_path / "run1", messages.append)
+    with open(first) as f:
+        records = f.read().split(">")[1:]
+    assert len(records) == 1
+    name, sequence = records[0].split("\n", 1)
+    assert name == "chr1"
+    sequence = sequence.replace("\n", "")
+    assert sequence == "N" * 80 + chr1[80:130]
+    # The same peaks and distance reuse the cached file, another distance gets its own
+    second = window(params, tmp_path / "run2", messages.append)
+    assert os.path.samefile(first, second)
+    assert messages[-1].startswith("Reusing")
+    assert not os.path.samefile(window(dict(params, distance="30"), tmp_path / "run3"), first)
+
+def test_eviction_keeps_files_of_prepared_runs(tmp_path, monkeypatch):
+    # Like a sweep: every point is windowed before any run reads its file
+    monkeypatch.setattr(beta_gui, "WINDOWED_GENOME_CACHE_ENTRIES", 2)
+    params, _ = windowed_params(tmp_path)
+    workdirs = [tmp_path / f"stage{number}" for number in range(6)]
+    paths = [window(dict(params, distance=str(10 + number)), workdir) for number, workdir in enumerate(workdirs)]
+    assert all(os.path.exists(path) for path in paths)
+    cache_dir = os.path.join(beta_gui.CACHE_ROOT, "windows")
+    cached = lambda: [name for name in os.listdir(cache_dir) if name.endswith(".fa")]
+    assert len(cached()) >= 6
+    # Once the runs are done their copies may go, down to the limit
+    for workdir in workdirs:
+        beta_gui.remove_workdir(str(workdir))
+    window(dict(params, distance="100"), tmp_path / "last")
+    assert len(cached()) == 2
+
+def test_failed_write_leaves_no_temporary_file(tmp_path, monkeypatch):
+    params, _ = windowed_params(tmp_path)
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(beta_gui.FastaIndex, "fetch", fail)
+    with pytest.raises(OSError):
+        window(dict(params, distance="55"), tmp_path / "run")
+    assert not [name for name in os.listdir(os.path.join(beta_gui.CACHE_ROOT, "windows")) if name.endswith(".tmp")]
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import beta_gui
+
+def record_run(history, directory, peaks_path, type="plus", genome="hg38", state="done", wall_seconds=60.0, peak_rss_bytes=1 << 30, start=0.0):
+    record = {"type": type, "prefix": "NA", "state": state, "exit_code": 0 if state == "done" else 1, "start": start, "end": start + wall_seconds,
+              "wall_seconds": wall_seconds, "peak_rss_bytes": peak_rss_bytes}
+    params = {"type": type, "genome": genome, "peaks_file_path": peaks_path, "output_path": directory, "distance": "100000"}
+    return history.record(record, params, ["BETA", type, "-p", peaks_path])
+
+@pytest.fixture
+def history(tmp_path):
+    return beta_gui.RunHistory(str(tmp_path / "history.sqlite"))
+
+def test_runs_on_a_file_and_its_copies(tmp_path, history):
+    peaks, copy, other = tmp_path / "peaks.bed", tmp_path / "copy of peaks.bed", tmp_path / "other.bed"
+    peaks.write_text("chr1\t100\t200\n")
+    copy.write_text("chr1\t100\t200\n")
+    other.write_text("chr2\t100\t200\n")
+    first = record_run(history, str(tmp_path), str(peaks), start=1.0)
+    second = record_run(history, str(tmp_path), str(other), start=2.0)
+    third = record_run(history, str(tmp_path), str(peaks), type="basic", start=3.0)
+    # Most recent first, and a file with the same contents finds the same runs
+    assert [row["id"] for row in history.runs(path=str(peaks))] == [third, first]
+    assert [row["id"] for row in history.runs(path=str(copy))] == [third, first]
+    assert [row["id"] for row in history.runs(type="plus")] == [second, first]
+    assert history.runs(type="plus", genome="mm10") == []
+    row = history.runs(path=str(other))[0]
+    assert row["peaks"] == 1 and row["distance"] == 100000.0 and row["output_path"] == os.path.join(str(tmp_path), "")
+
+def test_summary_medians(tmp_path, history):
+    peaks = tmp_path / "peaks.bed"
+    peaks.write_text("chr1\t100\t200\n")
+    for wall_seconds in (10, 40, 20, 30):
+        record_run(history, str(tmp_path), str(peaks), wall_seconds=wall_seconds, peak_rss_bytes=int(wall_seconds) << 20)
+    for wall_seconds in (5, 1, 3):
+        record_run(history, str(tmp_path), str(peaks), type="minus", wall_seconds=wall_seconds)
+    record_run(history, str(tmp_path), str(peaks), type="minus", state="failed", wall_seconds=1000)
+    summary = {(entry["type"], entry["genome"]): entry for entry in history.summary()}
+    assert summary["plus", "hg38"]["runs"] == 4
+    assert summary["plus", "hg38"]["median_wall_seconds"] == 25
+    assert summary["plus", "hg38"]["median_peak_rss_bytes"] == 25 << 20
+    # Failed runs are left out
+    assert summary["minus", "hg38"]["runs"] == 3
+    assert summary["minus", "hg38"]["median_wall_seconds"] == 3
+
+def test_params_load_back_with_absolute_paths(tmp_path, history, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "peaks.bed").write_text("chr1\t100\t200\n")
+    run_id = record_run(history, "results", "peaks.bed")
+    params = history.params(run_id)
+    assert params["peaks_file_path"] == str(tmp_path / "peaks.bed")
+    assert params["output_path"] == os.path.join(str(tmp_path / "results"), "")
+    assert history.params(run_id + 1) is None
+
+def test_errors_surface_as_oserror(tmp_path, history):
+    with pytest.raises(OSError):
+        history.execute("SELECT * FROM no_such_table")
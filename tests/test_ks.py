@@ -0,0 +1,33 @@
+import math
+
+import numpy as np
+import pytest
+
+import beta_gui
+
+stats = pytest.importorskip("scipy.stats")
+
+def test_small_samples_match_scipy_exact():
+    rng = np.random.default_rng(1)
+    sample, background = rng.normal(-0.5, 1, 40), rng.normal(0, 1, 60)
+    assert len(sample) * len(background) <= beta_gui.KS_EXACT_MAX_PAIRS
+    expected = stats.ks_2samp(sample, background, alternative='greater')
+    assert beta_gui.ks_greater(sample, background) == pytest.approx((expected.statistic, expected.pvalue))
+
+@pytest.mark.parametrize("shift", [0.0, 0.02, 0.05])
+def test_large_samples_match_scipy_asymptotic(shift):
+    # Past KS_EXACT_MAX_PAIRS the p value is computed here, it should be SciPy's asymptotic one
+    rng = np.random.default_rng(2)
+    sample = rng.integers(0, 20000, 3000) - shift * 20000
+    background = rng.integers(0, 20000, 15000).astype(float)
+    assert len(sample) * len(background) > beta_gui.KS_EXACT_MAX_PAIRS
+    expected = stats.ks_2samp(sample, background, alternative='greater', method='asymp')
+    statistic, pvalue = beta_gui.ks_greater(sample, background)
+    assert statistic == pytest.approx(expected.statistic)
+    assert pvalue == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-300)
+
+def test_empty_sample():
+    statistic, pvalue = beta_gui.ks_greater(np.array([]), np.arange(10.0))
+    assert math.isnan(statistic) and pvalue == 1.0
+    statistic, pvalue = beta_gui.ks_greater(np.arange(10.0), np.array([]))
+    assert math.isnan(statistic) and pvalue == 1.0
@@ -0,0 +1,47 @@
+import beta_gui
+
+def write_log(path, lines):
+    path.write_text("".join(f"{line}\n" for line in lines))
+
+def test_lines_and_search(tmp_path):
+    path = tmp_path / "BETA-plus.log"
+    lines = [f"INFO : BETA-plus : Processing peak {number}" for number in range(1000)]
+    lines[123] = "ERROR : BETA-plus : the needle"
+    lines[877] = "ERROR : BETA-plus : another needle"
+    write_log(path, lines)
+    index = beta_gui.LogIndex(str(path))
+    assert index.update()
+    assert index.lines == 1000
+    assert [index.line(number) for number in (0, 123, 999)] == [lines[0], lines[123], lines[999]]
+    assert index.search(r"ERROR : .*needle").tolist() == [123, 877]
+    assert index.search(r"^INFO : BETA-plus : Processing peak 99$").tolist() == [99]
+    assert len(index.search("no such line")) == 0
+
+def test_indexing_in_pieces(tmp_path):
+    path = tmp_path / "BETA-plus.log"
+    lines = [f"line {number}" for number in range(10000)]
+    write_log(path, lines)
+    index = beta_gui.LogIndex(str(path))
+    # The first lines can be shown before the whole file is indexed, searches cover what is indexed so far
+    assert not index.update(1000)
+    assert 0 < index.lines < 10000
+    assert index.line(0) == "line 0"
+    assert index.search("line 9999").tolist() == []
+    while not index.update(1000):
+        pass
+    assert index.lines == 10000
+    assert index.search("^line 9999$").tolist() == [9999]
+
+def test_follows_appends_and_truncation(tmp_path):
+    path = tmp_path / "BETA-plus.log"
+    write_log(path, ["first", "second"])
+    index = beta_gui.LogIndex(str(path))
+    index.update()
+    with open(path, 'a') as f:
+        f.write("third\n")
+    index.update()
+    assert index.lines == 3 and index.line(2) == "third"
+    # A rewritten, shorter log is indexed from the start again
+    write_log(path, ["new"])
+    index.update()
+    assert index.lines == 1 and index.line(0) == "new"
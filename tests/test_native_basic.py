@@ -0,0 +1,39 @@
+import os
+
+import beta_gui
+from conftest import DATA_DIR
+
+# 60 transcripts on three chromosomes plus one on a chromosome without peaks, a gene with two transcripts, peaks near
+# the up-regulated genes' TSS and a little further from the down-regulated ones', and a DESeq2-like expression table
+# (--info 1,3,7) with a header, an NA row, a repeated gene ID and an ID missing from the reference. The expected_*.txt
+# tables are NOT output of BETA: they were computed separately with plain Python loops (regulatory potential with
+# -d 20000, best transcript per gene, up/down groups by --df 0.05 --da 0.5, scipy.stats.ks_2samp(alternative='greater')
+# against the other genes, rank products) and written in the layout of the native engine's tables. They check the
+# native basic run end to end and stay as a regression check; parity with BETA is checked with --verify-native
+BASIC_DIR = os.path.join(DATA_DIR, "basic")
+
+def run_basic(output, cutoff):
+    argv = ["-p", os.path.join(BASIC_DIR, "peaks.bed"), "-r", os.path.join(BASIC_DIR, "refGene.txt"), "-e", os.path.join(BASIC_DIR, "expression.txt"),
+            "-k", "O", "--info", "1,3,7", "-d", "20000", "--df", "0.05", "--da", "0.5", "-c", str(cutoff), "-n", "native", "-o", str(output)]
+    assert beta_gui.native_basic(argv, log=lambda message: None) == 0
+
+def test_native_basic_writes_the_expected_tables(tmp_path):
+    run_basic(tmp_path, 0.05)
+    for table in ("function_prediction", "uptarget", "downtarget"):
+        with open(tmp_path / f"native_{table}.txt") as f:
+            native = f.read()
+        with open(os.path.join(BASIC_DIR, f"expected_{table}.txt")) as f:
+            assert native == f.read(), table
+    for group in ("up", "down"):
+        assert os.path.exists(tmp_path / f"native_{group}target_associate_peaks.bed")
+    scores = beta_gui.read_gene_scores(tmp_path / "native_gene_scores.txt")
+    assert len(scores["score"]) == 60
+
+def test_native_basic_writes_no_targets_above_the_cutoff(tmp_path):
+    run_basic(tmp_path, 1e-6)
+    expected = beta_gui.read_function_prediction(os.path.join(BASIC_DIR, "expected_function_prediction.txt"))
+    assert beta_gui.read_function_prediction(tmp_path / "native_function_prediction.txt") == expected
+    with open(tmp_path / "native_function_prediction.txt") as f:
+        assert [line.split("\t")[-1].strip() for line in f if not line.startswith("#")] == ["NA", "NA", "NA"]
+    for group in ("up", "down"):
+        assert not os.path.exists(tmp_path / f"native_{group}target.txt")
@@ -0,0 +1,60 @@
+import os
+import random
+
+import numpy as np
+
+import beta_gui
+from bench.benchmarks import python_minus_scores
+from conftest import DATA_DIR
+
+# A refGene file and peaks on both strands, several chromosomes (one without peaks, one without transcripts) and
+# transcripts sharing a TSS. expected_targets.txt is NOT output of BETA: it was computed separately from the regulatory
+# potential sum(exp(-(0.5 + 4 * |peak centre - TSS| / d))) with -d 10000 and written in the layout of a BETA minus
+# targets table. These tests check the native engine's formula, output format and stay as a regression check;
+# parity with BETA itself is checked on real data with --verify-native
+MINUS_DIR = os.path.join(DATA_DIR, "minus")
+REFERENCE = os.path.join(MINUS_DIR, "refGene.txt")
+PEAKS = os.path.join(MINUS_DIR, "peaks.bed")
+DISTANCE = 10000
+
+def fixture_scores():
+    genes = beta_gui.RefGene.for_reference(REFERENCE, log=lambda message: None).table()
+    chroms, centres = beta_gui.peak_centres(beta_gui.selected_peaks({"peaks_file_path": PEAKS, "peak_number": 10000}))
+    return genes, chroms, centres, beta_gui.score_genes(genes, chroms, centres, DISTANCE)[0]
+
+def test_score_genes_matches_expected_scores():
+    genes, _, _, scores = fixture_scores()
+    expected = beta_gui.read_targets(os.path.join(MINUS_DIR, "expected_targets.txt"))
+    computed = {(chrom.decode(), str(start), str(end), name.decode()): score
+                for chrom, start, end, name, score in zip(genes["chrom"], genes["start"].tolist(), genes["end"].tolist(), genes["name"], scores.tolist())}
+    assert {key for key, score in computed.items() if score > 0} == set(expected)
+    for key, score in expected.items():
+        assert abs(computed[key] - score) <= 5e-4, key
+
+def test_score_genes_matches_python_loops_on_fixture():
+    genes, chroms, centres, scores = fixture_scores()
+    assert np.allclose(scores, python_minus_scores(genes, chroms, centres, DISTANCE), rtol=1e-12, atol=1e-12)
+
+def test_score_genes_matches_python_loops_on_random_peaks():
+    # Peaks exactly -d from a TSS, on it and sharing centres included
+    rng = random.Random(0)
+    tss = np.array([rng.randrange(0, 1000000) for _ in range(2000)], dtype=np.int64)
+    genes = {"chrom": [rng.choice([b"chr1", b"chr2", b"chr3"]) for _ in tss], "tss": tss}
+    chroms, centres = [], []
+    for _ in range(5000):
+        chrom = rng.choice([b"chr1", b"chr2", b"chr4"])
+        centres.append(rng.choice([rng.randrange(0, 1000000), int(rng.choice(tss)) + rng.choice([-1000, 0, 1000])]))
+        chroms.append(chrom)
+    centres = np.array(centres, dtype=np.int64)
+    scores, (gene_index, peak_index, offset) = beta_gui.score_genes(genes, chroms, centres, 1000)
+    assert np.allclose(scores, python_minus_scores(genes, chroms, centres, 1000), rtol=1e-12, atol=1e-12)
+    assert np.array_equal(offset, centres[peak_index] - tss[gene_index])
+    assert np.all(np.abs(offset) <= 1000)
+
+def test_native_minus_writes_the_expected_table(tmp_path):
+    beta_gui.native_minus(["-p", PEAKS, "-r", REFERENCE, "-d", str(DISTANCE), "-n", "native", "-o", str(tmp_path)], log=lambda message: None)
+    with open(tmp_path / "native_targets.txt") as f:
+        native = f.read()
+    with open(os.path.join(MINUS_DIR, "expected_targets.txt")) as f:
+        assert native == f.read()
+    assert os.path.exists(tmp_path / "native_targets_associated_peaks.txt")
@@ -0,0 +1,54 @@
+import beta_gui
+
+TARGETS = [("chr2", "300", "900", "NM_000003", "2.5e-03", "-", "Gata3"),
+           ("chr1", "100", "700", "NM_000001", "1.0e-01", "+", "GATA1"),
+           ("chr10", "50", "650", "NM_000010", "7.5e-05", "+", "Tal1"),
+           ("chr1", "800", "900", "NM_000002", "1.0e-01", "-", "Gata2")]
+
+def write_table(path, header, rows, trailing_newline=True):
+    text = "\n".join("\t".join(row) for row in ([header] if header else []) + rows)
+    path.write_text(text + ("\n" if trailing_newline else ""))
+    return beta_gui.ResultTable(str(path)).load()
+
+def test_beta_header_and_rows(tmp_path):
+    table = write_table(tmp_path / "NAME_uptarget.txt", ("#Chroms", "txStart", "txEnd", "refseqID", "rank product", "Strands", "GeneSymbol"), TARGETS)
+    assert table.header == ["Chroms", "txStart", "txEnd", "refseqID", "rank product", "Strands", "GeneSymbol"]
+    assert table.rows == 4
+    assert [table.row(row) for row in range(table.rows)] == [list(row) for row in TARGETS]
+    table.close()
+
+def test_numbers_sort_numerically_and_text_as_text(tmp_path):
+    table = write_table(tmp_path / "NAME_uptarget.txt", ("#Chroms", "txStart", "txEnd", "refseqID", "rank product", "Strands", "GeneSymbol"), TARGETS)
+    assert [table.row(row)[3] for row in table.sorted_order(4)] == ["NM_000010", "NM_000003", "NM_000001", "NM_000002"]
+    # Descending keeps equal values together, in reverse file order
+    assert [table.row(row)[3] for row in table.sorted_order(4, descending=True)] == ["NM_000002", "NM_000001", "NM_000003", "NM_000010"]
+    assert [table.row(row)[1] for row in table.sorted_order(1)] == ["50", "100", "300", "800"]
+    assert [table.row(row)[0] for row in table.sorted_order(0)] == ["chr1", "chr1", "chr10", "chr2"]
+    table.close()
+
+def test_filter_matches_any_column(tmp_path):
+    table = write_table(tmp_path / "NAME_uptarget.txt", ("#Chroms", "txStart", "txEnd", "refseqID", "rank product", "Strands", "GeneSymbol"), TARGETS)
+    # Lowercase text matches any case, text with capitals only itself
+    assert sorted(table.row(row)[3] for row in table.view(filter_text="gata")) == ["NM_000001", "NM_000002", "NM_000003"]
+    assert [table.row(row)[3] for row in table.view(filter_text="GATA")] == ["NM_000001"]
+    # Filtered rows keep the sort order
+    assert [table.row(row)[3] for row in table.view(table.sorted_order(4), "gata")] == ["NM_000003", "NM_000001", "NM_000002"]
+    assert len(table.view(filter_text="no such gene")) == 0
+    table.close()
+
+def test_tables_without_header_or_final_newline(tmp_path):
+    table = write_table(tmp_path / "peaks.bed", None, [("chr1", "100", "200"), ("chr2", "300", "400")], trailing_newline=False)
+    assert table.header == ["Column 1", "Column 2", "Column 3"]
+    assert table.rows == 2 and table.row(1) == ["chr2", "300", "400"]
+    table.close()
+    # A text-only first line above numbers is a header
+    table = write_table(tmp_path / "table.txt", ("gene", "score"), [("A", "1.5"), ("B", "0.5")])
+    assert table.header == ["gene", "score"] and table.rows == 2
+    table.close()
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("")
+    table = beta_gui.ResultTable(str(path)).load()
+    assert table.rows == 0 and len(table.view()) == 0
+    table.close()
@@ -0,0 +1,66 @@
+import logging
+import statistics
+import time
+
+import beta_gui
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+def test_concurrent_run_logs_hold_exactly_their_own_lines(tmp_path):
+    runs, lines = 50, 200
+    # All open at once and written interleaved, as runs going side by side
+    logs = [beta_gui.RunLog(f"BETA-test-{run}", str(tmp_path / f"BETA-test-{run}.log")) for run in range(runs)]
+    for line in range(lines):
+        for run, run_log in enumerate(logs):
+            run_log.info(f"run {run} line {line}")
+    for run_log in logs:
+        run_log.close()
+    for run in range(runs):
+        assert read_lines(tmp_path / f"BETA-test-{run}.log") == [f"INFO : BETA-test-{run} : run {run} line {line}" for line in range(lines)]
+
+def test_run_logs_of_the_same_name_do_not_pile_up_handlers(tmp_path):
+    root_handlers = list(logging.getLogger().handlers)
+    registered = set(logging.Logger.manager.loggerDict)
+    for run in range(100):
+        run_log = beta_gui.RunLog("BETA-plus", str(tmp_path / f"BETA-plus-{run}.log"))
+        assert len(run_log.logger.handlers) == 1
+        run_log.info(f"run {run}")
+        run_log.close()
+        assert run_log.logger.handlers == []
+    # Nothing registered with the logging module or added to the root logger
+    assert logging.getLogger().handlers == root_handlers
+    assert set(logging.Logger.manager.loggerDict) == registered
+    for run in range(100):
+        assert read_lines(tmp_path / f"BETA-plus-{run}.log") == [f"INFO : BETA-plus : run {run}"]
+
+def test_lines_after_close_are_dropped(tmp_path):
+    path = tmp_path / "BETA-minus.log"
+    run_log = beta_gui.RunLog("BETA-minus", str(path))
+    run_log.error("failed")
+    run_log.close()
+    run_log.info("too late")
+    run_log.close()
+    assert read_lines(path) == ["ERROR : BETA-minus : failed"]
+
+def test_logging_cost_stays_flat_over_many_runs(tmp_path):
+    # The caller's cost per line must not grow with the number of runs already logged in this process
+    runs, lines, window = 200, 500, 20
+    root_handlers = len(logging.getLogger().handlers)
+    registered = len(logging.Logger.manager.loggerDict)
+    timings = []
+    for run in range(runs):
+        run_log = beta_gui.RunLog("BETA-plus", str(tmp_path / f"BETA-plus-{run}.log"))
+        assert len(run_log.logger.handlers) == 1
+        start = time.perf_counter()
+        for line in range(lines):
+            run_log.info(f"line {line} of run {run}")
+        timings.append((time.perf_counter() - start) / lines)
+        run_log.close()
+    # Medians and a generous bound, so a slow or busy machine does not fail it
+    first, last = statistics.median(timings[:window]), statistics.median(timings[-window:])
+    assert last < 3 * first, f"{first * 1e6:.1f} us/line in the first runs, {last * 1e6:.1f} us/line in the last"
+    assert len(logging.getLogger().handlers) == root_handlers
+    assert len(logging.Logger.manager.loggerDict) == registered
+    assert len(read_lines(tmp_path / f"BETA-plus-{runs - 1}.log")) == lines
@@ -0,0 +1,75 @@
+import sys
+
+import beta_gui
+
+STUB = '''import sys
+# Replies with the next line of the given file on each call, "!message" fails with message on stderr
+path = sys.argv[1]
+with open(path) as f:
+    replies = f.read().splitlines()
+reply = replies.pop(0) if len(replies) > 1 else replies[0]
+with open(path, 'w') as f:
+    f.write("\\n".join(replies) + "\\n")
+if reply.startswith("!"):
+    sys.stderr.write(reply[1:] + "\\n")
+    sys.exit(1)
+print(reply)
+'''
+
+def stub_executor(tmp_path, squeue, sacct):
+    script = tmp_path / "stub.py"
+    script.write_text(STUB)
+    commands = {}
+    for name, replies in (("squeue", squeue), ("sacct", sacct)):
+        (tmp_path / name).write_text("\n".join(replies) + "\n")
+        commands[name] = f"{sys.executable} {script} {tmp_path / name}"
+    return beta_gui.SlurmExecutor(queue_command=commands["squeue"], accounting_command=commands["sacct"], poll_seconds=0)
+
+def wait(executor):
+    messages = []
+    job = beta_gui.SlurmJob(executor, "42", "/nonexistent", lambda message, level=None: messages.append(message))
+    return job.wait(), messages
+
+def test_invalid_job_id_means_gone(tmp_path):
+    executor = stub_executor(tmp_path, ["!slurm_load_jobs error: Invalid job id specified"], ["COMPLETED|0:0"])
+    assert executor.queue_state("42") is None
+
+def test_other_squeue_failures_are_retried(tmp_path):
+    executor = stub_executor(tmp_path, ["RUNNING", "!slurm_load_jobs error: Socket timed out on send/recv operation", "RUNNING", ""], ["COMPLETED|0:0"])
+    returncode, messages = wait(executor)
+    assert returncode == 0
+    assert any("retrying" in message for message in messages)
+    # The failure did not end the wait, squeue was asked until the job had left the queue
+    assert (tmp_path / "squeue").read_text().strip() == ""
+
+def test_squeue_failures_stop_after_the_retry_limit(tmp_path):
+    executor = stub_executor(tmp_path, ["RUNNING", "!slurm_load_jobs error: Unable to contact slurm controller"], ["COMPLETED|0:0"])
+    executor.queue_retries = 3
+    executor.cancel_command = f"{sys.executable} -c \"open('{tmp_path / 'cancelled'}', 'w')\""
+    returncode, messages = wait(executor)
+    assert returncode == -1
+    assert messages[-1].startswith("Could not query Slurm job 42 3 times in a row")
+    # The job left unwatched is cancelled
+    assert (tmp_path / "cancelled").exists()
+
+def test_missing_squeue_fails_at_once(tmp_path):
+    executor = stub_executor(tmp_path, ["RUNNING"], ["COMPLETED|0:0"])
+    executor.queue_command = str(tmp_path / "no-such-squeue")
+    executor.cancel_command = str(tmp_path / "no-such-scancel")
+    returncode, messages = wait(executor)
+    assert returncode == -1
+    assert messages[0].startswith("Cannot query Slurm job 42")
+    assert not any("retrying" in message for message in messages)
+
+def test_accounting_waits_for_a_terminal_state(tmp_path):
+    executor = stub_executor(tmp_path, [""], ["", "RUNNING|0:0", "COMPLETING|0:0", "FAILED|2:0"])
+    returncode, messages = wait(executor)
+    assert returncode == 2
+    assert messages[-1] == "Slurm job 42 ended as failed with exit code 2."
+    assert "Slurm job 42 is completing." in messages
+
+def test_missing_accounting_record_fails(tmp_path):
+    executor = stub_executor(tmp_path, [""], [""])
+    returncode, messages = wait(executor)
+    assert returncode == -1
+    assert messages[-1] == "No accounting record for Slurm job 42, treating it as failed."
@@ -0,0 +1,44 @@
+import os
+
+import beta_gui
+from conftest import DATA_DIR
+
+MINUS_DIR = os.path.join(DATA_DIR, "minus")
+
+def minus_params(tmp_path, engine="native"):
+    manifest = tmp_path / "manifest.tsv"
+    manifest.write_text("type\tpeaks_file_path\treference_file_path\tname_prefix\toutput_path\tengine\n"
+                        f"minus\t{os.path.join(MINUS_DIR, 'peaks.bed')}\t{os.path.join(MINUS_DIR, 'refGene.txt')}\tsweep\t{tmp_path / 'out'}\t{engine}\n")
+    return beta_gui.read_manifest(str(manifest))[0]
+
+def test_sweep_runs_take_scheduler_slots(tmp_path):
+    # Sweep runs wait in the shared queue like any other run, so they never exceed its parallel runs
+    scheduler = beta_gui.JobScheduler(max_jobs=1)
+    rows = beta_gui.run_sweep(minus_params(tmp_path), {"distance": [5000, 10000, 20000]}, scheduler, log=lambda message: None)
+    assert [(row["distance"], row["state"]) for row in rows] == [(5000, "done"), (10000, "done"), (20000, "done")]
+    assert rows[1]["targets"] > 0
+    running, pending, finished = scheduler.snapshot()
+    assert not running and not pending
+    assert sorted(job.prefix for job in finished) == ["sweep_d10000", "sweep_d20000", "sweep_d5000"]
+    intervals = sorted((job.started_at, job.finished_at) for job in finished)
+    assert all(previous[1] <= following[0] for previous, following in zip(intervals, intervals[1:]))
+
+def test_cancelled_sweep_leaves_the_queue(tmp_path):
+    control = beta_gui.BatchControl()
+    control.stop()
+    scheduler = beta_gui.JobScheduler(max_jobs=1)
+    rows = beta_gui.run_sweep(minus_params(tmp_path), {"distance": [5000, 10000]}, scheduler, control=control, log=lambda message: None)
+    assert [row["state"] for row in rows] == ["cancelled", "cancelled"]
+    running, pending, _ = scheduler.snapshot()
+    assert not running and not pending
+
+def test_beta_runs_report_only_their_own_pvalues(tmp_path):
+    # Without BETA's function prediction table the p values are NA, not the native engine's
+    params = dict(minus_params(tmp_path, engine="BETA"), type="basic", name_prefix="run")
+    os.makedirs(params["output_path"])
+    outcome = beta_gui.sweep_outcome(params)
+    assert (outcome["up_p"], outcome["down_p"], outcome["function"]) == ("NA", "NA", "NA")
+    with open(os.path.join(params["output_path"], "run_function_prediction.txt"), 'w') as f:
+        f.write("#group\tgenes\tks_statistic\tp_value\tfunction\nup\t10\t0.5\t1.000e-04\tactivating\ndown\t10\t0.1\t5.000e-01\tNA\n")
+    outcome = beta_gui.sweep_outcome(params)
+    assert (outcome["up_p"], outcome["down_p"], outcome["function"]) == ("1.000e-04", "5.000e-01", "activating")
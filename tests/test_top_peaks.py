@@ -0,0 +1,25 @@
+import beta_gui
+
+def test_top_peaks_skips_unparsable_rows(tmp_path):
+    path = tmp_path / "peaks.narrowPeak"
+    path.write_text("track name=peaks\n"
+                    "chrom\tstart\tend\tname\tscore\n"
+                    "chr1\t100\t200\tp1\t5\n"
+                    "chr1\t300\t400\tp2\t.\n"
+                    "chr1\t500\t600\tp3\t9\n"
+                    "chr2\t100\t200\tp4\tnan\n"
+                    "chr2\t300\t400\tp5\t5\n")
+    top, total, skipped = beta_gui.top_peaks(str(path), 2)
+    assert [fields[3] for _, _, fields in top] == [b"p3", b"p1"]
+    assert (total, skipped) == (3, 3)
+
+def test_select_top_peaks_logs_skipped_rows(tmp_path):
+    path = tmp_path / "peaks.bed"
+    path.write_text("chrom\tstart\tend\tname\tscore\n" + "".join(f"chr1\t{start}\t{start + 50}\tp{start}\t{start % 7}\n" for start in range(0, 1000, 100)))
+    messages = []
+    params = {"preselect_peaks": True, "peak_number": "3", "peaks_file_path": str(path)}
+    selected = beta_gui.select_top_peaks(params, str(tmp_path), messages.append)
+    assert messages[0].startswith("Peak pre-selection ignored 1 lines")
+    # Best scores first, the tie between p200 and p900 kept in file order
+    with open(selected["peaks_file_path"]) as f:
+        assert [line.split()[3] for line in f] == ["p300", "p600", "p200"]